@@ -1,21 +1,22 @@
 # Financial AI
 
+import time
+
+_run_started = time.perf_counter()
+
 import streamlit as st
 from financial_agent import FinancialAgent
-import os
+from example_queries import EXAMPLE_QUERIES
+from lazy_imports import import_times, lazy_import, preload_in_background
+from prewarm import start_background_prewarmer
+from query_jobs import submit_query
+from shared_tools import get_query_executor, warm_up
+from tracing import RECENT_TRACES, render_waterfall_html
 from dotenv import load_dotenv
 import base64
-from io import BytesIO
-import pandas as pd
-import matplotlib.pyplot as plt
-
+import html
 
-# Load environment variables
-load_dotenv()
-
-# Initialize the financial agent in session state if it doesn't exist
-if "financial_agent" not in st.session_state:
-    st.session_state.financial_agent = FinancialAgent()
+pd = lazy_import("pandas")
 
 # Set page config
 st.set_page_config(
@@ -24,140 +25,264 @@ st.set_page_config(
     layout="wide"
 )
 
+
+@st.cache_resource(show_spinner=False)
+def load_shared_tools():
+    """
+    Build the process-wide tools once per server process (not once per rerun or session).
+
+    yfinance, pandas, matplotlib, the search client and the Gemini SDK are loaded on a
+    background thread, so the page is interactive before they are ready.
+
+    Returns:
+        Startup timings in seconds, filled in as the steps finish
+    """
+    # Load environment variables
+    load_dotenv()
+    started = time.perf_counter()
+    warm_up()
+    timings = {"shared tools": time.perf_counter() - started}
+    preload_in_background()
+    # Keep the watchlist answers warm in the background when PREWARM_INTERVAL is set
+    start_background_prewarmer()
+    return timings
+
+
+@st.cache_data(show_spinner=False)
+def page_css(path: str = "assets/style.css") -> str:
+    """Return the page stylesheet as a <style> block (read once, not on every rerun)."""
+    with open(path, encoding="utf-8") as f:
+        return f"<style>\n{f.read()}</style>"
+
+
+def memoized(job_id, name, compute):
+    """
+    Per-session memo of what is rendered for the current result (formatted HTML, decoded
+    images), so a rerun doesn't format or decode it again.
+    """
+    memo = st.session_state.get("render_memo")
+    if memo is None or memo["job_id"] != job_id:
+        memo = st.session_state.render_memo = {"job_id": job_id}
+    if name not in memo:
+        memo[name] = compute()
+    return memo[name]
+
+
+def render_result(agent, job):
+    """Render a finished query result: a chart, a comparison, stock data, a report or a chat answer."""
+    result = job.result
+    response = memoized(job.job_id, "response", lambda: agent.format_response(result))
+
+    # Handle stock chart requests
+    if result.get("is_stock_query", False) and result.get("is_chart_query", False):
+        chart_data = response  # The response is the chart data
+        ticker = result.get("ticker", "")
+
+        if "error" in chart_data:
+            st.error(f"Error generating chart: {chart_data['error']}")
+        else:
+            # Display stock chart
+            st.markdown(f"## Stock Chart for {ticker}")
+
+            # Convert base64 to image and display
+            image_bytes = memoized(job.job_id, "image", lambda: base64.b64decode(chart_data["image"]))
+            st.image(image_bytes, caption=f"{ticker} - {chart_data.get('period', '1y')}")
+
+            # Display some basic info
+            st.markdown(f"**Latest Price**: ${chart_data.get('latest_price', 'N/A')}")
+
+            # Display technical indicators if available
+            if "latest_sma20" in chart_data:
+                st.markdown("### Technical Indicators")
+                col1, col2 = st.columns(2)
+                with col1:
+                    st.markdown(f"**SMA (20)**: ${chart_data.get('latest_sma20', 'N/A')}")
+                with col2:
+                    st.markdown(f"**SMA (50)**: ${chart_data.get('latest_sma50', 'N/A')}")
+
+    # Handle stock comparison requests
+    elif result.get("is_stock_query", False) and result.get("is_comparison_query", False):
+        comparison_data = response  # The response is the comparison data
+        tickers = result.get("tickers", [])
+
+        if "error" in comparison_data:
+            st.error(f"Error comparing stocks: {comparison_data['error']}")
+        else:
+            # Display comparison chart
+            st.markdown(f"## Stock Comparison: {', '.join(tickers)}")
+
+            # Convert base64 to image and display
+            image_bytes = memoized(job.job_id, "image", lambda: base64.b64decode(comparison_data["image"]))
+            st.image(image_bytes, caption=f"Performance Comparison - {comparison_data.get('period', '1y')}")
+
+            # Display performance summary
+            st.markdown("### Performance Summary")
+            performance = comparison_data.get("performance", {})
+
+            # Create a neat performance table
+            performance_data = []
+            for tick, perf in performance.items():
+                sign = "+" if perf >= 0 else ""
+                status = "📈" if perf >= 0 else "📉"
+                performance_data.append({"Ticker": tick, "Change": f"{sign}{perf}%", "Status": status})
+
+            if performance_data:
+                perf_df = pd.DataFrame(performance_data)
+                st.table(perf_df)
+
+    # Handle multi-part stock requests (combined data plus an optional chart)
+    elif result.get("is_stock_query", False) and result.get("is_multi_part_query", False):
+        st.markdown(f'<div class="stock-container">{response}</div>', unsafe_allow_html=True)
+
+        chart_data = result.get("chart_data")
+        if chart_data:
+            image_bytes = memoized(job.job_id, "image", lambda: base64.b64decode(chart_data["image"]))
+            st.image(image_bytes, caption=f"{result.get('ticker', '')} - {chart_data.get('period', '1y')}")
+
+    # Different display for report vs. normal chat response
+    elif result.get("is_report_query", False) and not result.get("is_simple_query", False):
+        # The response is already in HTML format, just display it
+        st.markdown(f'<div class="report-container">{response}</div>', unsafe_allow_html=True)
+    else:
+        # For stock data response, use a different style
+        if result.get("is_stock_query", False):
+            # The response is already in HTML format, just display it
+            st.markdown(f'<div class="stock-container">{response}</div>', unsafe_allow_html=True)
+        else:
+            # Display simple chat response with better visibility
+            st.markdown(f'<div class="chat-container">{response}</div>', unsafe_allow_html=True)
+
+    # Debug panel: span waterfall of this request (stages, fetches, model calls)
+    trace_data = RECENT_TRACES.get(result.get("trace_id"))
+    if trace_data:
+        with st.expander(f"Request trace ({trace_data['duration']:.2f}s)"):
+            waterfall_html = memoized(job.job_id, "trace", lambda: render_waterfall_html(trace_data))
+            st.markdown(waterfall_html, unsafe_allow_html=True)
+
+
+def progress_line(snapshot):
+    """One line summarizing a running query: elapsed time, stages and finished stock data parts."""
+    steps = []
+    for stage in snapshot["stages"]:
+        if stage["status"] == "finished":
+            steps.append(f"✅ {stage['stage']} ({stage['duration']:.1f}s)")
+        else:
+            steps.append(f"⏳ {stage['stage']}")
+    if snapshot["parts"]:
+        steps.append("📊 " + ", ".join(sorted(snapshot["parts"])))
+    action = "Cancelling" if snapshot["cancel_requested"] else "Analyzing financial data"
+    return " · ".join([f"{action}... {snapshot['elapsed']:.1f}s"] + steps)
+
+
+def render_progress(agent, job):
+    """
+    Show a running query's progress until it finishes: the stages, the chart as soon as
+    it is drawn, the analysis sections as the model streams them and the sources as
+    they are read.
+
+    A widget interaction reruns the script, which interrupts this polling loop but not
+    the query; the next run resumes polling.
+    """
+    status = st.empty()
+    chart = st.empty()
+    partial = st.empty()
+    sources = st.empty()
+    seen = None
+    chart_shown = False
+    while not job.done:
+        snapshot = job.snapshot()
+        # Updated on every poll, so the elapsed time keeps moving
+        status.caption(progress_line(snapshot))
+        if snapshot["version"] != seen:
+            seen = snapshot["version"]
+            chart_data = snapshot["parts"].get("chart")
+            if chart_data and "image" in chart_data and not chart_shown:
+                chart.image(base64.b64decode(chart_data["image"]), caption=f"{chart_data.get('period', '1y')} chart")
+                chart_shown = True
+            if snapshot["partial"]:
+                partial_html = agent.format_partial_analysis(snapshot["partial"])
+                partial.markdown(f'<div class="report-container">{partial_html}</div>', unsafe_allow_html=True)
+            if snapshot["sources"]:
+                sources.markdown("**Sources read so far**\n\n" + "\n".join(
+                    f"- [{source['title']}]({source['url']})" for source in snapshot["sources"]
+                ))
+        time.sleep(0.2)
+    for placeholder in (status, chart, partial, sources):
+        placeholder.empty()
+
+
+@st.fragment
+def results_panel(agent):
+    """
+    The latest query: its progress while it runs, then its result.
+
+    A fragment, so clicking Cancel reruns only this panel, not the whole page.
+    """
+    job = st.session_state.get("query_job")
+    if job is None:
+        return
+    if not job.done:
+        cancel_slot = st.empty()
+        if cancel_slot.button("Cancel", key=f"cancel_{job.job_id}"):
+            job.cancel()
+        render_progress(agent, job)
+        cancel_slot.empty()
+        if not st.session_state.get("full_run"):
+            # The query finished during a rerun of this panel alone; rerun the page so the
+            # context and the conversation history catch up
+            st.rerun()
+
+    if job.status == "done":
+        try:
+            render_result(agent, job)
+        except Exception as e:
+            st.error(f"Error processing query: {str(e)}")
+            import traceback
+            st.error(traceback.format_exc())
+    elif job.status == "failed":
+        st.error(f"Error processing query: {job.error}")
+    elif job.status == "cancelled":
+        st.info("Analysis cancelled.")
+
+
+def history_item_html(item):
+    """HTML of one conversation exchange (a single line, so Markdown doesn't read it as code)."""
+    answer = html.escape(item["response"][:150]) + ("..." if len(item["response"]) > 150 else "")
+    return (f'<div class="conversation-item"><div class="user-query">Q: {html.escape(item["query"])}</div>'
+            f'<div>A: {answer}</div></div>')
+
+
+def history_panel(agent):
+    """
+    The conversation history, rendered incrementally: each exchange's HTML is built once
+    and appended to the session's list, so the cost of a rerun doesn't grow with the session.
+    """
+    rendered = st.session_state.setdefault("history_items", [])
+    last_seq = rendered[-1][0] if rendered else 0
+    for item in agent.conversation_history:
+        if item.get("seq", 0) > last_seq:
+            rendered.append((item["seq"], history_item_html(item)))
+    if not rendered:
+        return
+
+    st.markdown("### Conversation History")
+    # The agent remembers its last 10 exchanges; show the same window
+    items = "".join(item_html for _, item_html in rendered[-10:])
+    st.markdown(f'<div class="conversation-history">{items}</div>', unsafe_allow_html=True)
+
+
+startup_timings = load_shared_tools()
+
+# Fragments rerunning on their own see this unset (see results_panel)
+st.session_state.full_run = True
+
+# Initialize the financial agent in session state if it doesn't exist
+# (agents are lightweight: the search, sentiment and stock tools are shared by all sessions)
+if "financial_agent" not in st.session_state:
+    st.session_state.financial_agent = FinancialAgent()
+
 # Custom CSS for better formatting
-st.markdown("""
-<style>
-    .report-container {
-        background-color: #f0f6ff;
-        padding: 20px;
-        border-radius: 10px;
-        border-left: 5px solid #1e88e5;
-        margin-bottom: 20px;
-        color: #000000;
-    }
-    .chat-container {
-        background-color: #e0f0ff;
-        padding: 15px;
-        border-radius: 15px;
-        margin-bottom: 15px;
-        color: #000000;
-    }
-    .sentiment-positive {
-        color: #2e7d32;
-        font-weight: bold;
-    }
-    .sentiment-negative {
-        color: #c62828;
-        font-weight: bold;
-    }
-    .sentiment-neutral {
-        color: #546e7a;
-        font-weight: bold;
-    }
-    .sentiment-mixed {
-        color: #6a1b9a;
-        font-weight: bold;
-    }
-    .header-container {
-        padding: 1.5rem;
-        background: linear-gradient(90deg, #1e3a8a, #0d47a1);
-        color: white;
-        border-radius: 10px;
-        margin-bottom: 2rem;
-    }
-    .main-title {
-        font-size: 2.2rem;
-        font-weight: 700;
-        margin-bottom: 0.5rem;
-    }
-    .subtitle {
-        font-size: 1.1rem;
-        opacity: 0.9;
-    }
-    h1, h2, h3 {
-        color: #0d47a1;
-    }
-    /* Fix markdown rendering of headers inside containers */
-    .report-container h1, .report-container h2, .report-container h3 {
-        color: #0d47a1;
-        font-weight: bold;
-        margin-top: 0.5em;
-        margin-bottom: 0.5em;
-    }
-    /* Fix all text color inside containers */
-    .report-container p, .chat-container p {
-        color: #333333;
-    }
-    /* Ensure lists are visible */
-    .report-container ul, .report-container ol {
-        color: #333333;
-        margin-left: 1.5em;
-    }
-    /* Ensure links stand out */
-    a {
-        color: #0d47a1 !important;
-        text-decoration: underline;
-    }
-    /* Stock data styling */
-    .stock-container {
-        background-color: #e8f5e9;
-        padding: 20px;
-        border-radius: 10px;
-        border-left: 5px solid #43a047;
-        margin-bottom: 20px;
-        color: #333333;
-    }
-    .stock-chart {
-        padding: 10px;
-        background-color: white;
-        border-radius: 8px;
-        margin-top: 15px;
-        box-shadow: 0 2px 5px rgba(0,0,0,0.1);
-    }
-    .indicator-bullish {
-        color: #2e7d32;
-        font-weight: bold;
-    }
-    .indicator-bearish {
-        color: #c62828;
-        font-weight: bold;
-    }
-    .indicator-neutral {
-        color: #546e7a;
-        font-weight: bold;
-    }
-    /* Conversation history styling */
-    .conversation-history {
-        background-color: #f5f5f5;
-        padding: 15px;
-        border-radius: 10px;
-        margin-bottom: 20px;
-        max-height: 300px;
-        overflow-y: auto;
-        color: #333333;
-    }
-    .conversation-item {
-        padding: 10px;
-        margin-bottom: 10px;
-        border-radius: 8px;
-        background-color: white;
-        box-shadow: 0 1px 3px rgba(0,0,0,0.1);
-        color: #000000;
-    }
-    .user-query {
-        font-weight: bold;
-        color: #0d47a1;
-    }
-    .context-info {
-        background-color: #e3f2fd;
-        padding: 10px;
-        border-radius: 8px;
-        margin-bottom: 15px;
-        font-size: 0.9rem;
-        color: #000000;
-    }
-</style>
-""", unsafe_allow_html=True)
+st.markdown(page_css(), unsafe_allow_html=True)
 
 # Header
 st.markdown('<div class="header-container"><div class="main-title">Financial Insights AI</div><div class="subtitle">Market sentiment analysis powered by AI</div></div>', unsafe_allow_html=True)
@@ -168,33 +293,8 @@ col1, col2 = st.columns([7, 3])
 with col2:
     st.markdown("### Example Queries")
     
-    # Query categories with examples
-    categories = {
-        "Market Sentiment": [
-            "What did Warren Buffett say in his latest annual report?",
-            "What is the market sentiment around Tesla stock?",
-            "How have Elon Musk's recent tweets affected the crypto market?"
-        ],
-        "Stock Data": [
-            "What is the current price of AAPL?",
-            "Show me a chart of Tesla stock",
-            "Compare AAPL, MSFT, and GOOGL performance",
-            "What are the technical indicators for NVDA?"
-        ],
-        "Financial News": [
-            "What is the latest news about the Federal Reserve?",
-            "How will the latest inflation report impact the market?",
-            "What are analysts saying about the tech sector?"
-        ],
-        "Quick Info": [
-            "What is the ticker symbol for Apple?",
-            "What is market capitalization?",
-            "What is P/E ratio?"
-        ]
-    }
-    
     # Display categories and examples
-    for category, examples in categories.items():
+    for category, examples in EXAMPLE_QUERIES.items():
         with st.expander(category, expanded=category=="Stock Data"):
             for example in examples:
                 if st.button(example, key=example):
@@ -231,114 +331,23 @@ with col1:
         </div>
         """, unsafe_allow_html=True)
     
-    # Process query
+    # Start the query in the background; a query still running in this session is cancelled first
     if run_query or st.session_state.get("run_query", False):
+        # Reset the run query flag if it was set from a sidebar button
+        st.session_state.run_query = False
         if query:
-            # Reset the run query flag if it was set from a sidebar button
-            st.session_state.run_query = False
-            
-            with st.spinner("Analyzing financial data..."):
-                try:
-                    # Process the query using the agent from session state
-                    result = st.session_state.financial_agent.handle_query(query)
-                    response = st.session_state.financial_agent.format_response(result)
-                    
-                    # Handle stock chart requests
-                    if result.get("is_stock_query", False) and result.get("is_chart_query", False):
-                        chart_data = response  # The response is the chart data
-                        ticker = result.get("ticker", "")
-                        
-                        if "error" in chart_data:
-                            st.error(f"Error generating chart: {chart_data['error']}")
-                        else:
-                            # Display stock chart
-                            st.markdown(f"## Stock Chart for {ticker}")
-                            
-                            # Convert base64 to image and display
-                            image_bytes = base64.b64decode(chart_data["image"])
-                            st.image(image_bytes, caption=f"{ticker} - {chart_data.get('period', '1y')}")
-                            
-                            # Display some basic info
-                            st.markdown(f"**Latest Price**: ${chart_data.get('latest_price', 'N/A')}")
-                            
-                            # Display technical indicators if available
-                            if "latest_sma20" in chart_data:
-                                st.markdown("### Technical Indicators")
-                                col1, col2 = st.columns(2)
-                                with col1:
-                                    st.markdown(f"**SMA (20)**: ${chart_data.get('latest_sma20', 'N/A')}")
-                                with col2:
-                                    st.markdown(f"**SMA (50)**: ${chart_data.get('latest_sma50', 'N/A')}")
-                    
-                    # Handle stock comparison requests
-                    elif result.get("is_stock_query", False) and result.get("is_comparison_query", False):
-                        comparison_data = response  # The response is the comparison data
-                        tickers = result.get("tickers", [])
-                        
-                        if "error" in comparison_data:
-                            st.error(f"Error comparing stocks: {comparison_data['error']}")
-                        else:
-                            # Display comparison chart
-                            st.markdown(f"## Stock Comparison: {', '.join(tickers)}")
-                            
-                            # Convert base64 to image and display
-                            image_bytes = base64.b64decode(comparison_data["image"])
-                            st.image(image_bytes, caption=f"Performance Comparison - {comparison_data.get('period', '1y')}")
-                            
-                            # Display performance summary
-                            st.markdown("### Performance Summary")
-                            performance = comparison_data.get("performance", {})
-                            
-                            # Create a neat performance table
-                            performance_data = []
-                            for tick, perf in performance.items():
-                                sign = "+" if perf >= 0 else ""
-                                status = "📈" if perf >= 0 else "📉"
-                                performance_data.append({"Ticker": tick, "Change": f"{sign}{perf}%", "Status": status})
-                                
-                            if performance_data:
-                                perf_df = pd.DataFrame(performance_data)
-                                st.table(perf_df)
-                    
-                    # Different display for report vs. normal chat response
-                    elif result.get("is_report_query", False) and not result.get("is_simple_query", False):
-                        # The response is already in HTML format, just display it
-                        st.markdown(f'<div class="report-container">{response}</div>', unsafe_allow_html=True)
-                    else:
-                        # For stock data response, use a different style
-                        if result.get("is_stock_query", False):
-                            # The response is already in HTML format, just display it
-                            st.markdown(f'<div class="stock-container">{response}</div>', unsafe_allow_html=True)
-                        else:
-                            # Display simple chat response with better visibility
-                            st.markdown(f'<div class="chat-container">{response}</div>', unsafe_allow_html=True)
-                
-                except Exception as e:
-                    st.error(f"Error processing query: {str(e)}")
-                    import traceback
-                    st.error(traceback.format_exc())
+            running = st.session_state.get("query_job")
+            if running is not None and not running.done:
+                running.cancel()
+            st.session_state.query_job = submit_query(st.session_state.financial_agent, query, get_query_executor())
         else:
             st.warning("Please enter a question about finance, business, or markets.")
     
+    # Show the latest query: its progress while it runs, then its result
+    results_panel(st.session_state.financial_agent)
+    
     # Display conversation history
-    if hasattr(st.session_state.financial_agent, 'conversation_history') and st.session_state.financial_agent.conversation_history:
-        st.markdown("### Conversation History")
-        
-        # Create a container for all conversation items
-        conversation_html = '<div class="conversation-history">'
-        
-        for i, item in enumerate(st.session_state.financial_agent.conversation_history):
-            conversation_html += f"""
-            <div class="conversation-item">
-                <div class="user-query">Q: {item['query']}</div>
-                <div>A: {item['response'][:150]}{'...' if len(item['response']) > 150 else ''}</div>
-            </div>
-            """
-            
-        conversation_html += '</div>'
-        
-        # Display the entire conversation history at once using components.html
-        st.components.v1.html(conversation_html, height=300)
+    history_panel(st.session_state.financial_agent)
     
     # Show usage tips for first-time users
     if "first_visit" not in st.session_state:
@@ -370,4 +379,19 @@ st.markdown("⚠️ **Disclaimer**: This is a tool for financial analysis purpos
 
 # Add chat history to keep track of previous interactions
 if "chat_history" not in st.session_state:
-    st.session_state.chat_history = [] 
\ No newline at end of file
+    st.session_state.chat_history = []
+
+# Startup report: the first run of the server process includes the imports and tool setup
+startup_timings.setdefault("first render", time.perf_counter() - _run_started)
+with st.expander("Startup timing"):
+    st.markdown("\n".join(f"- **{step}**: {seconds:.2f}s" for step, seconds in startup_timings.items()))
+    st.markdown(f"- **this rerun**: {time.perf_counter() - _run_started:.2f}s")
+    loaded = import_times()
+    if loaded:
+        st.markdown("Lazily imported modules:\n" + "\n".join(
+            f"- `{name}`: {seconds:.2f}s" for name, seconds in loaded.items()
+        ))
+    else:
+        st.caption("The heavy modules are still loading in the background.") 
+
+st.session_state.full_run = False
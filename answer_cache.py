@@ -0,0 +1,216 @@
+import datetime
+import os
+from typing import Any, Callable, Dict, Optional
+from zoneinfo import ZoneInfo
+
+from query_router import PERIOD_INTERVALS, QueryIntent
+from response_cache import ResponseCache, make_key, normalize_query
+
+# Freshness of each answer class: (seconds fresh, extra seconds served stale while refreshing).
+# "bar" answers are computed from price bars and stay fresh until the current bar closes (see
+# seconds_until_bar_close).
+FRESHNESS_POLICIES = {
+    "quote": (15, 45),
+    "indicators": ("bar", 3600),
+    "historical": (86400, 6 * 3600),
+    "report": (3600, 1800),
+}
+
+# Parts of a multi-part query by how quickly they go out of date, most volatile first
+_PART_CLASSES = (
+    ("quote", ("quote",)),
+    ("indicators", ("rsi", "macd", "sma", "ema", "chart")),
+    ("historical", ("historical", "metadata")),
+)
+
+# Length of the intraday bar intervals in PERIOD_INTERVALS, in seconds
+INTERVAL_SECONDS = {"1m": 60, "2m": 120, "5m": 300, "15m": 900, "30m": 1800, "60m": 3600, "1h": 3600}
+
+# Listing exchange by ticker suffix; tickers without a known suffix are US listings
+EXCHANGE_SUFFIXES = {".NS": "NSE", ".BO": "BSE"}
+
+# Time zone and local closing time of each exchange's regular session, when its daily bar is final
+SESSION_CLOSES = {
+    "NSE": ("Asia/Kolkata", datetime.time(15, 30)),
+    "BSE": ("Asia/Kolkata", datetime.time(15, 30)),
+    "US": ("America/New_York", datetime.time(16, 0)),
+}
+
+
+def listing_exchange(ticker: str) -> str:
+    """Return the exchange of SESSION_CLOSES a ticker is listed on."""
+    suffix = ticker[ticker.rfind("."):] if "." in ticker else ""
+    return EXCHANGE_SUFFIXES.get(suffix.upper(), "US")
+
+
+def seconds_until_session_close(exchange: str, now: Optional[datetime.datetime] = None) -> float:
+    """Seconds until the next weekday session close of an exchange (holidays are not known)."""
+    now = now or datetime.datetime.now(datetime.timezone.utc)
+    zone, close = SESSION_CLOSES[exchange]
+    local = now.astimezone(ZoneInfo(zone))
+    day = local.date()
+    while True:
+        closes_at = datetime.datetime.combine(day, close, tzinfo=local.tzinfo)
+        if day.weekday() < 5 and closes_at > local:
+            return max((closes_at - local).total_seconds(), 1.0)
+        day += datetime.timedelta(days=1)
+
+
+def seconds_until_bar_close(intent: QueryIntent, now: Optional[datetime.datetime] = None) -> float:
+    """
+    Seconds until the latest price bar behind a stock answer closes.
+
+    Intraday bars (PERIOD_INTERVALS) close every interval; daily bars close with the
+    session of the exchange each ticker is listed on, the earliest of them counting.
+
+    Args:
+        intent: The routed query intent
+        now: Current time (defaults to now, UTC)
+
+    Returns:
+        Seconds, at least one
+    """
+    now = now or datetime.datetime.now(datetime.timezone.utc)
+    interval = PERIOD_INTERVALS.get(intent.period, "1d")
+    if interval in INTERVAL_SECONDS:
+        bar = INTERVAL_SECONDS[interval]
+        return max(bar - now.timestamp() % bar, 1.0)
+    exchanges = {listing_exchange(ticker) for ticker in intent.tickers} or {"US"}
+    return min(seconds_until_session_close(exchange, now) for exchange in exchanges)
+
+
+def answer_class(intent: QueryIntent) -> str:
+    """
+    Classify a routed stock query by how quickly its answer goes out of date.
+
+    Args:
+        intent: The routed query intent
+
+    Returns:
+        "quote", "indicators" or "historical"
+    """
+    if intent.kind == "price":
+        return "quote"
+    if intent.kind == "historical":
+        return "historical"
+    if intent.kind == "multi":
+        for name, parts in _PART_CLASSES:
+            if any(part in intent.parts for part in parts):
+                return name
+    return "indicators"
+
+
+def stock_answer_key(intent: QueryIntent) -> str:
+    """Canonical key of a routed stock query: resolved tickers, kind, period, chart style, indicators and windows."""
+    windows = ",".join(f"{name}={window}" for name, window in sorted(intent.windows.items()))
+    return make_key(
+        "stock", intent.kind, ",".join(intent.tickers), intent.period, intent.chart_style or "",
+        ",".join(intent.indicators), windows, ",".join(intent.parts)
+    )
+
+
+def report_answer_key(query: str) -> str:
+    """Canonical key of a researched (search and sentiment) answer: the normalized, context-enhanced query."""
+    return make_key("report", normalize_query(query))
+
+
+class AnswerCache:
+    """
+    Cache of complete query answers with a freshness policy per answer class.
+
+    Quotes stay fresh for seconds, indicators until their latest price bar closes, historical
+    statistics for a day and researched sentiment reports for about an hour. Stale
+    answers are returned at once while they are recomputed in the background.
+    """
+
+    def __init__(self, persist_path: Optional[str] = None, max_entries: int = 256, enabled: bool = True):
+        """
+        Args:
+            persist_path: SQLite file shared by the answer classes (None keeps answers in memory only)
+            max_entries: Maximum number of answers of each class kept in memory
+            enabled: False disables caching altogether
+        """
+        self.caches = {
+            name: ResponseCache(
+                f"answers:{name}", max_entries=max_entries,
+                ttl=(1 if ttl == "bar" else ttl) if enabled else 0,
+                stale_ttl=stale_ttl, persist_path=persist_path
+            )
+            for name, (ttl, stale_ttl) in FRESHNESS_POLICIES.items()
+        }
+
+    @classmethod
+    def from_env(cls) -> "AnswerCache":
+        """Create the answer cache configured by ANSWER_CACHE and ANSWER_CACHE_PATH."""
+        return cls(
+            persist_path=os.getenv("ANSWER_CACHE_PATH", os.path.join(".cache", "answer_cache.sqlite3")) or None,
+            max_entries=int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "256")),
+            enabled=os.getenv("ANSWER_CACHE", "1") != "0"
+        )
+
+    def _ttl(self, name: str, intent: Optional[QueryIntent]) -> float:
+        ttl = FRESHNESS_POLICIES[name][0]
+        if ttl != "bar":
+            return ttl
+        return seconds_until_bar_close(intent or QueryIntent(kind=None))
+
+    def get_or_compute(self, name: str, key: str, compute: Callable[[], Dict[str, Any]],
+                       cache_if: Callable[[Dict[str, Any]], bool],
+                       refresh: Optional[Callable[[], Dict[str, Any]]] = None,
+                       on_lookup: Optional[Callable[[str], None]] = None,
+                       intent: Optional[QueryIntent] = None) -> Optional[Dict[str, Any]]:
+        """
+        Return the cached answer for a key, computing it on a miss.
+
+        Args:
+            name: Answer class ("quote", "indicators", "historical" or "report")
+            key: Canonical answer key
+            compute: Function producing the answer
+            cache_if: Predicate telling whether an answer may be cached
+            refresh: Function recomputing the answer in the background (defaults to compute)
+            on_lookup: Optional callback receiving the lookup state ("fresh", "stale" or "miss")
+            intent: Routed intent of a stock answer, whose price bars set its freshness
+
+        Returns:
+            A copy of the answer, so callers may add request-specific fields to it
+        """
+        answer = self.caches[name].get_or_compute(
+            key, compute, ttl=self._ttl(name, intent), cache_if=cache_if, refresh=refresh, on_lookup=on_lookup
+        )
+        return dict(answer) if answer is not None else None
+
+    def lookup(self, name: str, key: str, cache_if: Callable[[Dict[str, Any]], bool],
+               refresh: Callable[[], Dict[str, Any]],
+               on_lookup: Optional[Callable[[str], None]] = None) -> Optional[Dict[str, Any]]:
+        """
+        Return the cached answer for a key without computing it on a miss.
+
+        Stale answers are still returned and recomputed in the background with refresh.
+
+        Returns:
+            A copy of the answer, or None on a miss
+        """
+        return self.get_or_compute(
+            name, key, lambda: None, lambda answer: answer is not None and cache_if(answer),
+            refresh=refresh, on_lookup=on_lookup
+        )
+
+    def store(self, name: str, key: str, answer: Dict[str, Any],
+              cache_if: Callable[[Dict[str, Any]], bool], intent: Optional[QueryIntent] = None) -> None:
+        """Store a copy of an answer computed outside get_or_compute, if cache_if allows it."""
+        if cache_if(answer):
+            # The caller goes on to return the answer, so it must not be the cached object
+            self.caches[name].set(key, dict(answer), self._ttl(name, intent))
+
+    def state(self, name: str, key: str) -> str:
+        """Return whether the answer for a key is "fresh", "stale" or missing ("miss")."""
+        return self.caches[name].get(key)[1]
+
+    def clear(self) -> None:
+        """Remove every cached answer."""
+        for cache in self.caches.values():
+            cache.clear()
+
+    def get_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Return the hit/miss counters of each answer class."""
+        return {name: cache.get_stats() for name, cache in self.caches.items()}
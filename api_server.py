@@ -0,0 +1,222 @@
+import argparse
+import base64
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Tuple
+
+from dotenv import load_dotenv
+from flask import Flask, Response, jsonify, request
+
+from financial_agent import FinancialAgent
+from llm_metrics import METRICS
+from shared_tools import get_answer_cache, get_stock_tools, warm_up
+
+# Periods accepted by Yahoo Finance
+VALID_PERIODS = ("1d", "5d", "1mo", "3mo", "6mo", "1y", "2y", "5y", "10y", "ytd", "max")
+
+app = Flask(__name__)
+started_at = time.time()
+
+# Conversation state of API sessions; the tools behind the agents are shared process-wide
+_sessions: "OrderedDict[str, Tuple[FinancialAgent, threading.Lock]]" = OrderedDict()
+_sessions_lock = threading.Lock()
+MAX_SESSIONS = int(os.getenv("API_MAX_SESSIONS", "1000"))
+
+
+def _session(session_id: str) -> Tuple[FinancialAgent, threading.Lock]:
+    """Return the agent of a session and the lock serializing its queries, creating them if needed."""
+    with _sessions_lock:
+        session = _sessions.get(session_id)
+        if session is None:
+            session = _sessions[session_id] = (FinancialAgent(), threading.Lock())
+            while len(_sessions) > MAX_SESSIONS:
+                _sessions.popitem(last=False)
+        else:
+            _sessions.move_to_end(session_id)
+        return session
+
+
+def _bad_request(message: str):
+    return jsonify({"error": message}), 400
+
+
+def _tool_response(data: Dict[str, Any]):
+    """Return a stock tool result, as a 502 when the upstream data could not be fetched."""
+    return jsonify(data), (502 if "error" in data else 200)
+
+
+def _period():
+    period = request.args.get("period", "1y")
+    if period not in VALID_PERIODS:
+        return None
+    return period
+
+
+@app.post("/api/query")
+def query():
+    """
+    Answer one query.
+
+    JSON body: {"query": "...", "session_id": optional, so follow-up questions keep their context,
+    "formatted": optional, default false}.
+    The response is the agent result; with "formatted": true it also holds the HTML rendering
+    shown in the app under "formatted" (which repeats any chart image).
+    """
+    body = request.get_json(silent=True) or {}
+    text = (body.get("query") or "").strip()
+    if not text:
+        return _bad_request("Missing 'query'")
+
+    session_id = body.get("session_id")
+    if session_id:
+        agent, lock = _session(str(session_id))
+        with lock:
+            result = agent.handle_query(text)
+    else:
+        agent = FinancialAgent()
+        result = agent.handle_query(text)
+    if body.get("formatted") is True:
+        result["formatted"] = agent.format_response(result)
+    return jsonify(result)
+
+
+@app.post("/api/queries")
+def queries():
+    """
+    Answer a batch of independent queries, streamed as JSON lines in completion order.
+
+    JSON body: {"queries": ["...", ...], "max_concurrency": optional, default 8,
+    "formatted": optional, default false, adds each result's HTML rendering as in /api/query}.
+    """
+    body = request.get_json(silent=True) or {}
+    texts = body.get("queries")
+    if not isinstance(texts, list) or not texts or not all(isinstance(text, str) and text.strip() for text in texts):
+        return _bad_request("'queries' must be a non-empty list of strings")
+    try:
+        max_concurrency = int(body.get("max_concurrency", 8))
+    except (TypeError, ValueError):
+        return _bad_request("'max_concurrency' must be an integer")
+    if not 1 <= max_concurrency <= 32:
+        return _bad_request("'max_concurrency' must be between 1 and 32")
+
+    formatted = body.get("formatted") is True
+    agent = FinancialAgent()
+
+    def stream():
+        for result in agent.handle_queries(texts, max_concurrency=max_concurrency):
+            if formatted:
+                result["formatted"] = agent.format_response(result)
+            yield json.dumps(result) + "\n"
+
+    return Response(stream(), mimetype="application/x-ndjson")
+
+
+@app.get("/api/stocks/<ticker>/price")
+def stock_price(ticker: str):
+    return _tool_response(get_stock_tools().get_stock_price(ticker.upper()))
+
+
+@app.get("/api/stocks/<ticker>/info")
+def stock_info(ticker: str):
+    return _tool_response(get_stock_tools().get_stock_info(ticker.upper()))
+
+
+@app.get("/api/stocks/<ticker>/history")
+def stock_history(ticker: str):
+    period = _period()
+    if period is None:
+        return _bad_request(f"'period' must be one of {', '.join(VALID_PERIODS)}")
+    return _tool_response(get_stock_tools().get_historical_data(ticker.upper(), period))
+
+
+@app.get("/api/stocks/<ticker>/indicators/<name>")
+def stock_indicator(ticker: str, name: str):
+    """RSI, MACD, SMA or EMA of a ticker; ?window= sets the SMA/EMA window (default 20)."""
+    tools = get_stock_tools()
+    name = name.lower()
+    ticker = ticker.upper()
+    if name == "rsi":
+        return _tool_response(tools.calculate_rsi(ticker))
+    if name == "macd":
+        return _tool_response(tools.calculate_macd(ticker))
+    if name in ("sma", "ema"):
+        window = request.args.get("window", "20")
+        if not window.isdigit() or not 1 < int(window) <= 400:
+            return _bad_request("'window' must be an integer between 2 and 400")
+        calculate = tools.calculate_sma if name == "sma" else tools.calculate_ema
+        return _tool_response(calculate(ticker, int(window)))
+    return _bad_request("Indicator must be one of rsi, macd, sma, ema")
+
+
+@app.get("/api/stocks/compare")
+def stock_compare():
+    """Performance comparison chart of ?tickers=AAPL,MSFT over ?period= (default 1y)."""
+    tickers = [ticker.strip().upper() for ticker in request.args.get("tickers", "").split(",") if ticker.strip()]
+    if len(tickers) < 2:
+        return _bad_request("'tickers' must list at least two comma-separated tickers")
+    period = _period()
+    if period is None:
+        return _bad_request(f"'period' must be one of {', '.join(VALID_PERIODS)}")
+    return _tool_response(get_stock_tools().compare_stocks(tickers, period))
+
+
+@app.get("/api/charts/<ticker>")
+def chart(ticker: str):
+    """
+    Price chart of a ticker.
+
+    Query parameters: period (default 1y), style ("price" or "technical") and
+    format ("json" with a base64 image, or "png" for the image itself).
+    """
+    period = _period()
+    if period is None:
+        return _bad_request(f"'period' must be one of {', '.join(VALID_PERIODS)}")
+    style = request.args.get("style", "price")
+    if style not in ("price", "technical"):
+        return _bad_request("'style' must be 'price' or 'technical'")
+
+    tools = get_stock_tools()
+    plot = tools.plot_technical_indicators if style == "technical" else tools.plot_stock_price
+    chart_data = plot(ticker.upper(), period)
+    if request.args.get("format") == "png" and "error" not in chart_data:
+        return Response(base64.b64decode(chart_data["image"]), mimetype="image/png")
+    return _tool_response(chart_data)
+
+
+@app.get("/health")
+def health():
+    with _sessions_lock:
+        sessions = len(_sessions)
+    return jsonify({
+        "status": "ok",
+        "uptime_seconds": round(time.time() - started_at, 1),
+        "sessions": sessions,
+        "answer_cache": get_answer_cache().get_stats()
+    })
+
+
+@app.get("/metrics")
+def metrics():
+    """LLM and pipeline stage metrics in the Prometheus text format (?format=json for JSON)."""
+    if request.args.get("format") == "json":
+        return Response(METRICS.to_json(), mimetype="application/json")
+    return Response(METRICS.to_prometheus(), mimetype="text/plain; version=0.0.4")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Serve the financial agent as a JSON API.")
+    parser.add_argument("--host", default=os.getenv("API_HOST", "127.0.0.1"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("API_PORT", "8000")))
+    args = parser.parse_args()
+
+    warm_up()
+    # One thread per request; the tools, caches and executors are shared by all of them
+    app.run(host=args.host, port=args.port, threaded=True)
+
+
+if __name__ == "__main__":
+    load_dotenv()
+    main()
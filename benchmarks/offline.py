@@ -0,0 +1,126 @@
+import json
+import os
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional
+
+import pandas as pd
+
+from llm_backends import LLMBackend
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+# Trading days returned for each yfinance period
+PERIOD_ROWS = {"1d": 1, "5d": 5, "1mo": 21, "3mo": 63, "6mo": 126, "1y": 252, "ytd": 200,
+               "2y": 504, "5y": 1260, "10y": 2520, "max": 10 ** 6}
+
+
+def _load_json(name: str) -> Any:
+    with open(os.path.join(FIXTURES_DIR, name), encoding="utf-8") as f:
+        return json.load(f)
+
+
+class Fixtures:
+    """Recorded price frames, ticker metadata, search results, article page and model answers."""
+
+    def __init__(self):
+        self.frames: Dict[str, pd.DataFrame] = {}
+        for name in sorted(os.listdir(FIXTURES_DIR)):
+            if name.startswith("history_") and name.endswith(".csv"):
+                frame = pd.read_csv(os.path.join(FIXTURES_DIR, name), index_col="Date")
+                frame.index = pd.to_datetime(frame.index, utc=True)
+                self.frames[name[len("history_"):-len(".csv")]] = frame
+        self.info = _load_json("info.json")
+        self.search_results = _load_json("search_results.json")
+        self.llm_responses = _load_json("llm_responses.json")
+        with open(os.path.join(FIXTURES_DIR, "article.html"), encoding="utf-8") as f:
+            self.article_html = f.read()
+
+
+class FixtureTicker:
+    """Stand-in for yfinance.Ticker serving the recorded frames and metadata."""
+
+    def __init__(self, fixtures: Fixtures, ticker: str):
+        self._fixtures = fixtures
+        self.ticker = ticker.upper()
+
+    def history(self, period: str = "1mo", **kwargs) -> pd.DataFrame:
+        frame = self._fixtures.frames.get(self.ticker)
+        if frame is None:
+            return pd.DataFrame()
+        return frame.iloc[-PERIOD_ROWS.get(period, 252):].copy()
+
+    @property
+    def info(self) -> Dict[str, Any]:
+        return dict(self._fixtures.info.get(self.ticker, {}))
+
+
+class FixtureResponse:
+    """Stand-in for requests.Response carrying the recorded article page."""
+
+    def __init__(self, text: str):
+        self.text = text
+        self.status_code = 200
+
+    def raise_for_status(self) -> None:
+        pass
+
+
+class FixtureDDGS:
+    """Stand-in for duckduckgo_search.DDGS returning the recorded search results."""
+
+    def __init__(self, fixtures: Fixtures):
+        self._fixtures = fixtures
+
+    def text(self, query: str, max_results: int = 5):
+        return iter(self._fixtures.search_results[:max_results])
+
+
+class _CannedResponse:
+    def __init__(self, text: str):
+        self.text = text
+        self.usage_metadata = None
+
+
+class _CannedModel:
+    def __init__(self, responses: Dict[str, str]):
+        self._responses = responses
+
+    def generate_content(self, prompt: str, stream: bool = False, generation_config: Optional[Dict[str, Any]] = None,
+                         request_options: Optional[Dict[str, Any]] = None):
+        if "Answer only with YES or NO" in prompt:
+            text = self._responses["classify"]
+        elif generation_config and generation_config.get("response_mime_type") == "application/json":
+            text = self._responses["analysis_json"]
+        else:
+            text = self._responses["analysis_text"]
+        if stream:
+            return iter(_CannedResponse(text[i:i + 200]) for i in range(0, len(text), 200))
+        return _CannedResponse(text)
+
+
+class CannedLLMBackend(LLMBackend):
+    """LLM backend answering instantly with the recorded model responses."""
+
+    name = "canned"
+
+    def __init__(self, fixtures: Fixtures):
+        self._model = _CannedModel(fixtures.llm_responses)
+
+    def model(self, model_name: str) -> _CannedModel:
+        return self._model
+
+
+@contextmanager
+def offline(fixtures: Fixtures) -> Iterator[None]:
+    """Serve Yahoo Finance, web pages and web search from the fixtures inside the block."""
+    import search_tools
+    import stock_tools
+
+    saved = (stock_tools.yf.Ticker, search_tools.requests.get, search_tools.duckduckgo_search.DDGS)
+    stock_tools.yf.Ticker = lambda ticker: FixtureTicker(fixtures, ticker)
+    search_tools.requests.get = lambda url, **kwargs: FixtureResponse(fixtures.article_html)
+    search_tools.duckduckgo_search.DDGS = lambda: FixtureDDGS(fixtures)
+    try:
+        yield
+    finally:
+        stock_tools.yf.Ticker, search_tools.requests.get, search_tools.duckduckgo_search.DDGS = saved
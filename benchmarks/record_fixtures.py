@@ -0,0 +1,185 @@
+"""
+Write the fixtures the offline benchmarks run against.
+
+By default the fixtures are synthesized deterministically (a seeded random walk
+for prices, a generated news page, canned model answers), so they can be
+rebuilt anywhere. With --live, price history, ticker metadata, search results
+and the article page are recorded from Yahoo Finance, DuckDuckGo and the web.
+"""
+import argparse
+import csv
+import datetime
+import json
+import math
+import os
+import random
+import sys
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+TICKERS = ("AAPL", "MSFT", "GOOGL", "NVDA", "TSLA")
+TRADING_DAYS = 756  # three years, enough for a 200-day average over the 2y period
+SEARCH_QUERY = "Federal Reserve interest rate decision financial market impact"
+
+INFO = {
+    "AAPL": ("Apple Inc.", "Technology", "Consumer Electronics", 3.4e12, 33.1, 0.0044),
+    "MSFT": ("Microsoft Corporation", "Technology", "Software - Infrastructure", 3.1e12, 36.2, 0.0072),
+    "GOOGL": ("Alphabet Inc.", "Communication Services", "Internet Content & Information", 2.1e12, 24.5, 0.0046),
+    "NVDA": ("NVIDIA Corporation", "Technology", "Semiconductors", 2.9e12, 55.8, 0.0003),
+    "TSLA": ("Tesla, Inc.", "Consumer Cyclical", "Auto Manufacturers", 7.9e11, 68.4, None),
+}
+
+CANNED_ANALYSIS = {
+    "sentiment": "MIXED",
+    "confidence": "Medium",
+    "market_impact": "Rate-sensitive sectors may see short-term volatility while banks benefit from wider margins.",
+    "detailed_analysis": "- The Federal Reserve held rates steady but signalled two cuts later in the year\n"
+                         "- Bond yields fell after the statement while the dollar weakened\n"
+                         "- Analysts warned that sticky services inflation could delay easing",
+    "summary": "Markets welcomed the prospect of cuts, but persistent inflation keeps the outlook balanced.",
+    "recommendations": "- Watch the next CPI release\n- Favour quality balance sheets\n- Keep duration moderate",
+}
+
+
+def synthesize_history(ticker: str):
+    """Return daily OHLCV rows for a ticker: a seeded geometric random walk over business days."""
+    rng = random.Random(ticker)
+    price = 50 + rng.random() * 400
+    day = datetime.date(2022, 1, 3)
+    rows = []
+    while len(rows) < TRADING_DAYS:
+        if day.weekday() < 5:
+            change = rng.gauss(0.0004, 0.018)
+            open_price = price
+            close = price * math.exp(change)
+            high = max(open_price, close) * (1 + abs(rng.gauss(0, 0.006)))
+            low = min(open_price, close) * (1 - abs(rng.gauss(0, 0.006)))
+            volume = int(rng.lognormvariate(17, 0.35))
+            rows.append([f"{day.isoformat()} 00:00:00-05:00", round(open_price, 4), round(high, 4),
+                         round(low, 4), round(close, 4), volume, 0.0, 0.0])
+            price = close
+        day += datetime.timedelta(days=1)
+    return rows
+
+
+def synthesize_info(ticker: str, last_close: float, closes):
+    name, sector, industry, market_cap, pe_ratio, dividend_yield = INFO[ticker]
+    recent = closes[-252:]
+    return {
+        "shortName": name, "sector": sector, "industry": industry, "marketCap": market_cap,
+        "trailingPE": pe_ratio, "dividendYield": dividend_yield, "currency": "USD",
+        "fiftyTwoWeekHigh": round(max(recent), 2), "fiftyTwoWeekLow": round(min(recent), 2),
+        "regularMarketPrice": round(last_close, 2),
+    }
+
+
+def synthesize_article() -> str:
+    """Return a news page of realistic size: navigation, scripts, styles and a long article body."""
+    rng = random.Random("article")
+    words = ("the federal reserve held interest rates steady while signalling cuts later this year "
+             "bond yields fell and equities rallied as investors priced in easier policy although "
+             "analysts cautioned that services inflation remains sticky and the labour market is tight").split()
+    paragraphs = []
+    for _ in range(60):
+        sentence = " ".join(rng.choice(words) for _ in range(rng.randint(40, 90)))
+        paragraphs.append(f"<p class=\"article-body__paragraph\">{sentence.capitalize()}.</p>")
+    navigation = "".join(f"<li><a href=\"/section/{i}\">Section {i}</a></li>" for i in range(80))
+    scripts = "".join(f"<script>window.__data_{i} = {{\"id\": {i}, \"flags\": [1, 2, 3]}};</script>" for i in range(40))
+    return (
+        "<!DOCTYPE html><html><head><title>Fed holds rates, signals cuts</title>"
+        "<style>body { font-family: serif; } .article-body__paragraph { margin: 1em 0; }</style>"
+        f"{scripts}</head><body><nav><ul>{navigation}</ul></nav><main><article>"
+        "<h1>Fed holds rates steady, signals two cuts later this year</h1>"
+        + "\n".join(paragraphs)
+        + "</article></main><footer>&copy; Example News</footer></body></html>"
+    )
+
+
+def synthesize_search_results():
+    return [
+        {
+            "title": f"Fed decision coverage {i + 1}",
+            "href": f"https://news{i + 1}.example.com/markets/fed-holds-rates",
+            "body": "The Federal Reserve left its benchmark rate unchanged and pointed to two cuts this year, "
+                    "sending Treasury yields lower and stocks higher.",
+        }
+        for i in range(5)
+    ]
+
+
+def canned_llm_responses():
+    def markers(sections):
+        return "\n\n".join(
+            f"{number}. {heading}: {sections[key]}"
+            for number, (heading, key) in enumerate([
+                ("SENTIMENT", "sentiment"), ("CONFIDENCE", "confidence"), ("MARKET IMPACT", "market_impact"),
+                ("DETAILED ANALYSIS", "detailed_analysis"), ("SUMMARY", "summary"),
+                ("RECOMMENDATIONS", "recommendations"),
+            ], start=1)
+        )
+
+    structured = dict(CANNED_ANALYSIS)
+    structured["recommendations"] = [line[2:] for line in CANNED_ANALYSIS["recommendations"].split("\n")]
+    return {
+        "classify": "YES",
+        "analysis_text": markers(CANNED_ANALYSIS),
+        "analysis_json": json.dumps(structured),
+    }
+
+
+def write_history(ticker: str, rows) -> None:
+    with open(os.path.join(FIXTURES_DIR, f"history_{ticker}.csv"), "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["Date", "Open", "High", "Low", "Close", "Volume", "Dividends", "Stock Splits"])
+        writer.writerows(rows)
+
+
+def write_json(name: str, data) -> None:
+    with open(os.path.join(FIXTURES_DIR, name), "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2)
+        f.write("\n")
+
+
+def record_live(article_url: str) -> None:
+    """Record price history, metadata, search results and one article page from the live services."""
+    import requests
+    import yfinance as yf
+    from duckduckgo_search import DDGS
+
+    info = {}
+    for ticker in TICKERS:
+        stock = yf.Ticker(ticker)
+        stock.history(period="5y").tail(TRADING_DAYS).to_csv(os.path.join(FIXTURES_DIR, f"history_{ticker}.csv"))
+        info[ticker] = stock.info
+    write_json("info.json", info)
+    write_json("search_results.json", list(DDGS().text(SEARCH_QUERY, max_results=5)))
+    with open(os.path.join(FIXTURES_DIR, "article.html"), "w", encoding="utf-8") as f:
+        f.write(requests.get(article_url, timeout=10).text)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--live", action="store_true", help="Record from Yahoo Finance, DuckDuckGo and the web")
+    parser.add_argument("--article-url", default="https://www.federalreserve.gov/newsevents/pressreleases.htm",
+                        help="Page recorded as the article fixture with --live")
+    args = parser.parse_args()
+
+    os.makedirs(FIXTURES_DIR, exist_ok=True)
+    if args.live:
+        record_live(args.article_url)
+    else:
+        info = {}
+        for ticker in TICKERS:
+            rows = synthesize_history(ticker)
+            write_history(ticker, rows)
+            closes = [row[4] for row in rows]
+            info[ticker] = synthesize_info(ticker, closes[-1], closes)
+        write_json("info.json", info)
+        write_json("search_results.json", synthesize_search_results())
+        with open(os.path.join(FIXTURES_DIR, "article.html"), "w", encoding="utf-8") as f:
+            f.write(synthesize_article())
+    write_json("llm_responses.json", canned_llm_responses())
+    print(f"Fixtures written to {FIXTURES_DIR}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,213 @@
+"""
+Run the offline benchmarks and store the timings as JSON.
+
+Every hot path runs against the recorded fixtures (see record_fixtures.py), so no
+network access or API key is needed. Compare a run with an earlier one to spot
+regressions between commits:
+
+    python benchmarks/run_benchmarks.py --compare benchmarks/results/<earlier>.json
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCHMARKS_DIR))
+sys.path.insert(0, BENCHMARKS_DIR)
+
+# Answers and analyses must be recomputed on every round, not served from the caches
+os.environ["ANSWER_CACHE"] = "0"
+os.environ["LLM_CACHE_TTL"] = "0"
+os.environ.setdefault("MPLBACKEND", "Agg")
+
+from offline import CannedLLMBackend, Fixtures, offline  # noqa: E402
+
+RESULTS_DIR = os.path.join(BENCHMARKS_DIR, "results")
+
+QUERIES = [
+    "What is the current price of AAPL?",
+    "Show me a chart of Tesla stock",
+    "Compare AAPL, MSFT, and GOOGL performance",
+    "What are the RSI and MACD for NVDA?",
+    "Show me the 50-day moving average of Microsoft",
+    "How did Alphabet perform over the last 5 years?",
+    "What did Warren Buffett say in his latest annual report?",
+    "What is the market sentiment around Tesla stock?",
+    "How will the latest inflation report impact the market?",
+    "Price, RSI and a technical chart of AAPL for 6 months",
+]
+
+
+def build_benchmarks(fixtures: Fixtures) -> Dict[str, Callable[[], Any]]:
+    """Return the benchmarked calls by name; each call is one unit of work."""
+    from financial_agent import FinancialAgent
+    from query_router import STOCK_INTENT_ROUTER
+    from response_cache import ResponseCache
+    from search_tools import SearchTool
+    from sentiment_analyzer import SentimentAnalyzer
+    from stock_tools import StockTools
+
+    backend = CannedLLMBackend(fixtures)
+    analyzer = SentimentAnalyzer(cache=ResponseCache("benchmark", ttl=0), backend=backend,
+                                 sentiment_mode="llm", output_mode="json")
+    text_analyzer = SentimentAnalyzer(cache=ResponseCache("benchmark", ttl=0), backend=backend,
+                                      sentiment_mode="llm", output_mode="text")
+    search_tool = SearchTool()
+    tools = StockTools()
+    agent = FinancialAgent(search_tool=search_tool, sentiment_analyzer=analyzer, stock_tools=tools)
+
+    with offline(fixtures):
+        search_results = search_tool.search_and_consolidate(QUERIES[8])
+        stock_result = agent.handle_stock_query(QUERIES[9])
+    analysis_result = agent._analysis_result(QUERIES[8], search_results,
+                                             analyzer.analyze_sentiment(search_results, QUERIES[8]))
+    responses = fixtures.llm_responses
+
+    return {
+        "extract_tickers": lambda: [agent._extract_tickers(query) for query in QUERIES],
+        "route_stock_query": lambda: [STOCK_INTENT_ROUTER.route(query, agent._extract_tickers(query))
+                                      for query in QUERIES],
+        "handle_stock_query[price]": lambda: agent.handle_stock_query(QUERIES[0]),
+        "handle_stock_query[multi]": lambda: agent.handle_stock_query(QUERIES[9]),
+        "stock_tools.get_stock_price": lambda: tools.get_stock_price("AAPL"),
+        "stock_tools.get_stock_info": lambda: tools.get_stock_info("AAPL"),
+        "stock_tools.calculate_sma": lambda: tools.calculate_sma("AAPL", 50),
+        "stock_tools.calculate_ema": lambda: tools.calculate_ema("AAPL", 50),
+        "stock_tools.calculate_rsi": lambda: tools.calculate_rsi("AAPL"),
+        "stock_tools.calculate_macd": lambda: tools.calculate_macd("AAPL"),
+        "stock_tools.get_historical_data": lambda: tools.get_historical_data("AAPL", "1y"),
+        "stock_tools.plot_stock_price": lambda: tools.plot_stock_price("AAPL", "1y"),
+        "stock_tools.plot_technical_indicators": lambda: tools.plot_technical_indicators("AAPL", "1y"),
+        "stock_tools.compare_stocks": lambda: tools.compare_stocks(["AAPL", "MSFT", "GOOGL"], "1y"),
+        "search_tool.get_content": lambda: search_tool.get_content("https://news.example.com/fed"),
+        "search_tool.search_and_consolidate": lambda: search_tool.search_and_consolidate(QUERIES[8]),
+        "sentiment.parse_structured": lambda: analyzer._parse_structured(responses["analysis_json"]),
+        "sentiment.parse_sections": lambda: text_analyzer._parse_sections(responses["analysis_text"]),
+        "sentiment.analyze_sentiment": lambda: analyzer.analyze_sentiment(search_results, QUERIES[8]),
+        "format_response[analysis]": lambda: agent.format_response(analysis_result),
+        "format_response[stock]": lambda: agent.format_response(stock_result),
+    }
+
+
+def measure(fn: Callable[[], Any], rounds: int, min_round_time: float) -> Dict[str, Any]:
+    """
+    Time a call the way timeit does: calibrate the calls per round, then time several rounds.
+
+    Returns:
+        Per-call seconds (min, median, mean and standard deviation over the rounds),
+        the number of rounds and the calls per round
+    """
+    fn()  # warm-up: imports, lazily built indexes, font caches
+    number = 1
+    while True:
+        started = time.perf_counter()
+        for _ in range(number):
+            fn()
+        elapsed = time.perf_counter() - started
+        if elapsed >= min_round_time or number >= 10 ** 6:
+            break
+        number *= 10 if elapsed < min_round_time / 10 else 2
+
+    samples = [elapsed / number]
+    for _ in range(rounds - 1):
+        started = time.perf_counter()
+        for _ in range(number):
+            fn()
+        samples.append((time.perf_counter() - started) / number)
+    return {
+        "min": min(samples),
+        "median": statistics.median(samples),
+        "mean": statistics.fmean(samples),
+        "stdev": statistics.stdev(samples) if len(samples) > 1 else 0.0,
+        "rounds": len(samples),
+        "calls_per_round": number,
+    }
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BENCHMARKS_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except Exception:
+        return None
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> List[str]:
+    """Print the change of every benchmark against a baseline run; return the regressed ones."""
+    regressions = []
+    print(f"\n{'benchmark':<42}{'baseline':>12}{'current':>12}{'change':>10}")
+    for name, current in results["benchmarks"].items():
+        previous = baseline.get("benchmarks", {}).get(name)
+        if previous is None:
+            print(f"{name:<42}{'-':>12}{_format_seconds(current['median']):>12}{'new':>10}")
+            continue
+        change = current["median"] / previous["median"] - 1
+        flag = ""
+        if change > threshold:
+            regressions.append(name)
+            flag = "  REGRESSION"
+        print(f"{name:<42}{_format_seconds(previous['median']):>12}{_format_seconds(current['median']):>12}"
+              f"{change:>+10.1%}{flag}")
+    return regressions
+
+
+def _format_seconds(seconds: float) -> str:
+    for unit, scale in (("s", 1), ("ms", 1e-3), ("us", 1e-6)):
+        if seconds >= scale:
+            return f"{seconds / scale:.2f}{unit}"
+    return f"{seconds / 1e-9:.0f}ns"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run the offline benchmarks.")
+    parser.add_argument("-k", "--filter", help="Only run benchmarks whose name contains this text")
+    parser.add_argument("--rounds", type=int, default=5, help="Timed rounds per benchmark")
+    parser.add_argument("--min-round-time", type=float, default=0.2, help="Minimum seconds per round")
+    parser.add_argument("--output", help="Result file (default: benchmarks/results/<revision>.json)")
+    parser.add_argument("--compare", help="Earlier result file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="Median slowdown reported as a regression (default 0.10 = 10%%)")
+    args = parser.parse_args()
+
+    fixtures = Fixtures()
+    benchmarks = build_benchmarks(fixtures)
+    revision = git_revision()
+    results = {
+        "revision": revision,
+        "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "benchmarks": {},
+    }
+
+    with offline(fixtures):
+        for name, fn in benchmarks.items():
+            if args.filter and args.filter not in name:
+                continue
+            results["benchmarks"][name] = measure(fn, args.rounds, args.min_round_time)
+            print(f"{name:<42}{_format_seconds(results['benchmarks'][name]['median']):>12}")
+
+    output = args.output or os.path.join(RESULTS_DIR, f"{revision or 'latest'}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+        f.write("\n")
+    print(f"\nResults written to {output}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s): {', '.join(regressions)}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,551 @@
+import csv
+import hashlib
+import heapq
+import mmap
+import os
+import re
+import struct
+import sys
+import threading
+from array import array
+from bisect import bisect_left
+from collections import deque
+from typing import AbstractSet, Dict, FrozenSet, Iterable, List, NamedTuple, Optional, Tuple
+
+from lazy_imports import lazy_import
+
+english_words = lazy_import("english_words")
+
+DEFAULT_SYMBOL_MASTER = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "symbol_master.csv")
+DEFAULT_INDEX_CACHE = os.path.join(".cache", "entity_index.bin")
+
+INDEX_MAGIC = b"ENTIDX02"
+INDEX_HEADER = struct.Struct("<8s32sIII")  # magic, source digest, states, edges, entity table bytes
+
+# Query words never treated as misspelled company names
+FUZZY_STOPWORDS = {
+    "about", "against", "analysis", "average", "better", "chart", "company", "compare", "current", "data",
+    "does", "from", "give", "graph", "have", "historical", "index", "indicator", "indicators", "latest",
+    "market", "month", "months", "moving", "news", "over", "past", "performance", "plot", "price", "quarter",
+    "report", "sector", "share", "shares", "should", "show", "stock", "stocks", "strength", "tell", "that",
+    "their", "there", "this", "ticker", "today", "trading", "trend", "versus", "week", "weeks", "what",
+    "which", "with", "year", "years",
+}
+
+# English word list (web2) of the english-words package; query words found in it, or
+# inflections of them, are never treated as misspelled company names ("relevance", "casebook")
+ENGLISH_WORD_SOURCES = ["web2"]
+INFLECTION_SUFFIXES = ("s", "es", "d", "ed", "ing")
+
+# Aliases this short ("sbi", "lt", "axis") are everyday words or abbreviations too, so they only
+# match when written in capitals, spelled like the entity name ("Meta") or in ticker context:
+# after "$" or next to one of TICKER_CUES
+SHORT_ALIAS_LENGTH = 4
+TICKER_CUES = {"chart", "price", "quote", "share", "shares", "stock", "stocks", "ticker"}
+
+
+class Entity(NamedTuple):
+    symbol: str    # Yahoo Finance ticker, empty for people
+    exchange: str
+    kind: str      # "equity" or "person"
+    name: str
+
+
+class EntityMatch(NamedTuple):
+    start: int     # Byte offsets of the match in the UTF-8 encoded, lower-cased text
+    end: int
+    entity: Entity
+
+
+def read_symbol_master(path: str) -> List[Tuple[Entity, List[str]]]:
+    """
+    Read a symbol master CSV with symbol, exchange, kind, name and aliases columns.
+
+    Args:
+        path: Path to the CSV file (aliases are separated by semicolons)
+
+    Returns:
+        List of (entity, aliases) pairs; the entity name, its symbol ("HDFCBANK.NS") and the
+        symbol's root ("HDFCBANK") are aliases too
+    """
+    rows = []
+    with open(path, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            entity = Entity(row["symbol"].strip(), row["exchange"].strip(),
+                            (row.get("kind") or "equity").strip(), row["name"].strip())
+            aliases = [entity.name, entity.symbol, entity.symbol.split(".")[0]]
+            aliases += (row.get("aliases") or "").split(";")
+            aliases = [alias.strip().lower() for alias in aliases if alias.strip()]
+            rows.append((entity, list(dict.fromkeys(aliases))))
+    return rows
+
+
+def _is_word_byte(byte: int) -> bool:
+    # ASCII letters and digits, and any byte of a multi-byte UTF-8 character
+    return byte >= 0x80 or 48 <= byte <= 57 or 97 <= byte <= 122
+
+
+def _in_ticker_context(data: bytes, start: int, end: int) -> bool:
+    """Whether the word at data[start:end] follows "$" or is next to a ticker cue word."""
+    if start and data[start - 1] == 36:  # "$"
+        return True
+    before = re.search(rb"([a-z]+)[^a-z0-9]+$", data[max(0, start - 16):start])
+    after = re.match(rb"[^a-z0-9]+([a-z]+)", data[end:end + 16])
+    return any(word is not None and word.group(1).decode("ascii") in TICKER_CUES for word in (before, after))
+
+
+class EntityIndex:
+    """
+    Aho-Corasick automaton over company names, aliases and people.
+
+    The trie is flattened into parallel integer arrays (CSR edge lists, failure
+    links, outputs), so it can be written to disk once and mapped back in with
+    mmap instead of being rebuilt on every start. Matching is linear in the
+    length of the text regardless of how many aliases are indexed, and only
+    whole-word matches are reported. Aliases of up to SHORT_ALIAS_LENGTH
+    characters must also be written in capitals, spelled exactly like the
+    entity name, or be in ticker context.
+    """
+
+    def __init__(self, offsets, labels, targets, fail, output, depth, dict_link,
+                 entities: List[Entity], mapped: Optional[mmap.mmap] = None):
+        self._offsets = offsets
+        self._labels = labels
+        self._targets = targets
+        self._fail = fail
+        self._output = output
+        self._depth = depth
+        self._dict_link = dict_link
+        self.entities = entities
+        self._mapped = mapped
+        # Dense transition table for the root state, the busiest one
+        self._root = [0] * 256
+        for edge in range(offsets[0], offsets[1]):
+            self._root[labels[edge]] = targets[edge]
+
+    @classmethod
+    def build(cls, rows: Iterable[Tuple[Entity, List[str]]]) -> "EntityIndex":
+        """
+        Build the automaton from (entity, aliases) pairs.
+
+        Args:
+            rows: Entities with their lower-cased aliases; the first entity wins a shared alias
+
+        Returns:
+            The index
+        """
+        children: List[Dict[int, int]] = [{}]
+        output = [-1]
+        depth = [0]
+        entities: List[Entity] = []
+
+        for entity, aliases in rows:
+            entity_id = len(entities)
+            entities.append(entity)
+            for alias in aliases:
+                state = 0
+                for byte in alias.encode("utf-8"):
+                    nxt = children[state].get(byte)
+                    if nxt is None:
+                        nxt = len(children)
+                        children[state][byte] = nxt
+                        children.append({})
+                        output.append(-1)
+                        depth.append(depth[state] + 1)
+                    state = nxt
+                if output[state] == -1:
+                    output[state] = entity_id
+
+        n = len(children)
+        fail = [0] * n
+        dict_link = [-1] * n
+        queue = deque(children[0].values())
+        while queue:
+            state = queue.popleft()
+            for byte, child in children[state].items():
+                if state:
+                    f = fail[state]
+                    while f and byte not in children[f]:
+                        f = fail[f]
+                    fail[child] = children[f].get(byte, 0)
+                link = fail[child]
+                dict_link[child] = link if output[link] != -1 else dict_link[link]
+                queue.append(child)
+
+        offsets, labels, targets = array("i", [0]), array("B"), array("i")
+        for state in range(n):
+            for byte in sorted(children[state]):
+                labels.append(byte)
+                targets.append(children[state][byte])
+            offsets.append(len(labels))
+
+        return cls(offsets, labels, targets, array("i", fail), array("i", output),
+                   array("i", depth), array("i", dict_link), entities)
+
+    @classmethod
+    def from_csv(cls, path: str) -> "EntityIndex":
+        """Build the index from a symbol master CSV file."""
+        return cls.build(read_symbol_master(path))
+
+    def _next(self, state: int, byte: int) -> int:
+        """Follow the goto/failure transitions for one byte."""
+        while True:
+            if state == 0:
+                return self._root[byte]
+            lo, hi = self._offsets[state], self._offsets[state + 1]
+            if lo < hi:
+                edge = bisect_left(self._labels, byte, lo, hi)
+                if edge < hi and self._labels[edge] == byte:
+                    return self._targets[edge]
+            state = self._fail[state]
+
+    def find(self, text: str) -> List[EntityMatch]:
+        """
+        Find every whole-word alias in a text.
+
+        Args:
+            text: Text to scan
+
+        Returns:
+            Matches in the order they end in the text (case-insensitive, except for short aliases)
+        """
+        raw = text.encode("utf-8")
+        data = text.lower().encode("utf-8")
+        if len(data) != len(raw):
+            # Lower-casing changed the length of some non-ASCII character; keep offsets aligned
+            data = raw.lower()
+        size = len(data)
+        matches = []
+        state = 0
+        for position, byte in enumerate(data):
+            state = self._next(state, byte)
+            hit = state if self._output[state] != -1 else self._dict_link[state]
+            while hit > 0:
+                end = position + 1
+                start = end - self._depth[hit]
+                entity = self.entities[self._output[hit]]
+                if (start == 0 or not _is_word_byte(data[start - 1])) and \
+                        (end == size or not _is_word_byte(data[end])) and \
+                        (end - start > SHORT_ALIAS_LENGTH or raw[start:end].isupper() or
+                         raw[start:end] == entity.name.encode("utf-8") or _in_ticker_context(data, start, end)):
+                    matches.append(EntityMatch(start, end, entity))
+                hit = self._dict_link[hit]
+        return matches
+
+    def find_entities(self, text: str, kind: Optional[str] = None) -> List[Entity]:
+        """
+        Find the distinct entities mentioned in a text, in order of appearance.
+
+        Args:
+            text: Text to scan
+            kind: Only return entities of this kind ("equity" or "person")
+
+        Returns:
+            The entities, without duplicates
+        """
+        matches = sorted(self.find(text), key=lambda match: (match.start, -match.end))
+        entities = [match.entity for match in matches if kind is None or match.entity.kind == kind]
+        return list(dict.fromkeys(entities))
+
+    def save(self, path: str, digest: bytes) -> None:
+        """
+        Write the flattened automaton to a file that load() can map back in.
+
+        Args:
+            path: Destination file
+            digest: 32-byte digest of the source the index was built from
+        """
+        table = "\n".join("\t".join(entity) for entity in self.entities).encode("utf-8")
+        labels = self._labels.tobytes()
+        labels += b"\0" * (-len(labels) % 4)
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, "wb") as f:
+            f.write(INDEX_HEADER.pack(INDEX_MAGIC, digest, len(self._output), len(self._labels), len(table)))
+            f.write(self._offsets.tobytes())
+            f.write(labels)
+            for values in (self._targets, self._fail, self._output, self._depth, self._dict_link):
+                f.write(values.tobytes())
+            f.write(table)
+        os.replace(temp_path, path)
+
+    @classmethod
+    def load(cls, path: str, digest: Optional[bytes] = None) -> Optional["EntityIndex"]:
+        """
+        Map a saved index into memory.
+
+        Args:
+            path: File written by save()
+            digest: Expected source digest; a mismatching file is ignored
+
+        Returns:
+            The index, or None if the file is missing, stale or unreadable
+        """
+        try:
+            with open(path, "rb") as f:
+                mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            return None
+
+        try:
+            magic, stored_digest, states, edges, table_size = INDEX_HEADER.unpack_from(mapped, 0)
+            if magic != INDEX_MAGIC or (digest is not None and stored_digest != digest):
+                mapped.close()
+                return None
+
+            view = memoryview(mapped)
+            position = INDEX_HEADER.size
+
+            def take(count: int, fmt: str, itemsize: int):
+                nonlocal position
+                chunk = view[position:position + count * itemsize].cast(fmt)
+                position += count * itemsize
+                return chunk
+
+            offsets = take(states + 1, "i", 4)
+            labels = take(edges, "B", 1)
+            position += -edges % 4
+            targets = take(edges, "i", 4)
+            fail, output, depth, dict_link = (take(states, "i", 4) for _ in range(4))
+            table = bytes(view[position:position + table_size]).decode("utf-8")
+            entities = [Entity(*line.split("\t")) for line in table.split("\n")] if table else []
+        except Exception as e:
+            print(f"Ignoring unreadable entity index {path}: {e}")
+            return None
+
+        return cls(offsets, labels, targets, fail, output, depth, dict_link, entities, mapped)
+
+    @classmethod
+    def load_or_build(cls, source_path: str, cache_path: Optional[str] = None) -> "EntityIndex":
+        """
+        Load the cached index for a symbol master, rebuilding it when the source changed.
+
+        Args:
+            source_path: Symbol master CSV file
+            cache_path: Serialized index file (None skips the on-disk cache)
+
+        Returns:
+            The index
+        """
+        with open(source_path, "rb") as f:
+            hasher = hashlib.sha256(f.read())
+        hasher.update(INDEX_MAGIC + sys.byteorder.encode("ascii"))
+        digest = hasher.digest()
+
+        if cache_path:
+            index = cls.load(cache_path, digest)
+            if index is not None:
+                return index
+
+        index = cls.from_csv(source_path)
+        if cache_path:
+            try:
+                index.save(cache_path, digest)
+            except OSError as e:
+                print(f"Could not write entity index cache {cache_path}: {e}")
+        return index
+
+
+def _edit_distance(a: str, b: str) -> int:
+    """Optimal string alignment distance: insertions, deletions, substitutions and adjacent transpositions."""
+    previous2 = None
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], previous2[j - 2] + 1)
+        previous2, previous = previous, current
+    return previous[len(b)]
+
+
+class TrigramIndex:
+    """
+    Trigram similarity index over entity names and aliases, for misspelled or
+    partial company names that the exact index misses.
+
+    Candidates are gathered from trigram posting lists and then verified by
+    edit distance, so only close spellings are accepted: one edit for names up
+    to eight characters and for multi-word names, two for longer single words,
+    and only a swapped pair of letters for names shorter than six ("appel" is
+    Apple, "apply" is not).
+    """
+
+    def __init__(self, rows: Iterable[Tuple[Entity, List[str]]], min_token_length: int = 4,
+                 min_alias_length: int = 5, max_postings: int = 5000,
+                 dictionary: AbstractSet[str] = frozenset()):
+        """
+        Args:
+            rows: Entities with their lower-cased aliases, as returned by read_symbol_master()
+            min_token_length: Shortest query word considered for fuzzy matching
+            min_alias_length: Shortest alias indexed (shorter ones collide with everyday words)
+            max_postings: Trigrams shared by more aliases than this are skipped as uninformative,
+                which bounds the work per lookup
+            dictionary: Lower-cased dictionary words, never taken for misspelled names
+                (see load_english_words())
+        """
+        self.min_token_length = min_token_length
+        self.dictionary = dictionary
+        self.max_postings = max_postings
+        self._aliases: List[str] = []
+        self._alias_entities: List[Entity] = []
+        self._alias_trigrams: List[int] = []
+        self._postings: Dict[str, List[int]] = {}
+
+        seen = set()
+        for entity, aliases in rows:
+            for alias in aliases:
+                if alias in seen or len(alias) < min_alias_length:
+                    continue
+                seen.add(alias)
+                alias_id = len(self._aliases)
+                self._aliases.append(alias)
+                self._alias_entities.append(entity)
+                trigrams = self._trigrams(alias)
+                self._alias_trigrams.append(len(trigrams))
+                for trigram in trigrams:
+                    self._postings.setdefault(trigram, []).append(alias_id)
+
+    @staticmethod
+    def _trigrams(text: str) -> set:
+        padded = f"  {text} "
+        return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+    def lookup(self, text: str, k: int = 5, kind: Optional[str] = None) -> List[Tuple[Entity, float, str]]:
+        """
+        Find the entities whose names or aliases are closest to a piece of text.
+
+        Args:
+            text: A word or short phrase from the query
+            k: Maximum number of results
+            kind: Only return entities of this kind ("equity" or "person")
+
+        Returns:
+            Up to k (entity, similarity, alias) tuples, best first
+        """
+        text = text.lower()
+        trigrams = self._trigrams(text)
+        shared: Dict[int, int] = {}
+        for trigram in trigrams:
+            postings = self._postings.get(trigram)
+            if postings is None or len(postings) > self.max_postings:
+                continue
+            for alias_id in postings:
+                shared[alias_id] = shared.get(alias_id, 0) + 1
+
+        # Verify only the aliases sharing the most trigrams (Dice coefficient)
+        candidates = heapq.nlargest(
+            k * 4, shared.items(),
+            key=lambda item: 2 * item[1] / (len(trigrams) + self._alias_trigrams[item[0]])
+        )
+
+        results = {}
+        for alias_id, _ in candidates:
+            entity = self._alias_entities[alias_id]
+            alias = self._aliases[alias_id]
+            if kind is not None and entity.kind != kind:
+                continue
+            if abs(len(alias) - len(text)) > 2:
+                continue
+            distance = _edit_distance(text, alias)
+            if len(alias) < 6:
+                accepted = distance == 1 and sorted(text) == sorted(alias)
+            else:
+                accepted = distance <= (1 if len(alias) <= 8 or " " in alias else 2)
+            score = 1 - distance / max(len(text), len(alias))
+            if accepted and score > results.get(entity, (0.0, ""))[0]:
+                results[entity] = (score, alias)
+
+        ranked = sorted(results.items(), key=lambda item: item[1][0], reverse=True)[:k]
+        return [(entity, score, alias) for entity, (score, alias) in ranked]
+
+    def is_dictionary_word(self, word: str) -> bool:
+        """Whether a lower-cased word, or the stem of an inflected word ("nestled"), is in the dictionary."""
+        if word in self.dictionary:
+            return True
+        return any(word.endswith(suffix) and word[:-len(suffix)] in self.dictionary
+                   for suffix in INFLECTION_SUFFIXES)
+
+    def resolve(self, query: str, kind: Optional[str] = "equity", stock_context: bool = False) -> List[Entity]:
+        """
+        Resolve the misspelled entity names in a query.
+
+        Each query word of at least min_token_length characters, and each pair of
+        adjacent words, is looked up unless it consists of dictionary words only;
+        the best match per phrase is kept. Queries are only resolved in stock
+        context: when stock_context is set (the caller routed a stock intent), the
+        query has a ticker cue ("chart", "price", "shares", ...) or it is just a
+        name of one or two words.
+
+        Args:
+            query: The user query
+            kind: Only return entities of this kind
+            stock_context: Whether the query was routed as a stock query
+
+        Returns:
+            The distinct entities found, in query order
+        """
+        words = [word.strip(".-") for word in re.findall(r"[a-z0-9&.\-]+", query.lower())]
+        words = [word for word in words if word]
+        if not (stock_context or len(words) <= 2 or any(word in TICKER_CUES for word in words)):
+            return []
+
+        plain = [word in FUZZY_STOPWORDS or self.is_dictionary_word(word) for word in words]
+        phrases = []
+        for i, word in enumerate(words):
+            if word in FUZZY_STOPWORDS:
+                continue
+            if len(word) >= self.min_token_length and not plain[i]:
+                phrases.append(word)
+            if i + 1 < len(words) and words[i + 1] not in FUZZY_STOPWORDS and not (plain[i] and plain[i + 1]):
+                phrases.append(f"{word} {words[i + 1]}")
+
+        entities = []
+        for phrase in phrases:
+            matches = self.lookup(phrase, k=1, kind=kind)
+            if matches:
+                entities.append(matches[0][0])
+        return list(dict.fromkeys(entities))
+
+
+def load_english_words() -> FrozenSet[str]:
+    """Return the lower-cased English word list used to tell dictionary words from misspelled names."""
+    return frozenset(english_words.get_english_words_set(ENGLISH_WORD_SOURCES, lower=True, alpha=True))
+
+
+_index: Optional[EntityIndex] = None
+_fuzzy_index: Optional[TrigramIndex] = None
+_index_lock = threading.Lock()
+
+
+def get_entity_index() -> EntityIndex:
+    """
+    Return the process-wide entity index, loading it on first use.
+
+    The symbol master and cache locations come from the SYMBOL_MASTER_PATH and
+    ENTITY_INDEX_CACHE settings.
+    """
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                source_path = os.getenv("SYMBOL_MASTER_PATH") or DEFAULT_SYMBOL_MASTER
+                cache_path = os.getenv("ENTITY_INDEX_CACHE", DEFAULT_INDEX_CACHE)
+                _index = EntityIndex.load_or_build(source_path, cache_path or None)
+    return _index
+
+
+def get_fuzzy_index() -> TrigramIndex:
+    """Return the process-wide trigram index over the symbol master, building it on first use."""
+    global _fuzzy_index
+    if _fuzzy_index is None:
+        with _index_lock:
+            if _fuzzy_index is None:
+                source_path = os.getenv("SYMBOL_MASTER_PATH") or DEFAULT_SYMBOL_MASTER
+                _fuzzy_index = TrigramIndex(read_symbol_master(source_path), dictionary=load_english_words())
+    return _fuzzy_index
@@ -0,0 +1,29 @@
+# Example queries shown in the app, by category (also the default pre-warm set)
+EXAMPLE_QUERIES = {
+    "Market Sentiment": [
+        "What did Warren Buffett say in his latest annual report?",
+        "What is the market sentiment around Tesla stock?",
+        "How have Elon Musk's recent tweets affected the crypto market?"
+    ],
+    "Stock Data": [
+        "What is the current price of AAPL?",
+        "Show me a chart of Tesla stock",
+        "Compare AAPL, MSFT, and GOOGL performance",
+        "What are the technical indicators for NVDA?"
+    ],
+    "Financial News": [
+        "What is the latest news about the Federal Reserve?",
+        "How will the latest inflation report impact the market?",
+        "What are analysts saying about the tech sector?"
+    ],
+    "Quick Info": [
+        "What is the ticker symbol for Apple?",
+        "What is market capitalization?",
+        "What is P/E ratio?"
+    ]
+}
+
+
+def all_example_queries():
+    """Return every example query, in display order."""
+    return [query for examples in EXAMPLE_QUERIES.values() for query in examples]
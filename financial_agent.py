@@ -1,20 +1,44 @@
 from search_tools import SearchTool
-from sentiment_analyzer import SentimentAnalyzer
-from stock_tools import StockTools
-from typing import Dict, Any, Optional, List, Union
+from sentiment_analyzer import SentimentAnalyzer, SENTIMENT_LABELS
+from stock_tools import StockTools, shared_fetches
+from response_cache import normalize_query
+from query_router import STOCK_INTENT_ROUTER, QueryIntent
+from entity_index import get_entity_index, get_fuzzy_index
+from answer_cache import answer_class, stock_answer_key, report_answer_key
+from typing import Dict, Any, Optional, List, Union, Callable, Tuple, Iterator
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from shared_tools import get_search_tool, get_sentiment_analyzer, get_stock_tools, get_stock_executor, get_answer_cache
+from llm_metrics import METRICS
+from tracing import trace, span, current_trace_id
+from query_jobs import QueryCancelled, check_cancelled, report_progress
+import asyncio
+import contextvars
 import re
+import time
+
+# All-caps words in queries that are not tickers
+NON_TICKER_WORDS = {"RSI", "MACD", "SMA", "EMA", "CEO", "CFO", "IPO", "ETF", "EPS", "GDP", "YTD", "USD", "INR", "NSE", "BSE"}
 
 class FinancialAgent:
     """
     Financial sentiment analysis agent that coordinates searching and sentiment analysis.
     """
     
-    def __init__(self):
-        self.search_tool = SearchTool()
-        self.sentiment_analyzer = SentimentAnalyzer()
-        self.stock_tools = StockTools()
-        # Add memory for conversation history
+    def __init__(self, search_tool: Optional[SearchTool] = None,
+                 sentiment_analyzer: Optional[SentimentAnalyzer] = None,
+                 stock_tools: Optional[StockTools] = None):
+        # The tools are stateless and shared process-wide; an agent only holds its conversation state
+        self.search_tool = search_tool or get_search_tool()
+        self.sentiment_analyzer = sentiment_analyzer or get_sentiment_analyzer()
+        self.stock_tools = stock_tools or get_stock_tools()
+        # Bounded pool for the independent parts of a stock query
+        self.stock_executor = get_stock_executor()
+        # Complete answers, fresh for as long as their kind of data allows
+        self.answer_cache = get_answer_cache()
+        # Add memory for conversation history; each exchange is numbered, so a view
+        # can render only the exchanges it hasn't seen yet
         self.conversation_history = []
+        self._history_seq = 0
         self.context = {
             "last_entity": None,  # Last entity mentioned (person, company, etc.)
             "last_topic": None,   # Last topic discussed
@@ -22,110 +46,434 @@ class FinancialAgent:
             "last_response": None # Last response given
         }
         
-    def handle_query(self, query: str) -> Dict[str, Any]:
+    def handle_query(self, query: str, on_partial: Optional[Callable[[Dict[str, Any]], None]] = None) -> Dict[str, Any]:
         """
         Handle a user query.
         
+        Runs the stages one after the other: follow-up rewrite, relevance check,
+        stock routing, simple answers, search, sentiment analysis and entity update.
+        Stock answers and researched reports are served from the answer cache while
+        fresh; the conversation context is updated either way.
+        
         Args:
             query: The user query
+            on_partial: Optional callback receiving partial analysis sections while
+                the sentiment analysis is still streaming
             
         Returns:
-            Dictionary containing the response
+            Dictionary containing the response, with per-stage timings under "stage_timings"
+            and the ID of the request's trace under "trace_id"
+            
+        Raises:
+            QueryCancelled: If the query runs as a QueryJob that was cancelled
         """
+        with trace("handle_query", query=query):
+            return self._handle_query(query, on_partial)
+    
+    def _handle_query(self, query: str, on_partial: Optional[Callable[[Dict[str, Any]], None]]) -> Dict[str, Any]:
+        timings = []
         try:
-            # Update context with current query
-            self.context["last_query"] = query
-            
-            # Check if this is a follow-up question
-            if self._is_follow_up_question(query):
-                # Enhance query with context
-                enhanced_query = self._enhance_query_with_context(query)
-                print(f"Enhanced query with context: {enhanced_query}")
-                query = enhanced_query
+            query = self._run_stage(timings, "rewrite", self._stage_rewrite, query)
             
             # Check if query is finance-related
-            if not self.sentiment_analyzer.is_finance_related(query):
-                return {
-                    "is_finance_related": False,
-                    "is_report_query": False,
-                    "response": "I can only help you with finance, business, or market related queries."
-                }
+            if not self._run_stage(timings, "relevance", self._stage_relevance, query):
+                return self._with_timings(self._not_finance_result(), timings)
             
             # Check if it's a stock query
-            stock_result = self.handle_stock_query(query)
+            stock_result = self._run_stage(timings, "stock", self._stage_stock, query)
             if stock_result:
-                # Update context with stock information
-                if "ticker" in stock_result:
-                    self.context["last_entity"] = stock_result.get("ticker")
-                    self.context["last_topic"] = "stock"
-                return stock_result
+                return self._with_timings(stock_result, timings)
             
             # Simple factual queries that don't need web search
-            simple_answer = self.handle_simple_query(query)
-            if simple_answer:
-                # Update context with simple query information
-                self._update_context_from_simple_query(query, simple_answer)
-                return {
-                    "is_finance_related": True,
-                    "is_simple_query": True,
-                    "is_report_query": False,
-                    "response": simple_answer
-                }
-            
-            # Identify if this is a report query or a normal question
-            is_report_query = self._is_report_query(query)
+            simple_result = self._run_stage(timings, "simple", self._stage_simple, query)
+            if simple_result:
+                return self._with_timings(simple_result, timings)
+            
+            # For complex queries, search the web unless the report is cached
+            result = self._run_stage(timings, "answer_cache", self._stage_cached_report, query)
+            if result is None:
+                result = self._research(timings, query, on_partial)
+                self.answer_cache.store("report", report_answer_key(query), result, self._is_cacheable_report)
+            if "analysis" in result:
+                self._run_stage(timings, "entities", self._stage_entities, query,
+                                result["search_results"], result["analysis"])
+            return self._with_timings(result, timings)
+        except QueryCancelled:
+            raise
+        except Exception as e:
+            return self._with_timings(self._error_result(e), timings)
+    
+    async def ahandle_query(self, query: str,
+                            on_partial: Optional[Callable[[Dict[str, Any]], None]] = None) -> Dict[str, Any]:
+        """
+        Handle a user query with independent stages overlapping.
+        
+        The relevance check runs while the query is routed to the stock and simple
+        answer stages and while the web search runs; its verdict is awaited before
+        any answer is returned and before the sentiment analysis starts. Blocking
+        stages run in worker threads.
+        
+        Args:
+            query: The user query
+            on_partial: Optional callback receiving partial analysis sections while
+                the sentiment analysis is still streaming
             
-            # For complex queries, search the web
-            print(f"Searching for: {query}")
-            search_results = self.search_tool.search_and_consolidate(query)
-            print(f"Got {len(search_results.split())} words of search results")
+        Returns:
+            Dictionary containing the response, with per-stage timings under "stage_timings"
+            and the ID of the request's trace under "trace_id"
+        """
+        with trace("ahandle_query", query=query):
+            return await self._ahandle_query(query, on_partial)
+    
+    async def _ahandle_query(self, query: str,
+                             on_partial: Optional[Callable[[Dict[str, Any]], None]]) -> Dict[str, Any]:
+        timings = []
+        relevance = None
+        try:
+            query = await self._arun_stage(timings, "rewrite", self._stage_rewrite, query)
+            relevance = asyncio.ensure_future(self._arun_stage(timings, "relevance", self._stage_relevance, query))
+            
+            stock_result = await self._arun_stage(timings, "stock", self._stage_stock, query)
+            simple_result = None
+            if not stock_result:
+                simple_result = await self._arun_stage(timings, "simple", self._stage_simple, query)
+            
+            if stock_result or simple_result:
+                if not await relevance:
+                    return self._with_timings(self._not_finance_result(), timings)
+                return self._with_timings(stock_result or simple_result, timings)
+            
+            cached = await self._arun_stage(timings, "answer_cache", self._stage_cached_report, query)
+            if cached is not None:
+                if not await relevance:
+                    return self._with_timings(self._not_finance_result(), timings)
+                result = cached
+            else:
+                # Search while the relevance check may still be running
+                search = asyncio.ensure_future(self._arun_stage(timings, "search", self._stage_search, query))
+                if not await relevance:
+                    search.cancel()
+                    return self._with_timings(self._not_finance_result(), timings)
+                
+                search_results = await search
+                if not self._has_search_results(search_results):
+                    return self._with_timings(self._no_results_result(), timings)
+                
+                analysis = await self._arun_stage(timings, "sentiment", self._stage_sentiment,
+                                                  search_results, query, on_partial)
+                result = self._analysis_result(query, search_results, analysis)
+                self.answer_cache.store("report", report_answer_key(query), result, self._is_cacheable_report)
+            
+            await self._arun_stage(timings, "entities", self._stage_entities, query,
+                                   result["search_results"], result["analysis"])
+            return self._with_timings(result, timings)
+        except Exception as e:
+            if relevance is not None and not relevance.done():
+                relevance.cancel()
+            if isinstance(e, QueryCancelled):
+                raise
+            return self._with_timings(self._error_result(e), timings)
+    
+    def handle_queries(self, queries: List[str], max_concurrency: int = 8) -> Iterator[Dict[str, Any]]:
+        """
+        Handle a batch of independent queries, such as the prompts of a watchlist report.
+        
+        All queries are planned first: queries asking for the same thing (the same
+        routed stock intent or the same normalized question) run only once. The
+        remaining queries run concurrently, each with its own conversation context,
+        and share every download made during the batch; identical model calls are
+        coalesced by the caches. Results are yielded as soon as they are ready.
+        
+        Args:
+            queries: The user queries
+            max_concurrency: Maximum number of queries running at once
             
-            if not search_results or search_results == "No information found. Please try a different query or check your internet connection.":
+        Yields:
+            Query results in completion order, each with the "query", its "index" in
+            queries, its "stage_timings" and a "batch_timing" (queued, start, end,
+            duration and the number of duplicate queries it also answered)
+        """
+        plan: Dict[str, List[int]] = {}
+        for index, query in enumerate(queries):
+            plan.setdefault(self._plan_key(query), []).append(index)
+        
+        def run(query):
+            started = time.time()
+            result = self._batch_agent().handle_query(query)
+            return result, started, time.time()
+        
+        queued = time.time()
+        executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="batch-query")
+        
+        def submit_all():
+            # Each query runs in its own copy of the context, which shares the batch's fetch memo
+            with shared_fetches():
                 return {
-                    "is_finance_related": True,
-                    "is_simple_query": False,
-                    "is_report_query": False,
-                    "error": True,
-                    "response": "I couldn't find any relevant information for your query. Please try rephrasing or ask about a more specific financial topic."
+                    executor.submit(contextvars.copy_context().run, run, queries[indices[0]]): indices
+                    for indices in plan.values()
                 }
+        
+        try:
+            futures = contextvars.copy_context().run(submit_all)
+            for future in as_completed(futures):
+                result, started, ended = future.result()
+                indices = futures[future]
+                for index in indices:
+                    yield dict(result, query=queries[index], index=index, batch_timing={
+                        "queued": round(queued, 4),
+                        "start": round(started, 4),
+                        "end": round(ended, 4),
+                        "duration": round(ended - started, 4),
+                        "duplicates": len(indices) - 1
+                    })
+        finally:
+            executor.shutdown(cancel_futures=True)
+    
+    def _plan_key(self, query: str) -> str:
+        """Key under which equivalent queries of a batch are answered once."""
+        slot = self._answer_slot(query)
+        return slot[1] if slot else normalize_query(query)
+    
+    def cached_answer_state(self, query: str) -> Optional[Tuple[str, str]]:
+        """
+        Look up how fresh the cached answer to a query is, without computing it.
+        
+        Args:
+            query: The user query
             
-            # Analyze sentiment
-            print("Analyzing sentiment...")
-            analysis = self.sentiment_analyzer.analyze_sentiment(search_results, query)
-            print(f"Analysis complete with sentiment: {analysis.get('sentiment', 'UNKNOWN')}")
-            
-            # Extract entities from the query and update context
-            self._extract_and_update_entities(query, search_results)
-            
-            # Store the conversation in history
-            self.conversation_history.append({
-                "query": query,
-                "response": analysis.get("summary", ""),
-                "entities": self.context["last_entity"]
-            })
-            
-            # Limit conversation history to last 10 exchanges
-            if len(self.conversation_history) > 10:
-                self.conversation_history = self.conversation_history[-10:]
+        Returns:
+            Tuple of (answer class, "fresh", "stale" or "miss"), or None for
+            queries whose answers are never cached
+        """
+        slot = self._answer_slot(query)
+        if slot is None:
+            return None
+        name, key, _ = slot
+        return name, self.answer_cache.state(name, key)
+    
+    def refresh_answer(self, query: str) -> Optional[Dict[str, Any]]:
+        """
+        Recompute the answer to a query and store it in the answer cache.
+        
+        Used to pre-warm the cache; the conversation context is left untouched.
+        
+        Args:
+            query: The user query
             
-            return {
-                "is_finance_related": True,
-                "is_simple_query": False,
-                "is_report_query": is_report_query,
-                "search_results": search_results,
-                "analysis": analysis
-            }
-        except Exception as e:
-            print(f"Error handling query: {e}")
-            import traceback
-            traceback.print_exc()
-            return {
-                "is_finance_related": True,
-                "is_simple_query": False,
-                "is_report_query": False,
-                "error": True,
-                "response": f"An error occurred while processing your query: {str(e)}"
-            }
+        Returns:
+            The answer, or None for queries whose answers are never cached
+        """
+        slot = self._answer_slot(query)
+        if slot is None:
+            return None
+        name, key, intent = slot
+        if intent is not None:
+            answer = self._answer_stock_intent(intent)
+            self.answer_cache.store(name, key, answer, self._is_cacheable_stock_answer, intent)
+        else:
+            answer = self._research([], query)
+            self.answer_cache.store(name, key, answer, self._is_cacheable_report)
+        return answer
+    
+    def _answer_slot(self, query: str) -> Optional[Tuple[str, str, Optional[QueryIntent]]]:
+        """Answer class, cache key and (for stock queries) routed intent of a query; None if never cached."""
+        intent = STOCK_INTENT_ROUTER.route(query, self._extract_tickers(query))
+        if intent.kind is not None:
+            return answer_class(intent), stock_answer_key(intent), intent
+        if self.handle_simple_query(query):
+            return None
+        return "report", report_answer_key(query), None
+    
+    def _batch_agent(self) -> "FinancialAgent":
+        """A fresh agent on the same tools, so batch queries aren't read as follow-ups of each other."""
+        return FinancialAgent(self.search_tool, self.sentiment_analyzer, self.stock_tools)
+    
+    def _run_stage(self, timings: List[Dict[str, Any]], stage: str, fn: Callable[..., Any], *args) -> Any:
+        """Run one pipeline stage and record its start, end and duration (a cancellation point)."""
+        check_cancelled()
+        report_progress("stage_started", stage=stage)
+        started = time.time()
+        try:
+            with span(f"stage.{stage}"):
+                return fn(*args)
+        finally:
+            self._record_stage(timings, stage, started, time.time())
+    
+    async def _arun_stage(self, timings: List[Dict[str, Any]], stage: str, fn: Callable[..., Any], *args) -> Any:
+        """Run one blocking pipeline stage in a worker thread and record its timing (a cancellation point)."""
+        check_cancelled()
+        report_progress("stage_started", stage=stage)
+        started = time.time()
+        try:
+            with span(f"stage.{stage}"):
+                return await asyncio.to_thread(fn, *args)
+        finally:
+            self._record_stage(timings, stage, started, time.time())
+    
+    def _record_stage(self, timings: List[Dict[str, Any]], stage: str, started: float, ended: float) -> None:
+        timings.append({
+            "stage": stage,
+            "start": round(started, 4),
+            "end": round(ended, 4),
+            "duration": round(ended - started, 4)
+        })
+        METRICS.record_stage(stage, ended - started)
+        report_progress("stage_finished", stage=stage, duration=round(ended - started, 4))
+    
+    def _with_timings(self, result: Dict[str, Any], timings: List[Dict[str, Any]]) -> Dict[str, Any]:
+        # A copy: the result may be the answer just stored in the answer cache
+        result = dict(result)
+        result["stage_timings"] = sorted(timings, key=lambda timing: timing["start"])
+        trace_id = current_trace_id()
+        if trace_id:
+            result["trace_id"] = trace_id
+        return result
+    
+    def _stage_rewrite(self, query: str) -> str:
+        """Remember the query and resolve references to the previous exchange."""
+        # Update context with current query
+        self.context["last_query"] = query
+        
+        # Check if this is a follow-up question
+        if self._is_follow_up_question(query):
+            # Enhance query with context
+            enhanced_query = self._enhance_query_with_context(query)
+            print(f"Enhanced query with context: {enhanced_query}")
+            query = enhanced_query
+        return query
+    
+    def _stage_relevance(self, query: str) -> bool:
+        """Check whether the query is about finance, business or markets."""
+        return self.sentiment_analyzer.is_finance_related(query)
+    
+    def _stage_stock(self, query: str) -> Optional[Dict[str, Any]]:
+        """Answer the query from stock data, if it is a stock query."""
+        stock_result = self.handle_stock_query(query)
+        if stock_result and "ticker" in stock_result:
+            # Update context with stock information
+            self.context["last_entity"] = stock_result.get("ticker")
+            self.context["last_topic"] = "stock"
+        return stock_result
+    
+    def _stage_simple(self, query: str) -> Optional[Dict[str, Any]]:
+        """Answer simple factual queries that don't need web search."""
+        simple_answer = self.handle_simple_query(query)
+        if not simple_answer:
+            return None
+        
+        # Update context with simple query information
+        self._update_context_from_simple_query(query, simple_answer)
+        return {
+            "is_finance_related": True,
+            "is_simple_query": True,
+            "is_report_query": False,
+            "response": simple_answer
+        }
+    
+    def _stage_cached_report(self, query: str) -> Optional[Dict[str, Any]]:
+        """Return the cached report for the query, refreshing it in the background when stale."""
+        return self.answer_cache.lookup(
+            "report", report_answer_key(query), self._is_cacheable_report,
+            refresh=lambda: self._research([], query),
+            on_lookup=lambda state: METRICS.record_cache("report_answer", state)
+        )
+    
+    def _research(self, timings: List[Dict[str, Any]], query: str,
+                  on_partial: Optional[Callable[[Dict[str, Any]], None]] = None) -> Dict[str, Any]:
+        """Search the web and analyze the sentiment of the results."""
+        search_results = self._run_stage(timings, "search", self._stage_search, query)
+        if not self._has_search_results(search_results):
+            return self._no_results_result()
+        
+        analysis = self._run_stage(timings, "sentiment", self._stage_sentiment, search_results, query, on_partial)
+        return self._analysis_result(query, search_results, analysis)
+    
+    def _is_cacheable_report(self, result: Dict[str, Any]) -> bool:
+        """Only complete analyses by the model are cached, not errors or offline fallbacks."""
+        analysis = result.get("analysis")
+        return (analysis is not None and analysis.get("sentiment") in SENTIMENT_LABELS
+                and not analysis.get("fallback"))
+    
+    def _stage_search(self, query: str) -> str:
+        """Search the web and consolidate the results."""
+        print(f"Searching for: {query}")
+        search_results = self.search_tool.search_and_consolidate(query)
+        print(f"Got {len(search_results.split())} words of search results")
+        return search_results
+    
+    def _stage_sentiment(self, search_results: str, query: str,
+                         on_partial: Optional[Callable[[Dict[str, Any]], None]] = None) -> Dict[str, Any]:
+        """Analyze the sentiment of the search results, streaming sections if requested."""
+        print("Analyzing sentiment...")
+        if on_partial is not None:
+            analysis = {}
+            for partial in self.sentiment_analyzer.analyze_sentiment_stream(search_results, query):
+                # Stopping here closes the stream, so a cancelled analysis frees its worker
+                check_cancelled()
+                analysis = partial
+                on_partial(partial)
+        else:
+            analysis = self.sentiment_analyzer.analyze_sentiment(search_results, query)
+        print(f"Analysis complete with sentiment: {analysis.get('sentiment', 'UNKNOWN')}")
+        return analysis
+    
+    def _stage_entities(self, query: str, search_results: str, analysis: Dict[str, Any]) -> None:
+        """Update the conversation context and history after an analysis."""
+        # Extract entities from the query and update context
+        self._extract_and_update_entities(query, search_results)
+        
+        # Store the conversation in history
+        self._history_seq += 1
+        self.conversation_history.append({
+            "seq": self._history_seq,
+            "query": query,
+            "response": analysis.get("summary", ""),
+            "entities": self.context["last_entity"]
+        })
+        
+        # Limit conversation history to last 10 exchanges
+        if len(self.conversation_history) > 10:
+            self.conversation_history = self.conversation_history[-10:]
+    
+    def _has_search_results(self, search_results: str) -> bool:
+        return bool(search_results) and search_results != "No information found. Please try a different query or check your internet connection."
+    
+    def _not_finance_result(self) -> Dict[str, Any]:
+        return {
+            "is_finance_related": False,
+            "is_report_query": False,
+            "response": "I can only help you with finance, business, or market related queries."
+        }
+    
+    def _no_results_result(self) -> Dict[str, Any]:
+        return {
+            "is_finance_related": True,
+            "is_simple_query": False,
+            "is_report_query": False,
+            "error": True,
+            "response": "I couldn't find any relevant information for your query. Please try rephrasing or ask about a more specific financial topic."
+        }
+    
+    def _analysis_result(self, query: str, search_results: str, analysis: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "is_finance_related": True,
+            "is_simple_query": False,
+            "is_report_query": self._is_report_query(query),
+            "search_results": search_results,
+            "analysis": analysis
+        }
+    
+    def _error_result(self, error: Exception) -> Dict[str, Any]:
+        print(f"Error handling query: {error}")
+        import traceback
+        traceback.print_exc()
+        return {
+            "is_finance_related": True,
+            "is_simple_query": False,
+            "is_report_query": False,
+            "error": True,
+            "response": f"An error occurred while processing your query: {str(error)}"
+        }
     
     def _is_follow_up_question(self, query: str) -> bool:
         """
@@ -201,32 +549,11 @@ class FinancialAgent:
             self.context["last_topic"] = "stock"
             return
         
-        # Extract company names
-        company_names = [
-            "Apple", "Microsoft", "Amazon", "Google", "Alphabet", "Facebook", "Meta",
-            "Tesla", "Netflix", "Nvidia", "Walmart", "Disney", "Coca-Cola", "IBM",
-            "Intel", "Alibaba", "AMD", "Nike", "JP Morgan", "Bank of America",
-            "Goldman Sachs", "Pfizer", "Johnson & Johnson"
-        ]
-        
-        for company in company_names:
-            if company.lower() in query.lower():
-                self.context["last_entity"] = company
-                self.context["last_topic"] = "company"
-                return
-        
         # Extract person names
-        person_names = [
-            "Elon Musk", "Warren Buffett", "Jeff Bezos", "Mark Zuckerberg",
-            "Tim Cook", "Satya Nadella", "Jerome Powell", "Janet Yellen",
-            "Ray Dalio", "Cathie Wood", "Peter Lynch", "George Soros"
-        ]
-        
-        for person in person_names:
-            if person.lower() in query.lower():
-                self.context["last_entity"] = person
-                self.context["last_topic"] = "person"
-                return
+        people = get_entity_index().find_entities(query, kind="person")
+        if people:
+            self.context["last_entity"] = people[0].name
+            self.context["last_topic"] = "person"
     
     def _update_context_from_simple_query(self, query: str, answer: str) -> None:
         """
@@ -240,20 +567,9 @@ class FinancialAgent:
         
         # Extract ticker information
         if "ticker" in query_lower:
-            if "apple" in query_lower:
-                self.context["last_entity"] = "AAPL"
-                self.context["last_topic"] = "stock"
-            elif "microsoft" in query_lower:
-                self.context["last_entity"] = "MSFT"
-                self.context["last_topic"] = "stock"
-            elif "google" in query_lower:
-                self.context["last_entity"] = "GOOGL"
-                self.context["last_topic"] = "stock"
-            elif "amazon" in query_lower:
-                self.context["last_entity"] = "AMZN"
-                self.context["last_topic"] = "stock"
-            elif "tesla" in query_lower:
-                self.context["last_entity"] = "TSLA"
+            companies = get_entity_index().find_entities(query, kind="equity")
+            if companies:
+                self.context["last_entity"] = companies[0].symbol
                 self.context["last_topic"] = "stock"
         
         # Extract financial terms
@@ -265,24 +581,50 @@ class FinancialAgent:
     def handle_stock_query(self, query: str) -> Optional[Dict[str, Any]]:
         """
         Handle queries related to stocks and stock data.
+        
+        Answers are cached under their routed intent: quotes for seconds, indicators
+        and charts until their latest price bar closes, historical statistics for a day.
         """
-        query_lower = query.lower()
+        # Route the query in a single scan, tickers are extracted separately
+        intent = STOCK_INTENT_ROUTER.route(query, self._extract_tickers(query))
+        if intent.kind is None:
+            return None
         
-        # Extract potential stock tickers from query
-        tickers = self._extract_tickers(query)
+        return self.answer_cache.get_or_compute(
+            answer_class(intent), stock_answer_key(intent),
+            lambda: self._answer_stock_intent(intent),
+            cache_if=self._is_cacheable_stock_answer,
+            on_lookup=lambda state: METRICS.record_cache("stock_answer", state),
+            intent=intent
+        )
+    
+    def _is_cacheable_stock_answer(self, result: Dict[str, Any]) -> bool:
+        """Failed answers, and multi-part answers missing a part, are not cached."""
+        return not result.get("error") and not result.get("unavailable_parts")
+    
+    def _answer_stock_intent(self, intent: QueryIntent) -> Optional[Dict[str, Any]]:
+        """Compute the answer to a routed stock query."""
+        tickers = intent.tickers
+        
+        # Multi-part query (e.g. price, RSI and chart together)
+        if intent.kind == "multi":
+            return self._handle_multi_part_query(intent)
         
         # Stock price query
-        if ("stock price" in query_lower or "price of" in query_lower or "current price" in query_lower or 
-            "trading at" in query_lower or "what is the price" in query_lower) and tickers:
+        if intent.kind == "price":
             ticker = tickers[0]
-            price_data = self.stock_tools.get_stock_price(ticker)
-            info_data = self.stock_tools.get_stock_info(ticker)
+            results, _ = self._run_stock_tasks({
+                "quote": (self.stock_tools.get_stock_price, (ticker,)),
+                "info": (self.stock_tools.get_stock_info, (ticker,))
+            })
+            price_data, info_data = results["quote"], results["info"]
             
             if "error" in price_data:
                 return {
                     "is_finance_related": True,
                     "is_stock_query": True,
                     "is_simple_query": True,
+                    "error": True,
                     "response": f"Sorry, I couldn't get the stock price for {ticker}. {price_data['error']}"
                 }
             
@@ -295,15 +637,7 @@ class FinancialAgent:
             response += f"**Current Price**: ${price} {currency}\n\n"
             
             # Add additional info if available
-            if not "error" in info_data:
-                if info_data.get("sector"):
-                    response += f"**Sector**: {info_data.get('sector')}\n\n"
-                if info_data.get("market_cap_formatted"):
-                    response += f"**Market Cap**: {info_data.get('market_cap_formatted')}\n\n"
-                if info_data.get("pe_ratio"):
-                    response += f"**P/E Ratio**: {info_data.get('pe_ratio'):.2f}\n\n"
-                if info_data.get("dividend_yield"):
-                    response += f"**Dividend Yield**: {info_data.get('dividend_yield')}%\n\n"
+            response += self._format_company_info(info_data)
             
             return {
                 "is_finance_related": True,
@@ -314,33 +648,12 @@ class FinancialAgent:
             }
             
         # Stock chart query
-        if ("chart" in query_lower or "graph" in query_lower or "plot" in query_lower or 
-            "performance" in query_lower or "trend" in query_lower or "historical" in query_lower) and tickers:
+        if intent.kind == "chart":
             ticker = tickers[0]
-            
-            # Determine the period
-            period = "1y"  # default 1 year
-            if "day" in query_lower or "24 hour" in query_lower or "today" in query_lower:
-                period = "1d"
-            elif "week" in query_lower:
-                period = "1wk"
-            elif "month" in query_lower:
-                period = "1mo"
-            elif "3 month" in query_lower or "quarter" in query_lower:
-                period = "3mo"
-            elif "6 month" in query_lower:
-                period = "6mo"
-            elif "year" in query_lower or "12 month" in query_lower:
-                period = "1y"
-            elif "2 year" in query_lower:
-                period = "2y"
-            elif "5 year" in query_lower:
-                period = "5y"
-            elif "max" in query_lower or "all time" in query_lower or "all-time" in query_lower:
-                period = "max"
+            period = intent.period
             
             # Check if technical analysis is requested
-            if "technical" in query_lower or "indicator" in query_lower or "sma" in query_lower or "ema" in query_lower:
+            if intent.chart_style == "technical":
                 chart_data = self.stock_tools.plot_technical_indicators(ticker, period)
             else:
                 chart_data = self.stock_tools.plot_stock_price(ticker, period)
@@ -351,6 +664,7 @@ class FinancialAgent:
                     "is_stock_query": True,
                     "is_chart_query": True,
                     "is_simple_query": False,
+                    "error": True,
                     "response": f"Sorry, I couldn't generate a chart for {ticker}. {chart_data['error']}"
                 }
             
@@ -365,29 +679,8 @@ class FinancialAgent:
             }
             
         # Stock comparison query
-        if ("compare" in query_lower or "vs" in query_lower or "versus" in query_lower or 
-            "against" in query_lower or "which is better" in query_lower) and len(tickers) > 1:
-            
-            # Determine the period
-            period = "1y"  # default 1 year
-            if "day" in query_lower or "24 hour" in query_lower:
-                period = "1d"
-            elif "week" in query_lower:
-                period = "1wk"
-            elif "month" in query_lower:
-                period = "1mo"
-            elif "3 month" in query_lower or "quarter" in query_lower:
-                period = "3mo"
-            elif "6 month" in query_lower:
-                period = "6mo"
-            elif "year" in query_lower or "12 month" in query_lower:
-                period = "1y"
-            elif "2 year" in query_lower:
-                period = "2y"
-            elif "5 year" in query_lower:
-                period = "5y"
-            elif "max" in query_lower or "all time" in query_lower:
-                period = "max"
+        if intent.kind == "comparison":
+            period = intent.period
                 
             comparison_data = self.stock_tools.compare_stocks(tickers, period)
             
@@ -397,6 +690,7 @@ class FinancialAgent:
                     "is_stock_query": True,
                     "is_comparison_query": True,
                     "is_simple_query": False,
+                    "error": True,
                     "response": f"Sorry, I couldn't compare these stocks. {comparison_data['error']}"
                 }
                 
@@ -411,73 +705,21 @@ class FinancialAgent:
             }
             
         # Technical indicators query
-        if (("indicator" in query_lower or "technical" in query_lower) and
-            ("rsi" in query_lower or "macd" in query_lower or "moving average" in query_lower or 
-             "sma" in query_lower or "ema" in query_lower)) and tickers:
+        if intent.kind == "indicators":
             
             ticker = tickers[0]
-            indicator_data = {}
-            response = f"## Technical Indicators for {ticker}\n\n"
+            results, _ = self._run_stock_tasks(self._indicator_tasks(ticker, intent))
+            indicator_data = {name: data for name, data in results.items() if "error" not in data}
             
-            # RSI
-            if "rsi" in query_lower or "relative strength index" in query_lower:
-                rsi_data = self.stock_tools.calculate_rsi(ticker)
-                if "error" not in rsi_data:
-                    indicator_data["rsi"] = rsi_data
-                    response += f"**RSI (14)**: {rsi_data.get('rsi')}\n"
-                    response += f"**Interpretation**: {rsi_data.get('interpretation')}\n\n"
-            
-            # MACD
-            if "macd" in query_lower or "moving average convergence divergence" in query_lower:
-                macd_data = self.stock_tools.calculate_macd(ticker)
-                if "error" not in macd_data:
-                    indicator_data["macd"] = macd_data
-                    response += f"**MACD**: {macd_data.get('macd')}\n"
-                    response += f"**Signal**: {macd_data.get('signal')}\n"
-                    response += f"**Histogram**: {macd_data.get('histogram')}\n"
-                    response += f"**Signal**: {'Bullish' if macd_data.get('bullish') else 'Bearish'}\n\n"
-            
-            # SMA
-            if "sma" in query_lower or "simple moving average" in query_lower:
-                window = 20  # default
-                if "50" in query_lower:
-                    window = 50
-                elif "200" in query_lower:
-                    window = 200
-                elif "100" in query_lower:
-                    window = 100
-                
-                sma_data = self.stock_tools.calculate_sma(ticker, window)
-                if "error" not in sma_data:
-                    indicator_data["sma"] = sma_data
-                    response += f"**SMA ({window})**: {sma_data.get('sma')}\n"
-                    response += f"**Current Price**: {sma_data.get('current_price')}\n"
-                    above_below = "above" if sma_data.get('current_price', 0) > sma_data.get('sma', 0) else "below"
-                    response += f"**Status**: Price is {above_below} SMA {window}\n\n"
-            
-            # EMA
-            if "ema" in query_lower or "exponential moving average" in query_lower:
-                window = 20  # default
-                if "50" in query_lower:
-                    window = 50
-                elif "200" in query_lower:
-                    window = 200
-                elif "100" in query_lower:
-                    window = 100
-                
-                ema_data = self.stock_tools.calculate_ema(ticker, window)
-                if "error" not in ema_data:
-                    indicator_data["ema"] = ema_data
-                    response += f"**EMA ({window})**: {ema_data.get('ema')}\n"
-                    response += f"**Current Price**: {ema_data.get('current_price')}\n"
-                    above_below = "above" if ema_data.get('current_price', 0) > ema_data.get('ema', 0) else "below"
-                    response += f"**Status**: Price is {above_below} EMA {window}\n\n"
+            response = f"## Technical Indicators for {ticker}\n\n"
+            response += self._format_indicators(indicator_data)
             
             if not indicator_data:
                 return {
                     "is_finance_related": True,
                     "is_stock_query": True,
                     "is_simple_query": True,
+                    "error": True,
                     "response": f"Sorry, I couldn't calculate the requested indicators for {ticker}."
                 }
                 
@@ -496,58 +738,29 @@ class FinancialAgent:
             }
         
         # Historical data query
-        if "historical" in query_lower and tickers:
+        if intent.kind == "historical":
             ticker = tickers[0]
-            
-            # Determine the period
-            period = "1y"  # default 1 year
-            if "month" in query_lower:
-                period = "1mo"
-            elif "3 month" in query_lower or "quarter" in query_lower:
-                period = "3mo"
-            elif "6 month" in query_lower:
-                period = "6mo"
-            elif "year" in query_lower or "12 month" in query_lower:
-                period = "1y"
-            elif "2 year" in query_lower:
-                period = "2y"
-            elif "5 year" in query_lower:
-                period = "5y"
-            elif "10 year" in query_lower:
-                period = "10y"
-            elif "max" in query_lower or "all time" in query_lower:
-                period = "max"
+            period = intent.period
                 
-            hist_data = self.stock_tools.get_historical_data(ticker, period)
+            results, _ = self._run_stock_tasks({
+                "historical": (self.stock_tools.get_historical_data, (ticker, period)),
+                "info": (self.stock_tools.get_stock_info, (ticker,))
+            })
+            hist_data = results["historical"]
             
             if "error" in hist_data:
                 return {
                     "is_finance_related": True,
                     "is_stock_query": True,
                     "is_simple_query": True,
+                    "error": True,
                     "response": f"Sorry, I couldn't get historical data for {ticker}. {hist_data['error']}"
                 }
                 
             # Format response
-            company_name = self.stock_tools.get_stock_info(ticker).get("name", ticker)
+            company_name = results["info"].get("name", ticker)
             response = f"## Historical Performance: {company_name} ({ticker})\n\n"
-            response += f"**Period**: {hist_data.get('start_date')} to {hist_data.get('end_date')}\n\n"
-            
-            # Price Change
-            price_change = hist_data.get('price_change_pct')
-            price_change_sign = '+' if price_change >= 0 else ''
-            response += f"**Price Change**: {price_change_sign}{price_change}%\n"
-            response += f"**Starting Price**: ${hist_data.get('price_start')}\n"
-            response += f"**Ending Price**: ${hist_data.get('price_end')}\n\n"
-            
-            # High/Low
-            response += f"**Highest Price**: ${hist_data.get('highest_price')}\n"
-            response += f"**Lowest Price**: ${hist_data.get('lowest_price')}\n\n"
-            
-            # Volatility & Volume
-            response += f"**Average Daily Return**: {hist_data.get('avg_daily_return')}%\n"
-            response += f"**Volatility (Std Dev)**: {hist_data.get('volatility')}%\n"
-            response += f"**Average Daily Volume**: {hist_data.get('avg_volume'):,}\n"
+            response += self._format_historical(hist_data)
             
             return {
                 "is_finance_related": True,
@@ -563,6 +776,227 @@ class FinancialAgent:
         # Not a stock query
         return None
     
+    def _run_stock_tasks(self, tasks: Dict[str, Tuple[Callable[..., Dict[str, Any]], tuple]]
+                         ) -> Tuple[Dict[str, Dict[str, Any]], Dict[str, float]]:
+        """
+        Run independent stock tool calls concurrently on the bounded executor.
+        
+        Identical downloads made by different tasks are fetched only once.
+        
+        Args:
+            tasks: Mapping of task name to (function, arguments)
+            
+        Returns:
+            Tuple of (results by task name, seconds taken by each task)
+        """
+        timings = {}
+        
+        def timed(name, fn, args):
+            started = time.perf_counter()
+            with span(f"stock.{name}", args=", ".join(map(str, args))) as task_span:
+                try:
+                    result = fn(*args)
+                except Exception as e:
+                    result = {"error": str(e)}
+                finally:
+                    timings[name] = round(time.perf_counter() - started, 4)
+                if "error" in result:
+                    task_span.set_attribute("error", result["error"])
+                if "image" in result:
+                    task_span.set_attribute("bytes", len(result["image"]))
+                # A finished part (e.g. the chart) can be shown before the rest of the answer
+                report_progress("part", name=name, result=result)
+                return result
+        
+        with shared_fetches():
+            # Each task runs in its own copy of the context, which shares the fetch memo
+            futures = {
+                name: self.stock_executor.submit(contextvars.copy_context().run, timed, name, fn, args)
+                for name, (fn, args) in tasks.items()
+            }
+            results = {name: future.result() for name, future in futures.items()}
+        return results, timings
+    
+    def _indicator_tasks(self, ticker: str, intent: QueryIntent) -> Dict[str, Tuple[Callable[..., Dict[str, Any]], tuple]]:
+        """Build the indicator calculations requested by a routed query."""
+        tasks = {}
+        if "rsi" in intent.indicators:
+            tasks["rsi"] = (self.stock_tools.calculate_rsi, (ticker,))
+        if "macd" in intent.indicators:
+            tasks["macd"] = (self.stock_tools.calculate_macd, (ticker,))
+        if "sma" in intent.indicators:
+            tasks["sma"] = (self.stock_tools.calculate_sma, (ticker, intent.windows["sma"]))
+        if "ema" in intent.indicators:
+            tasks["ema"] = (self.stock_tools.calculate_ema, (ticker, intent.windows["ema"]))
+        return tasks
+    
+    def _handle_multi_part_query(self, intent: QueryIntent) -> Dict[str, Any]:
+        """
+        Handle a stock query asking for several independent parts at once.
+        
+        The quote, company metadata, each indicator, the chart and the historical
+        statistics are computed concurrently and merged into one response.
+        
+        Args:
+            intent: The routed query intent
+            
+        Returns:
+            Stock query result with the combined response and, if requested, the chart
+        """
+        ticker = intent.tickers[0]
+        tasks = {"info": (self.stock_tools.get_stock_info, (ticker,))}
+        if "quote" in intent.parts:
+            tasks["quote"] = (self.stock_tools.get_stock_price, (ticker,))
+        tasks.update(self._indicator_tasks(ticker, intent))
+        if "chart" in intent.parts:
+            plot = (self.stock_tools.plot_technical_indicators if intent.chart_style == "technical"
+                    else self.stock_tools.plot_stock_price)
+            tasks["chart"] = (plot, (ticker, intent.period))
+        if "historical" in intent.parts:
+            tasks["historical"] = (self.stock_tools.get_historical_data, (ticker, intent.period))
+        
+        results, timings = self._run_stock_tasks(tasks)
+        info_data = results["info"]
+        
+        response = f"## {info_data.get('name', ticker)} ({ticker})\n\n"
+        errors = []
+        
+        if "quote" in results:
+            price_data = results["quote"]
+            if "error" in price_data:
+                errors.append(f"Price: {price_data['error']}")
+            else:
+                response += f"**Current Price**: ${price_data.get('price', 'N/A')} {price_data.get('currency', 'USD')}\n\n"
+        
+        if "quote" in intent.parts or "metadata" in intent.parts:
+            response += self._format_company_info(info_data)
+            if "metadata" in intent.parts and "error" not in info_data:
+                if info_data.get("industry"):
+                    response += f"**Industry**: {info_data.get('industry')}\n\n"
+                if info_data.get("52_week_high") and info_data.get("52_week_low"):
+                    response += f"**52-Week Range**: ${info_data.get('52_week_low')} - ${info_data.get('52_week_high')}\n\n"
+        
+        indicator_data = {}
+        for name in intent.indicators:
+            if "error" in results[name]:
+                errors.append(f"{name.upper()}: {results[name]['error']}")
+            else:
+                indicator_data[name] = results[name]
+        if indicator_data:
+            response += "### Technical Indicators\n\n"
+            response += self._format_indicators(indicator_data)
+            response += self._generate_technical_recommendation(indicator_data, ticker) + "\n\n"
+        
+        hist_data = results.get("historical")
+        if hist_data is not None:
+            if "error" in hist_data:
+                errors.append(f"Historical data: {hist_data['error']}")
+            else:
+                response += "### Historical Performance\n\n"
+                response += self._format_historical(hist_data) + "\n"
+        
+        chart_data = results.get("chart")
+        if chart_data is not None and "error" in chart_data:
+            errors.append(f"Chart: {chart_data['error']}")
+            chart_data = None
+        
+        if errors:
+            response += "**Unavailable**: " + "; ".join(errors) + "\n"
+        
+        result = {
+            "is_finance_related": True,
+            "is_stock_query": True,
+            "is_multi_part_query": True,
+            "is_simple_query": True,
+            "is_report_query": False,
+            "response": response.strip(),
+            "parts": intent.parts,
+            "task_timings": timings,
+            "ticker": ticker
+        }
+        if indicator_data:
+            result["indicator_data"] = indicator_data
+        if hist_data is not None and "error" not in hist_data:
+            result["hist_data"] = hist_data
+        if chart_data is not None:
+            result["chart_data"] = chart_data
+        if errors:
+            result["unavailable_parts"] = [name for name, data in results.items() if "error" in data]
+        return result
+    
+    def _format_company_info(self, info_data: Dict[str, Any]) -> str:
+        """Format the sector, market cap, P/E ratio and dividend yield of a stock."""
+        response = ""
+        if not "error" in info_data:
+            if info_data.get("sector"):
+                response += f"**Sector**: {info_data.get('sector')}\n\n"
+            if info_data.get("market_cap_formatted"):
+                response += f"**Market Cap**: {info_data.get('market_cap_formatted')}\n\n"
+            if info_data.get("pe_ratio"):
+                response += f"**P/E Ratio**: {info_data.get('pe_ratio'):.2f}\n\n"
+            if info_data.get("dividend_yield"):
+                response += f"**Dividend Yield**: {info_data.get('dividend_yield')}%\n\n"
+        return response
+    
+    def _format_indicators(self, indicator_data: Dict[str, Any]) -> str:
+        """Format computed RSI, MACD, SMA and EMA values."""
+        response = ""
+        
+        # RSI
+        if "rsi" in indicator_data:
+            rsi_data = indicator_data["rsi"]
+            response += f"**RSI (14)**: {rsi_data.get('rsi')}\n"
+            response += f"**Interpretation**: {rsi_data.get('interpretation')}\n\n"
+        
+        # MACD
+        if "macd" in indicator_data:
+            macd_data = indicator_data["macd"]
+            response += f"**MACD**: {macd_data.get('macd')}\n"
+            response += f"**Signal**: {macd_data.get('signal')}\n"
+            response += f"**Histogram**: {macd_data.get('histogram')}\n"
+            response += f"**Signal**: {'Bullish' if macd_data.get('bullish') else 'Bearish'}\n\n"
+        
+        # SMA
+        if "sma" in indicator_data:
+            sma_data = indicator_data["sma"]
+            window = sma_data.get("window")
+            response += f"**SMA ({window})**: {sma_data.get('sma')}\n"
+            response += f"**Current Price**: {sma_data.get('current_price')}\n"
+            above_below = "above" if sma_data.get('current_price', 0) > sma_data.get('sma', 0) else "below"
+            response += f"**Status**: Price is {above_below} SMA {window}\n\n"
+        
+        # EMA
+        if "ema" in indicator_data:
+            ema_data = indicator_data["ema"]
+            window = ema_data.get("window")
+            response += f"**EMA ({window})**: {ema_data.get('ema')}\n"
+            response += f"**Current Price**: {ema_data.get('current_price')}\n"
+            above_below = "above" if ema_data.get('current_price', 0) > ema_data.get('ema', 0) else "below"
+            response += f"**Status**: Price is {above_below} EMA {window}\n\n"
+        
+        return response
+    
+    def _format_historical(self, hist_data: Dict[str, Any]) -> str:
+        """Format historical performance statistics."""
+        response = f"**Period**: {hist_data.get('start_date')} to {hist_data.get('end_date')}\n\n"
+        
+        # Price Change
+        price_change = hist_data.get('price_change_pct')
+        price_change_sign = '+' if price_change >= 0 else ''
+        response += f"**Price Change**: {price_change_sign}{price_change}%\n"
+        response += f"**Starting Price**: ${hist_data.get('price_start')}\n"
+        response += f"**Ending Price**: ${hist_data.get('price_end')}\n\n"
+        
+        # High/Low
+        response += f"**Highest Price**: ${hist_data.get('highest_price')}\n"
+        response += f"**Lowest Price**: ${hist_data.get('lowest_price')}\n\n"
+        
+        # Volatility & Volume
+        response += f"**Average Daily Return**: {hist_data.get('avg_daily_return')}%\n"
+        response += f"**Volatility (Std Dev)**: {hist_data.get('volatility')}%\n"
+        response += f"**Average Daily Volume**: {hist_data.get('avg_volume'):,}\n"
+        return response
+    
     def _extract_tickers(self, query: str) -> List[str]:
         """Extract potential stock tickers from query."""
         # Common stock tickers mentioned with $ sign
@@ -572,112 +1006,21 @@ class FinancialAgent:
         words = query.split()
         cap_tickers = [word.strip('.,?!()[]{}') for word in words 
                       if word.strip('.,?!()[]{}').isupper() and 
-                      1 <= len(word.strip('.,?!()[]{}')) <= 5]
-        
-        # Common stock names to ticker mapping
-        name_to_ticker = {
-            # US Stocks
-            'apple': 'AAPL',
-            'microsoft': 'MSFT',
-            'amazon': 'AMZN',
-            'google': 'GOOGL',
-            'alphabet': 'GOOGL',
-            'facebook': 'META',
-            'meta': 'META',
-            'tesla': 'TSLA',
-            'netflix': 'NFLX',
-            'nvidia': 'NVDA',
-            'walmart': 'WMT',
-            'disney': 'DIS',
-            'coca cola': 'KO',
-            'coca-cola': 'KO',
-            'coke': 'KO',
-            'ibm': 'IBM',
-            'intel': 'INTC',
-            'alibaba': 'BABA',
-            'amd': 'AMD',
-            'nike': 'NKE',
-            'jp morgan': 'JPM',
-            'jpmorgan': 'JPM',
-            'bank of america': 'BAC',
-            'goldman sachs': 'GS',
-            'pfizer': 'PFE',
-            'johnson & johnson': 'JNJ',
-            
-            # Indian Stocks
-            'reliance': 'RELIANCE.NS',
-            'tcs': 'TCS.NS',
-            'hdfc bank': 'HDFCBANK.NS',
-            'hdfc': 'HDFCBANK.NS',
-            'infosys': 'INFY.NS',
-            'icici bank': 'ICICIBANK.NS',
-            'icici': 'ICICIBANK.NS',
-            'hul': 'HINDUNILVR.NS',
-            'hindustan unilever': 'HINDUNILVR.NS',
-            'unilever': 'HINDUNILVR.NS',
-            'sbi': 'SBIN.NS',
-            'state bank': 'SBIN.NS',
-            'bharti airtel': 'BHARTIARTL.NS',
-            'airtel': 'BHARTIARTL.NS',
-            'asian paints': 'ASIANPAINT.NS',
-            'asianpaints': 'ASIANPAINT.NS',
-            'kotak bank': 'KOTAKBANK.NS',
-            'kotak': 'KOTAKBANK.NS',
-            'lt': 'LT.NS',
-            'larsen': 'LT.NS',
-            'larsen & toubro': 'LT.NS',
-            'hcl tech': 'HCLTECH.NS',
-            'hcl': 'HCLTECH.NS',
-            'wipro': 'WIPRO.NS',
-            'axis bank': 'AXISBANK.NS',
-            'axis': 'AXISBANK.NS',
-            'maruti': 'MARUTI.NS',
-            'maruti suzuki': 'MARUTI.NS',
-            'sun pharma': 'SUNPHARMA.NS',
-            'sunpharma': 'SUNPHARMA.NS',
-            'titan': 'TITAN.NS',
-            'titan company': 'TITAN.NS',
-            'bajaj finance': 'BAJFINANCE.NS',
-            'bajajfinance': 'BAJFINANCE.NS',
-            'bajaj auto': 'BAJAJ-AUTO.NS',
-            'bajajauto': 'BAJAJ-AUTO.NS',
-            'mahindra': 'M&M.NS',
-            'mahindra & mahindra': 'M&M.NS',
-            'ultra tech': 'ULTRACEMCO.NS',
-            'ultratech': 'ULTRACEMCO.NS',
-            'ultracemco': 'ULTRACEMCO.NS',
-            'nestle': 'NESTLEIND.NS',
-            'nestle india': 'NESTLEIND.NS',
-            'tata steel': 'TATASTEEL.NS',
-            'tatasteel': 'TATASTEEL.NS',
-            'tata motors': 'TATAMOTORS.NS',
-            'tatamotors': 'TATAMOTORS.NS',
-            'tata consultancy': 'TCS.NS',
-            'tata consult': 'TCS.NS',
-            'adani ports': 'ADANIPORTS.NS',
-            'adaniports': 'ADANIPORTS.NS',
-            'adani green': 'ADANIGREEN.NS',
-            'adanigreen': 'ADANIGREEN.NS',
-            'adani enterprises': 'ADANIENT.NS',
-            'adanient': 'ADANIENT.NS',
-            'adani power': 'ADANIPOWER.NS',
-            'adanipower': 'ADANIPOWER.NS',
-            'adani transmission': 'ADANITRANS.NS',
-            'adanitrans': 'ADANITRANS.NS',
-            'adani total gas': 'ATGL.NS',
-            'atgl': 'ATGL.NS',
-            'adani wilmar': 'AWL.NS',
-            'awl': 'AWL.NS'
-        }
+                      1 <= len(word.strip('.,?!()[]{}')) <= 5 and
+                      word.strip('.,?!()[]{}') not in NON_TICKER_WORDS]
         
-        name_tickers = []
-        query_lower = query.lower()
-        for name, ticker in name_to_ticker.items():
-            if name in query_lower:
-                name_tickers.append(ticker)
+        # Company names and aliases from the symbol master
+        name_tickers = [entity.symbol for entity in get_entity_index().find_entities(query, kind="equity")]
         
         # Combine all found tickers and remove duplicates
         all_tickers = dollar_tickers + cap_tickers + name_tickers
+        
+        # Fuzzy matching for misspelled or partial company names: as a fallback, and in any
+        # stock query, so one misspelled name of several isn't dropped ("compare microsft and apple")
+        flags, _ = STOCK_INTENT_ROUTER.scan(query)
+        stock_context = any(not flag.startswith("window_") for flag in flags)
+        if stock_context or not all_tickers:
+            all_tickers += [entity.symbol for entity in get_fuzzy_index().resolve(query, stock_context=stock_context)]
         return list(dict.fromkeys(all_tickers))  # Remove duplicates while preserving order
     
     def _generate_technical_recommendation(self, indicator_data: Dict[str, Any], ticker: str) -> str:
@@ -848,6 +1191,30 @@ class FinancialAgent:
         # Format detailed report response
         return self._format_detailed_report(result)
     
+    def format_partial_analysis(self, sections: Dict[str, Any]) -> str:
+        """
+        Format the sections of an analysis that is still streaming.
+        
+        Args:
+            sections: Partial section dictionary from analyze_sentiment_stream
+            
+        Returns:
+            HTML showing the sentiment and summary as soon as they are available
+        """
+        formatted_response = "<h1>Financial Market Analysis ⏳</h1>\n\n"
+        
+        if "sentiment" in sections:
+            formatted_response += f"<strong>Sentiment:</strong> {sections['sentiment']}\n"
+        if "confidence" in sections:
+            formatted_response += f"<strong>Confidence Level:</strong> {sections['confidence']}\n"
+        if "summary" in sections:
+            formatted_response += f"\n<h2>Summary</h2>\n{sections['summary']}\n"
+        if "market_impact" in sections:
+            formatted_response += f"\n<h2>Market Impact</h2>\n{sections['market_impact']}\n"
+            
+        formatted_response += "\n<em>Generating the rest of the analysis...</em>"
+        return formatted_response
+    
     def _format_simple_response(self, response: str) -> str:
         """
         Format a simple response with appealing markdown.
@@ -0,0 +1,142 @@
+import argparse
+import importlib
+import json
+import subprocess
+import sys
+import threading
+import time
+from typing import Any, Dict, Iterable, Optional
+
+# Third-party modules that dominate the cold start (yfinance and pandas alone take about a second)
+HEAVY_MODULES = ("yfinance", "pandas", "matplotlib.pyplot", "duckduckgo_search", "requests",
+                 "google.generativeai")
+
+# Seconds spent importing each module loaded through lazy_import, by module name
+_import_times: Dict[str, float] = {}
+_times_lock = threading.Lock()
+
+
+class LazyModule:
+    """
+    Stand-in for a module that is imported on first attribute access.
+
+    Setting an attribute sets it on the real module, so tests and benchmarks can
+    still patch e.g. stock_tools.yf.Ticker.
+    """
+
+    __slots__ = ("_name", "_module", "_lock")
+
+    def __init__(self, name: str):
+        object.__setattr__(self, "_name", name)
+        object.__setattr__(self, "_module", None)
+        object.__setattr__(self, "_lock", threading.Lock())
+
+    def _load(self) -> Any:
+        module = self._module
+        if module is None:
+            with self._lock:
+                module = self._module
+                if module is None:
+                    started = time.perf_counter()
+                    module = importlib.import_module(self._name)
+                    with _times_lock:
+                        _import_times[self._name] = time.perf_counter() - started
+                    object.__setattr__(self, "_module", module)
+        return module
+
+    @property
+    def loaded(self) -> bool:
+        return self._module is not None
+
+    def __getattr__(self, attr: str) -> Any:
+        return getattr(self._load(), attr)
+
+    def __setattr__(self, attr: str, value: Any) -> None:
+        setattr(self._load(), attr, value)
+
+    def __dir__(self):
+        return dir(self._load())
+
+    def __repr__(self) -> str:
+        state = "loaded" if self._module is not None else "not loaded"
+        return f"<lazy module {self._name!r} ({state})>"
+
+
+_lazy_modules: Dict[str, LazyModule] = {}
+
+
+def lazy_import(name: str) -> LazyModule:
+    """
+    Return a lazily imported module, shared by every caller that asks for the same name.
+
+    Args:
+        name: Dotted module name, e.g. "matplotlib.pyplot"
+
+    Returns:
+        LazyModule that imports the module the first time one of its attributes is used
+    """
+    module = _lazy_modules.get(name)
+    if module is None:
+        module = _lazy_modules.setdefault(name, LazyModule(name))
+    return module
+
+
+def preload(names: Iterable[str] = HEAVY_MODULES) -> None:
+    """Import the given modules now, skipping any that are not installed."""
+    for name in names:
+        try:
+            lazy_import(name)._load()
+        except ImportError:
+            pass
+
+
+def preload_in_background(names: Iterable[str] = HEAVY_MODULES) -> threading.Thread:
+    """Import the given modules on a daemon thread, so the first query doesn't wait for them."""
+    thread = threading.Thread(target=preload, args=(tuple(names),), name="preload-imports", daemon=True)
+    thread.start()
+    return thread
+
+
+def import_times() -> Dict[str, float]:
+    """Seconds spent on each lazy import so far, slowest first."""
+    with _times_lock:
+        return dict(sorted(_import_times.items(), key=lambda item: item[1], reverse=True))
+
+
+def measure_cold_imports(names: Iterable[str], python: Optional[str] = None) -> Dict[str, Optional[float]]:
+    """
+    Time the import of each module in a fresh interpreter, so earlier imports don't hide its cost.
+
+    Returns:
+        Seconds per module name (None when the module could not be imported)
+    """
+    script = ("import sys, time; started = time.perf_counter(); import {name}; "
+              "sys.stdout.write(repr(time.perf_counter() - started))")
+    times = {}
+    for name in names:
+        completed = subprocess.run([python or sys.executable, "-c", script.format(name=name)],
+                                   capture_output=True, text=True)
+        times[name] = float(completed.stdout) if completed.returncode == 0 else None
+    return times
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Report the cold import time of the app's modules and their heavy dependencies."
+    )
+    parser.add_argument("modules", nargs="*",
+                        help="Modules to time (default: the heavy dependencies and the app's entry modules)")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    args = parser.parse_args()
+
+    modules = args.modules or list(HEAVY_MODULES) + ["shared_tools", "financial_agent"]
+    times = measure_cold_imports(modules)
+    if args.json:
+        print(json.dumps(times, indent=2))
+        return
+    for name, seconds in sorted(times.items(), key=lambda item: item[1] or 0, reverse=True):
+        print(f"{name:<24}{'not installed' if seconds is None else f'{seconds * 1000:8.0f} ms':>16}")
+
+
+if __name__ == "__main__":
+    main()
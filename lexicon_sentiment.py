@@ -0,0 +1,238 @@
+import csv
+import re
+from typing import Dict, Any, List, Optional, Iterable, Tuple
+
+# Finance word lists in the style of the Loughran-McDonald master dictionary.
+# A full dictionary can be loaded with LexiconSentimentScorer.from_master_dictionary.
+POSITIVE_WORDS = frozenset("""
+able abundance abundant accomplish accomplished accomplishment achieve achieved achievement achievements
+achieves achieving advance advanced advancement advances advancing advantage advantageous advantages
+attractive attractiveness beat beating beats beneficial benefit benefited benefits best better bolster
+bolstered boom booming boost boosted boosting breakthrough breakthroughs bullish collaborate confident
+creative delight delighted dependable desirable efficiencies efficiency efficient empower
+enable enabled enables encouraged encouraging enhance enhanced enhancement enhances enjoy enthusiasm
+enthusiastic excellence excellent exceed exceeded exceeding exceeds exceptional exciting expand favorable
+favorably gain gained gaining gains good great greater greatest growing growth happy highest honor
+ideal impressive improve improved improvement improvements improves improving innovate innovation
+innovations innovative leadership leading lucrative momentum optimism optimistic outpace outperform
+outperformed outperforming outperforms outstanding perfect pleased popular positive positively profitable
+profitability progress progressing prosper prosperity rally rallied rallies rebound rebounded record
+recover recovered recovery resolve resolved rewarding robust satisfaction satisfied smooth solid stability
+stable strength strengthen strengthened strengths strong stronger strongest succeed succeeded success
+successes successful successfully superior surge surged surges surpass surpassed transparency tremendous
+upgrade upgraded upgrades upside upturn valuable versatile winner winning
+""".split())
+
+NEGATIVE_WORDS = frozenset("""
+abandon abandoned adverse adversely allegation allegations alleged antitrust bad bailout bankrupt
+bankruptcy bearish breach breached burden catastrophe caution cautious cease challenge challenged
+challenges challenging closure closures collapse collapsed collapsing concern concerned concerns
+conflict crash crashed crisis critical criticism criticized cut cuts cutting damage damaged damages danger
+decline declined declines declining decrease decreased decreases default defaulted defaults deficit
+deficits delay delayed delays delinquent deteriorate deteriorated deteriorating deterioration difficult
+difficulties difficulty disappoint disappointed disappointing disappointment dispute disputes disruption
+disruptions doubt downgrade downgraded downgrades downturn drop dropped dropping drops fail failed failing
+fails failure failures fall fallen falling falls fear fears fell fined fraud fraudulent halt
+halted hurt impair impaired impairment impairments inability inadequate investigation investigations
+lawsuit lawsuits layoff layoffs liquidation litigation lose losers loses losing loss losses lowest miss
+missed misses negative negatively obstacle penalties penalty pessimism pessimistic plummet plummeted
+plunge plunged plunges poor poorly problem problems recall recalls recession recessionary restate
+restated restructuring risky scandal selloff shortage shortfall shrink shrinking slow slowdown slowing
+slump slumped slumps stagnant stagnation strain stress sued suffer suffered suspend suspended tumble
+tumbled turmoil unable uncertain underperform underperformed underperforming unfavorable unprofitable
+unsuccessful volatile vulnerability vulnerable warn warned warning warnings weak weaken weakened weaker
+weakness worse worsen worsened worst writedown writedowns writeoff
+""".split())
+
+NEGATION_WORDS = frozenset("""
+not no never neither nor none nobody without cannot cant dont doesnt didnt isnt wasnt arent werent wont
+hasnt havent hadnt shouldnt wouldnt couldnt
+""".split())
+
+TOKEN_PATTERN = re.compile(r"[a-z]+(?:'[a-z]+)?")
+SOURCE_PATTERN = re.compile(r'^SOURCE (\d+): (.*)$', re.MULTILINE)
+
+
+class LexiconSentimentScorer:
+    """
+    Offline, dictionary-based sentiment scorer for financial text.
+
+    Counts positive and negative finance terms, flipping the polarity of a term
+    that follows a negation word within a short window. Returns the same
+    POSITIVE / NEGATIVE / NEUTRAL / MIXED labels as SentimentAnalyzer.
+    """
+
+    def __init__(self, positive_words: Optional[Iterable[str]] = None,
+                 negative_words: Optional[Iterable[str]] = None,
+                 negation_window: int = 3, polarity_threshold: float = 0.2):
+        """
+        Args:
+            positive_words: Positive terms (defaults to the built-in list)
+            negative_words: Negative terms (defaults to the built-in list)
+            negation_window: How many tokens after a negation word are flipped
+            polarity_threshold: Minimum absolute net score for a POSITIVE/NEGATIVE label
+        """
+        self.positive_words = frozenset(positive_words) if positive_words is not None else POSITIVE_WORDS
+        self.negative_words = frozenset(negative_words) if negative_words is not None else NEGATIVE_WORDS
+        self.negation_window = negation_window
+        self.polarity_threshold = polarity_threshold
+
+    @classmethod
+    def from_master_dictionary(cls, path: str, **kwargs) -> "LexiconSentimentScorer":
+        """
+        Build a scorer from a Loughran-McDonald master dictionary CSV.
+
+        Args:
+            path: CSV file with "Word", "Positive" and "Negative" columns
+                (a non-zero category value marks membership)
+
+        Returns:
+            A scorer using the dictionary's word lists
+        """
+        positive, negative = set(), set()
+        with open(path, newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                word = row.get("Word", "").strip().lower()
+                if not word:
+                    continue
+                if row.get("Positive", "0").strip() not in ("", "0"):
+                    positive.add(word)
+                if row.get("Negative", "0").strip() not in ("", "0"):
+                    negative.add(word)
+        return cls(positive, negative, **kwargs)
+
+    def _count(self, text: str) -> Tuple[int, int]:
+        """Count (positive, negative) hits in one text, applying negation."""
+        positive = negative = 0
+        negated_until = -1
+        for position, token in enumerate(TOKEN_PATTERN.findall(text.lower())):
+            token = token.replace("'", "")
+            if token in NEGATION_WORDS:
+                negated_until = position + self.negation_window
+                continue
+            is_positive = token in self.positive_words
+            is_negative = token in self.negative_words
+            if not (is_positive or is_negative):
+                continue
+            if position <= negated_until:
+                is_positive, is_negative = is_negative, is_positive
+            if is_positive:
+                positive += 1
+            else:
+                negative += 1
+        return positive, negative
+
+    def _label(self, positive: int, negative: int) -> Tuple[str, float]:
+        """Turn hit counts into a (label, net score in [-1, 1]) pair."""
+        total = positive + negative
+        if total == 0:
+            return "NEUTRAL", 0.0
+        score = (positive - negative) / total
+        if score >= self.polarity_threshold:
+            return "POSITIVE", score
+        if score <= -self.polarity_threshold:
+            return "NEGATIVE", score
+        if positive >= 2 and negative >= 2:
+            return "MIXED", score
+        return "NEUTRAL", score
+
+    def score_texts(self, texts: List[str]) -> List[Dict[str, Any]]:
+        """
+        Score many short texts (e.g. a headline feed) in one call.
+
+        Args:
+            texts: The texts to score
+
+        Returns:
+            One dictionary per text with label, score and positive/negative counts
+        """
+        results = []
+        for text in texts:
+            positive, negative = self._count(text)
+            label, score = self._label(positive, negative)
+            results.append({
+                "label": label,
+                "score": round(score, 3),
+                "positive": positive,
+                "negative": negative
+            })
+        return results
+
+    def score_consolidated(self, search_results: str) -> Dict[str, Any]:
+        """
+        Score the output of SearchTool.search_and_consolidate source by source.
+
+        Args:
+            search_results: The consolidated search results
+
+        Returns:
+            Dictionary with the overall label, score, counts and per-source scores
+        """
+        headers = list(SOURCE_PATTERN.finditer(search_results))
+        if headers:
+            blocks = []
+            for i, header in enumerate(headers):
+                end = headers[i + 1].start() if i + 1 < len(headers) else len(search_results)
+                blocks.append((header.group(2).strip(), search_results[header.end():end]))
+        else:
+            blocks = [("Provided information", search_results)]
+
+        sources = self.score_texts([text for _, text in blocks])
+        for (title, _), source in zip(blocks, sources):
+            source["title"] = title
+
+        positive = sum(source["positive"] for source in sources)
+        negative = sum(source["negative"] for source in sources)
+        label, score = self._label(positive, negative)
+
+        # Sources that clearly disagree make the overall picture mixed
+        labels = {source["label"] for source in sources}
+        if label != "MIXED" and "POSITIVE" in labels and "NEGATIVE" in labels and abs(score) < 0.5:
+            label = "MIXED"
+
+        return {
+            "label": label,
+            "score": round(score, 3),
+            "positive": positive,
+            "negative": negative,
+            "sources": sources
+        }
+
+    def analyze(self, search_results: str, user_query: str) -> Dict[str, Any]:
+        """
+        Produce a section dictionary in the format of SentimentAnalyzer.analyze_sentiment.
+
+        Args:
+            search_results: The consolidated search results
+            user_query: The original user query
+
+        Returns:
+            Dictionary containing the lexicon-based analysis and sentiment
+        """
+        scored = self.score_consolidated(search_results)
+        hits = scored["positive"] + scored["negative"]
+
+        if hits >= 10 and abs(scored["score"]) >= 0.5:
+            confidence = "Medium"
+        else:
+            confidence = "Low"
+
+        source_lines = [
+            f"- {source['title']}: {source['label']} ({source['positive']} positive, {source['negative']} negative terms)"
+            for source in scored["sources"]
+        ]
+
+        return {
+            "sentiment": scored["label"],
+            "confidence": confidence,
+            "market_impact": (
+                f"Lexicon-based estimate: {scored['positive']} positive and {scored['negative']} negative "
+                f"finance terms across {len(scored['sources'])} source(s) (net score {scored['score']:+.2f})."
+            ),
+            "detailed_analysis": "\n".join(source_lines) if source_lines else "No sources to score",
+            "summary": (
+                f"A fast dictionary-based scoring of the available information about \"{user_query}\" "
+                f"rates the overall tone as {scored['label'].lower()}. This estimate does not interpret context or implicit meaning."
+            ),
+            "recommendations": "- Treat this as a quick approximation of tone\n- Re-run the full AI analysis for detailed insights"
+        }
@@ -0,0 +1,239 @@
+import hashlib
+import json
+import os
+import random
+import re
+import threading
+import time
+from typing import Any, Dict, Iterator, Optional
+
+from lexicon_sentiment import LexiconSentimentScorer
+
+# Words that make the local stand-in classify a query as finance-related
+FINANCE_TERMS = (
+    "stock", "share", "market", "price", "invest", "fund", "bank", "finance", "financial", "econom",
+    "earning", "revenue", "profit", "dividend", "ticker", "trade", "trading", "crypto", "bitcoin",
+    "inflation", "interest rate", "fed", "federal reserve", "ipo", "bond", "etf", "portfolio",
+    "company", "companies", "business", "report", "ratio", "capitalization", "sector", "nasdaq",
+    "nyse", "nse", "bse", "sensex", "nifty", "analyst", "chart", "compare", "rsi", "macd",
+)
+
+
+class LLMBackend:
+    """
+    Interface for the language model provider behind SentimentAnalyzer.
+
+    A backend hands out model objects by name; each model object exposes
+    generate_content(prompt, stream=False, generation_config=None, request_options=None)
+    with the same response shape as google.generativeai (a .text attribute and
+    optional .usage_metadata, or an iterator of such chunks when streaming).
+    """
+
+    name = "base"
+
+    def model(self, model_name: str) -> Any:
+        """Return a model object for the given model name."""
+        raise NotImplementedError
+
+
+class GeminiBackend(LLMBackend):
+    """Google Gemini backend using the google.generativeai SDK."""
+
+    name = "gemini"
+
+    def __init__(self, api_key: Optional[str] = None):
+        """
+        Args:
+            api_key: Gemini API key (defaults to the GOOGLE_API_KEY environment variable)
+        """
+        api_key = api_key or os.getenv("GOOGLE_API_KEY")
+        if not api_key:
+            raise ValueError("GOOGLE_API_KEY not found in environment variables.")
+        self._api_key = api_key
+        self._genai = None
+        self._lock = threading.Lock()
+
+    @property
+    def genai(self) -> Any:
+        """The configured SDK module, imported on the first model call (it takes a while to load)."""
+        if self._genai is None:
+            with self._lock:
+                if self._genai is None:
+                    import google.generativeai as genai
+                    genai.configure(api_key=self._api_key)
+                    self._genai = genai
+        return self._genai
+
+    def model(self, model_name: str) -> Any:
+        return self.genai.GenerativeModel(model_name)
+
+
+class _UsageMetadata:
+    def __init__(self, prompt_token_count: int, candidates_token_count: int):
+        self.prompt_token_count = prompt_token_count
+        self.candidates_token_count = candidates_token_count
+
+
+class _LocalResponse:
+    def __init__(self, text: str, prompt_tokens: int = 0, response_tokens: int = 0):
+        self.text = text
+        self.usage_metadata = _UsageMetadata(prompt_tokens, response_tokens)
+
+
+class LocalModel:
+    """Deterministic stand-in for a Gemini model, returning canned well-formed answers."""
+
+    def __init__(self, model_name: str, backend: "LocalLLMBackend"):
+        self.model_name = model_name
+        self._backend = backend
+
+    def generate_content(self, prompt: str, stream: bool = False, generation_config: Optional[Dict[str, Any]] = None,
+                         request_options: Optional[Dict[str, Any]] = None, **kwargs) -> Any:
+        latency = self._backend.sample_latency(self.model_name)
+        timeout = (request_options or {}).get("timeout")
+        if timeout is not None and latency > timeout:
+            time.sleep(timeout)
+            raise TimeoutError(f"Local model {self.model_name} did not answer within {timeout:.1f}s")
+
+        structured = bool(generation_config) and generation_config.get("response_mime_type") == "application/json"
+        text = self._backend.answer(prompt, structured)
+        prompt_tokens = max(1, len(prompt) // 4)
+        response_tokens = max(1, len(text) // 4)
+
+        if not stream:
+            time.sleep(latency)
+            return _LocalResponse(text, prompt_tokens, response_tokens)
+        return self._stream(text, latency, prompt_tokens, response_tokens)
+
+    def _stream(self, text: str, latency: float, prompt_tokens: int, response_tokens: int) -> Iterator[_LocalResponse]:
+        # Spend a third of the latency before the first chunk, the rest spread over the chunks
+        chunks = [text[i:i + 80] for i in range(0, len(text), 80)] or [""]
+        time.sleep(latency / 3)
+        for index, chunk in enumerate(chunks):
+            time.sleep(latency * 2 / 3 / len(chunks))
+            is_last = index == len(chunks) - 1
+            yield _LocalResponse(chunk, prompt_tokens if is_last else 0, response_tokens if is_last else 0)
+
+
+class LocalLLMBackend(LLMBackend):
+    """
+    Offline, deterministic stand-in for Gemini used for load tests and profiling.
+
+    Answers are derived from the prompt (finance keyword check for classification,
+    lexicon scoring of the provided information for analyses), so the same prompt
+    always gets the same answer. Latency is sampled from a configurable distribution.
+    """
+
+    name = "local"
+
+    def __init__(self, distribution: Optional[str] = None, latency_scale: Optional[float] = None,
+                 median_latency: Optional[Dict[str, float]] = None, sigma: float = 0.5,
+                 seed: Optional[int] = None):
+        """
+        Args:
+            distribution: "lognormal", "uniform" or "fixed" (defaults to LOCAL_LLM_LATENCY)
+            latency_scale: Multiplier applied to every latency, 0 for instant answers
+                (defaults to LOCAL_LLM_LATENCY_SCALE)
+            median_latency: Median latency in seconds per model, "fast" and "large" keys
+                are used for model names containing "flash" and for everything else
+            sigma: Spread of the lognormal distribution
+            seed: Seed for the latency random generator
+        """
+        self.distribution = (distribution or os.getenv("LOCAL_LLM_LATENCY", "lognormal")).lower()
+        self.latency_scale = latency_scale if latency_scale is not None else float(os.getenv("LOCAL_LLM_LATENCY_SCALE", "1.0"))
+        self.median_latency = median_latency or {"fast": 0.8, "large": 6.0}
+        self.sigma = sigma
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._lexicon = LexiconSentimentScorer()
+
+    def model(self, model_name: str) -> LocalModel:
+        return LocalModel(model_name, self)
+
+    def sample_latency(self, model_name: str) -> float:
+        """Draw a latency in seconds for one call to the given model."""
+        tier = "fast" if "flash" in model_name else "large"
+        median = self.median_latency.get(model_name, self.median_latency[tier])
+        with self._lock:
+            if self.distribution == "fixed":
+                latency = median
+            elif self.distribution == "uniform":
+                latency = self._random.uniform(0.5 * median, 1.5 * median)
+            else:
+                latency = self._random.lognormvariate(0, self.sigma) * median
+        return latency * self.latency_scale
+
+    def answer(self, prompt: str, structured: bool = False) -> str:
+        """Produce the canned answer for a prompt."""
+        if "Answer only with YES or NO" in prompt:
+            match = re.search(r'Query:\s*(.*)', prompt)
+            query = (match.group(1) if match else prompt).lower()
+            return "YES" if any(term in query for term in FINANCE_TERMS) else "NO"
+
+        items = re.findall(r'^\s*=== ITEM (\d+) ===\nQUERY: "([^"\n]*)"\nINFORMATION:\n(.*?)(?=^\s*=== ITEM |\Z)',
+                           prompt, re.MULTILINE | re.DOTALL)
+        if items:
+            blocks = []
+            for number, query, information in items:
+                sections = self._sections(query, information)
+                blocks.append(f"=== ITEM {number} ===\n{self._format_sections(sections)}")
+            return "\n\n".join(blocks)
+
+        query_match = re.search(r'related to this query: "(.*)"', prompt)
+        query = query_match.group(1) if query_match else ""
+        info_match = re.search(r'INFORMATION:\n(.*?)\n\s*(?:Please provide|Respond with)', prompt, re.DOTALL)
+        information = info_match.group(1) if info_match else prompt
+        sections = self._sections(query, information)
+
+        if structured:
+            structured_sections = dict(sections)
+            structured_sections["recommendations"] = [
+                line[2:] for line in sections["recommendations"].split("\n") if line.startswith("- ")
+            ]
+            return json.dumps(structured_sections)
+        return self._format_sections(sections)
+
+    def _sections(self, query: str, information: str) -> Dict[str, str]:
+        scored = self._lexicon.score_consolidated(information)
+        digest = hashlib.sha256(information.encode("utf-8", errors="replace")).hexdigest()[:8]
+        confidence = ("Low", "Medium", "High")[int(digest, 16) % 3]
+        return {
+            "sentiment": scored["label"],
+            "confidence": confidence,
+            "market_impact": f"Local stand-in assessment of the market impact for \"{query}\" (fixture {digest}).",
+            "detailed_analysis": (
+                f"- {scored['positive']} positive and {scored['negative']} negative terms across "
+                f"{len(scored['sources'])} source(s)\n- Net tone score {scored['score']:+.2f}"
+            ),
+            "summary": f"The available information about \"{query}\" reads as {scored['label'].lower()}. "
+                       f"This answer was produced by the local LLM stand-in.",
+            "recommendations": "- Monitor upcoming company announcements\n- Review position sizing against risk tolerance"
+        }
+
+    def _format_sections(self, sections: Dict[str, str]) -> str:
+        return (
+            f"1. SENTIMENT: {sections['sentiment']}\n\n"
+            f"2. CONFIDENCE: {sections['confidence']}\n\n"
+            f"3. MARKET IMPACT: {sections['market_impact']}\n\n"
+            f"4. DETAILED ANALYSIS: {sections['detailed_analysis']}\n\n"
+            f"5. SUMMARY: {sections['summary']}\n\n"
+            f"6. RECOMMENDATIONS: {sections['recommendations']}\n"
+        )
+
+
+def create_backend(name: Optional[str] = None) -> LLMBackend:
+    """
+    Build the LLM backend selected by name or by the LLM_BACKEND setting.
+
+    Args:
+        name: "gemini" or "local"
+
+    Returns:
+        The backend instance
+    """
+    name = (name or os.getenv("LLM_BACKEND", "gemini")).lower()
+    if name == "local":
+        return LocalLLMBackend()
+    if name == "gemini":
+        return GeminiBackend()
+    raise ValueError(f"Unknown LLM backend: {name}")
@@ -0,0 +1,196 @@
+import json
+import threading
+from bisect import bisect_left
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+from tracing import annotate
+
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10, 20, 30, 60, 120)
+TOKEN_BUCKETS = (50, 100, 250, 500, 1000, 2000, 4000, 8000, 16000, 32000, 64000)
+
+# Approximate list prices in USD per million tokens (input, output), used for cost estimates
+MODEL_PRICES = {
+    "gemini-2.0-flash": (0.10, 0.40),
+    "gemini-2.5-pro-exp-03-25": (1.25, 10.00),
+}
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (about four characters per token) for when the API reports none."""
+    return max(1, len(text) // 4) if text else 0
+
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus style."""
+
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Estimate a quantile (0-1) as the upper bound of the bucket holding it."""
+        if self.count == 0:
+            return None
+        target = q * self.count
+        running = 0
+        for bound, count in zip(self.buckets, self.counts):
+            running += count
+            if running >= target:
+                return bound
+        return float("inf")
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "sum": round(self.sum, 4),
+            "mean": round(self.sum / self.count, 4) if self.count else None,
+            "p50": self.quantile(0.5),
+            "p90": self.quantile(0.9),
+            "p99": self.quantile(0.99),
+            "buckets": {str(bound): count for bound, count in zip(self.buckets + ("+Inf",), self.counts)}
+        }
+
+
+class LLMMetrics:
+    """
+    In-process metrics for model calls: latency and token histograms, error
+    classes, cache hits/misses and estimated cost, broken down by stage and model.
+    Also keeps a latency histogram per query pipeline stage.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        """Drop every recorded metric."""
+        with self._lock:
+            self._latency: Dict[Tuple[str, str], Histogram] = {}
+            self._prompt_tokens: Dict[Tuple[str, str], Histogram] = {}
+            self._response_tokens: Dict[Tuple[str, str], Histogram] = {}
+            self._calls: Dict[Tuple[str, str, str], int] = {}
+            self._cache: Dict[Tuple[str, str], int] = {}
+            self._cost: Dict[Tuple[str, str], float] = {}
+            self._stages: Dict[str, Histogram] = {}
+
+    def record_call(self, stage: str, model: str, latency: float, prompt_tokens: int = 0,
+                    response_tokens: int = 0, error: Optional[Exception] = None) -> None:
+        """
+        Record one model call.
+
+        Args:
+            stage: The pipeline stage that made the call (e.g. "is_finance_related")
+            model: The model name
+            latency: Wall time of the call in seconds
+            prompt_tokens: Tokens sent
+            response_tokens: Tokens received
+            error: The exception raised, if the call failed
+        """
+        key = (stage, model)
+        outcome = type(error).__name__ if error is not None else "ok"
+        input_price, output_price = MODEL_PRICES.get(model, (0.0, 0.0))
+        with self._lock:
+            self._calls[(stage, model, outcome)] = self._calls.get((stage, model, outcome), 0) + 1
+            self._latency.setdefault(key, Histogram(LATENCY_BUCKETS)).observe(latency)
+            if error is None:
+                self._prompt_tokens.setdefault(key, Histogram(TOKEN_BUCKETS)).observe(prompt_tokens)
+                self._response_tokens.setdefault(key, Histogram(TOKEN_BUCKETS)).observe(response_tokens)
+                cost = (prompt_tokens * input_price + response_tokens * output_price) / 1_000_000
+                self._cost[key] = self._cost.get(key, 0.0) + cost
+
+    def record_cache(self, stage: str, state: str) -> None:
+        """
+        Record a cache lookup (also noted on the current trace span).
+
+        Args:
+            stage: The pipeline stage doing the lookup
+            state: "fresh", "stale" or "miss"
+        """
+        result = "miss" if state == "miss" else "hit"
+        with self._lock:
+            self._cache[(stage, result)] = self._cache.get((stage, result), 0) + 1
+        annotate(**{f"cache.{stage}": state})
+
+    def record_stage(self, stage: str, duration: float) -> None:
+        """
+        Record the wall time of one query pipeline stage.
+
+        Args:
+            stage: The pipeline stage (e.g. "relevance", "search", "sentiment")
+            duration: Wall time of the stage in seconds
+        """
+        with self._lock:
+            self._stages.setdefault(stage, Histogram(LATENCY_BUCKETS)).observe(duration)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Return every metric as a JSON-serializable dictionary grouped by stage."""
+        stages: Dict[str, Any] = {}
+        with self._lock:
+            for (stage, model, outcome), count in self._calls.items():
+                entry = stages.setdefault(stage, {"models": {}, "cache": {}})
+                model_entry = entry["models"].setdefault(model, {"calls": {}})
+                model_entry["calls"][outcome] = count
+            for (stage, model), histogram in self._latency.items():
+                model_entry = stages[stage]["models"][model]
+                model_entry["latency_seconds"] = histogram.to_dict()
+                if (stage, model) in self._prompt_tokens:
+                    model_entry["prompt_tokens"] = self._prompt_tokens[(stage, model)].to_dict()
+                    model_entry["response_tokens"] = self._response_tokens[(stage, model)].to_dict()
+                model_entry["estimated_cost_usd"] = round(self._cost.get((stage, model), 0.0), 6)
+            for (stage, result), count in self._cache.items():
+                stages.setdefault(stage, {"models": {}, "cache": {}})["cache"][result] = count
+            pipeline = {stage: histogram.to_dict() for stage, histogram in self._stages.items()}
+        return {"stages": stages, "pipeline_stages": pipeline}
+
+    def to_json(self, indent: Optional[int] = 2) -> str:
+        return json.dumps(self.to_dict(), indent=indent)
+
+    def to_prometheus(self) -> str:
+        """Render the metrics in the Prometheus text exposition format."""
+        lines = []
+        with self._lock:
+            lines.append("# TYPE llm_calls_total counter")
+            for (stage, model, outcome), count in sorted(self._calls.items()):
+                lines.append(f'llm_calls_total{{stage="{stage}",model="{model}",outcome="{outcome}"}} {count}')
+
+            pipeline = {(stage, None): histogram for stage, histogram in self._stages.items()}
+            for metric, histograms in (("llm_latency_seconds", self._latency),
+                                       ("llm_prompt_tokens", self._prompt_tokens),
+                                       ("llm_response_tokens", self._response_tokens),
+                                       ("pipeline_stage_seconds", pipeline)):
+                lines.append(f"# TYPE {metric} histogram")
+                for (stage, model), histogram in sorted(histograms.items()):
+                    labels = f'stage="{stage}",model="{model}"' if model is not None else f'stage="{stage}"'
+                    running = 0
+                    for bound, count in zip(histogram.buckets, histogram.counts):
+                        running += count
+                        lines.append(f'{metric}_bucket{{{labels},le="{bound}"}} {running}')
+                    lines.append(f'{metric}_bucket{{{labels},le="+Inf"}} {histogram.count}')
+                    lines.append(f"{metric}_sum{{{labels}}} {histogram.sum}")
+                    lines.append(f"{metric}_count{{{labels}}} {histogram.count}")
+
+            lines.append("# TYPE llm_cache_lookups_total counter")
+            for (stage, result), count in sorted(self._cache.items()):
+                lines.append(f'llm_cache_lookups_total{{stage="{stage}",result="{result}"}} {count}')
+
+            lines.append("# TYPE llm_estimated_cost_usd_total counter")
+            for (stage, model), cost in sorted(self._cost.items()):
+                lines.append(f'llm_estimated_cost_usd_total{{stage="{stage}",model="{model}"}} {cost:.6f}')
+        return "\n".join(lines) + "\n"
+
+    def dump(self, path: str) -> None:
+        """Write the metrics to a file, as Prometheus text for .prom/.txt paths and JSON otherwise."""
+        content = self.to_prometheus() if path.endswith((".prom", ".txt")) else self.to_json()
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(content)
+
+
+# Process-wide metrics registry
+METRICS = LLMMetrics()
@@ -0,0 +1,160 @@
+import os
+import random
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Any, Callable, Dict, Optional
+
+# Exception class names (google.api_core and builtins) worth retrying
+RETRYABLE_ERRORS = {
+    "ResourceExhausted", "TooManyRequests", "ServiceUnavailable", "InternalServerError",
+    "DeadlineExceeded", "GatewayTimeout", "Aborted", "TimeoutError", "ConnectionError",
+    "ReadTimeout", "ConnectTimeout",
+}
+
+# HTTP statuses worth retrying: rate limiting and transient server errors
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+
+# The same statuses quoted as a whole number in an error message
+RETRYABLE_STATUS_PATTERN = re.compile(r"\b(?:429|50[0234])\b")
+
+
+class LLMDeadlineExceeded(Exception):
+    """Raised when a model call does not finish before its overall deadline."""
+
+
+class LLMAttemptTimeout(TimeoutError):
+    """Raised when a single (hedged) attempt does not finish within its timeout."""
+
+
+def is_retryable(error: Exception) -> bool:
+    """
+    Decide whether a failed model call is worth retrying.
+
+    Args:
+        error: The exception raised by the call
+
+    Returns:
+        True for rate limiting, timeouts and transient server errors
+    """
+    if isinstance(error, LLMDeadlineExceeded):
+        return False
+    if any(cls.__name__ in RETRYABLE_ERRORS for cls in type(error).__mro__):
+        return True
+    status = _status_code(error)
+    if status is not None:
+        return status in RETRYABLE_STATUSES
+    return RETRYABLE_STATUS_PATTERN.search(str(error)) is not None
+
+
+def _status_code(error: Exception) -> Optional[int]:
+    """The HTTP status carried by an exception (google.api_core .code, requests .status_code), if any."""
+    for value in (getattr(error, "code", None), getattr(error, "status_code", None),
+                  getattr(getattr(error, "response", None), "status_code", None)):
+        if isinstance(value, int):
+            return value
+    return None
+
+
+class ResilientCaller:
+    """
+    Runs model calls with per-attempt timeouts, an overall deadline, jittered
+    exponential backoff on retryable errors and optional hedged requests.
+    """
+
+    def __init__(self, attempt_timeout: Optional[float] = None, deadline: Optional[float] = None,
+                 max_retries: Optional[int] = None, backoff_base: float = 1.0, backoff_max: float = 20.0,
+                 hedge: Optional[bool] = None, max_workers: int = 8):
+        """
+        Args:
+            attempt_timeout: Seconds one attempt may take (defaults to LLM_TIMEOUT)
+            deadline: Seconds the whole call, retries included, may take (defaults to LLM_DEADLINE)
+            max_retries: Retries after the first attempt (defaults to LLM_MAX_RETRIES)
+            backoff_base: First backoff delay in seconds, doubled on every retry
+            backoff_max: Upper bound of a backoff delay in seconds
+            hedge: Send a second request when the first is slower than the p90 latency
+                (defaults to LLM_HEDGE)
+            max_workers: Threads available for hedged requests
+        """
+        self.attempt_timeout = attempt_timeout if attempt_timeout is not None else float(os.getenv("LLM_TIMEOUT", "60"))
+        self.deadline = deadline if deadline is not None else float(os.getenv("LLM_DEADLINE", "120"))
+        self.max_retries = max_retries if max_retries is not None else int(os.getenv("LLM_MAX_RETRIES", "3"))
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.hedge = hedge if hedge is not None else os.getenv("LLM_HEDGE", "0").lower() in ("1", "true", "yes")
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="llm-hedge") if self.hedge else None
+        self._lock = threading.Lock()
+        self.stats = {"calls": 0, "retries": 0, "hedges": 0, "hedge_wins": 0, "deadline_exceeded": 0, "failures": 0}
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self.stats[name] += 1
+
+    def call(self, fn: Callable[[float], Any], hedge_after: Optional[float] = None) -> Any:
+        """
+        Run a model call resiliently.
+
+        Args:
+            fn: Function performing one attempt; receives the attempt timeout in seconds
+            hedge_after: Seconds after which a hedged second request is sent
+                (None disables hedging for this call)
+
+        Returns:
+            The result of the first successful attempt
+        """
+        self._count("calls")
+        deadline = time.time() + self.deadline
+        attempt = 0
+        while True:
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                self._count("deadline_exceeded")
+                raise LLMDeadlineExceeded(f"Model call exceeded its {self.deadline:.0f}s deadline")
+            timeout = min(self.attempt_timeout, remaining)
+            try:
+                if self.hedge and hedge_after is not None and hedge_after < timeout:
+                    return self._hedged(fn, timeout, hedge_after)
+                return fn(timeout)
+            except Exception as e:
+                if not is_retryable(e) or attempt >= self.max_retries:
+                    self._count("failures")
+                    raise
+                attempt += 1
+                # Full jitter keeps simultaneous clients from retrying in lockstep
+                delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** (attempt - 1)))
+                if time.time() + delay >= deadline:
+                    self._count("failures")
+                    raise
+                self._count("retries")
+                print(f"Retrying model call in {delay:.1f}s after error: {e}")
+                time.sleep(delay)
+
+    def _hedged(self, fn: Callable[[float], Any], timeout: float, hedge_after: float) -> Any:
+        """Run one attempt, adding a second identical request if the first is slow."""
+        end = time.time() + timeout
+        first = self._executor.submit(fn, timeout)
+        done, _ = wait([first], timeout=hedge_after)
+        if first in done:
+            return first.result()
+
+        self._count("hedges")
+        second = self._executor.submit(fn, max(0.0, end - time.time()))
+        pending = {first, second}
+        error = None
+        while pending:
+            done, pending = wait(pending, timeout=max(0.0, end - time.time()), return_when=FIRST_COMPLETED)
+            if not done:
+                raise LLMAttemptTimeout(f"Hedged model call did not finish within {timeout:.0f}s")
+            for future in done:
+                if future.exception() is None:
+                    if future is second:
+                        self._count("hedge_wins")
+                    return future.result()
+                error = future.exception()
+        raise error
+
+    def get_stats(self) -> Dict[str, int]:
+        """Return the call, retry and hedge counters."""
+        with self._lock:
+            return dict(self.stats)
@@ -0,0 +1,226 @@
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from llm_backends import create_backend
+from llm_resilience import ResilientCaller
+from llm_metrics import METRICS, LLMMetrics, estimate_tokens
+from tracing import record_span
+
+FAST_MODEL = "gemini-2.0-flash"
+LARGE_MODEL = "gemini-2.5-pro-exp-03-25"
+
+# Which tier each kind of call starts on
+TASK_TIERS = {
+    "classify": "fast",
+    "summarize": "fast",
+    "analyze": "large",
+    "batch_analyze": "large",
+}
+
+# Latency assumed for a model before any calls have been measured (seconds)
+DEFAULT_LATENCY = {"fast": 2.0, "large": 15.0}
+
+
+def percentile(samples: List[float], pct: float) -> Optional[float]:
+    """Return the given percentile (0-100) of a list of samples, or None if empty."""
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * (len(ordered) - 1)))))
+    return ordered[index]
+
+
+class ModelRouter:
+    """
+    Routes model calls to a fast or a large model.
+
+    The tier is chosen from the task type, the prompt size and an optional
+    per-request latency budget; every decision and its measured latency is recorded.
+    """
+
+    def __init__(self, fast_model: Optional[str] = None, large_model: Optional[str] = None,
+                 small_prompt_chars: int = 2000, model_factory: Optional[Callable[[str], Any]] = None,
+                 history_size: int = 200, resilience: Optional[ResilientCaller] = None,
+                 hedge_min_samples: int = 10, metrics: Optional[LLMMetrics] = None):
+        """
+        Args:
+            fast_model: Name of the low-latency model (defaults to GEMINI_FAST_MODEL)
+            large_model: Name of the large model (defaults to GEMINI_LARGE_MODEL)
+            small_prompt_chars: Prompts up to this size are sent to the fast model whatever the task
+            model_factory: Callable building a model object from its name (defaults to
+                the model method of the backend selected by LLM_BACKEND)
+            history_size: Number of recent decisions and latency samples kept per model
+            resilience: Timeout/retry/hedging policy applied to every call
+            hedge_min_samples: Latency samples a model needs before its calls are hedged
+            metrics: Metrics registry receiving every call (defaults to the process-wide one)
+        """
+        self.models = {
+            "fast": fast_model or os.getenv("GEMINI_FAST_MODEL", FAST_MODEL),
+            "large": large_model or os.getenv("GEMINI_LARGE_MODEL", LARGE_MODEL),
+        }
+        self.small_prompt_chars = small_prompt_chars
+        self._model_factory = model_factory or create_backend().model
+        self._instances: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+        self._latencies: Dict[str, deque] = {name: deque(maxlen=history_size) for name in self.models.values()}
+        self._counts: Dict[str, Dict[str, int]] = {name: {"calls": 0, "errors": 0} for name in self.models.values()}
+        self.decisions: deque = deque(maxlen=history_size)
+        self.resilience = resilience or ResilientCaller()
+        self.hedge_min_samples = hedge_min_samples
+        self.metrics = metrics or METRICS
+
+    def model(self, name: str) -> Any:
+        """Return the (cached) model object for a model name."""
+        with self._lock:
+            if name not in self._instances:
+                self._instances[name] = self._model_factory(name)
+            return self._instances[name]
+
+    def expected_latency(self, name: str, pct: float = 50) -> float:
+        """Return the measured latency percentile of a model, or a prior if it has not been called yet."""
+        with self._lock:
+            samples = list(self._latencies.get(name, ()))
+        measured = percentile(samples, pct)
+        if measured is not None:
+            return measured
+        tier = "fast" if name == self.models["fast"] else "large"
+        return DEFAULT_LATENCY[tier]
+
+    def hedge_delay(self, name: str) -> Optional[float]:
+        """Return the p90 latency of a model once enough calls were measured, else None."""
+        with self._lock:
+            samples = list(self._latencies.get(name, ()))
+        if len(samples) < self.hedge_min_samples:
+            return None
+        return percentile(samples, 90)
+
+    def choose(self, task: str, prompt_chars: int, latency_budget: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Decide which model serves a call.
+
+        Args:
+            task: The kind of call ("classify", "summarize", "analyze", ...)
+            prompt_chars: Size of the prompt in characters
+            latency_budget: Seconds the caller can wait, if constrained
+
+        Returns:
+            Dictionary with the chosen tier, model name and the reason
+        """
+        tier = TASK_TIERS.get(task, "large")
+        reason = f"task:{task}"
+
+        if tier == "large" and prompt_chars <= self.small_prompt_chars:
+            tier, reason = "fast", "small_prompt"
+
+        if tier == "large" and latency_budget is not None:
+            if self.expected_latency(self.models["large"]) > latency_budget:
+                tier, reason = "fast", "latency_budget"
+
+        return {"tier": tier, "model": self.models[tier], "reason": reason}
+
+    def generate(self, task: str, prompt: str, latency_budget: Optional[float] = None,
+                 stream: bool = False, stage: Optional[str] = None, **kwargs) -> Any:
+        """
+        Route a generate_content call and record the decision and latency.
+
+        Args:
+            task: The kind of call ("classify", "summarize", "analyze", ...)
+            prompt: The prompt text
+            latency_budget: Seconds the caller can wait, if constrained
+            stream: Whether to stream the response
+            stage: Pipeline stage reported in the metrics (defaults to the task)
+            **kwargs: Extra arguments for generate_content (e.g. generation_config)
+
+        Returns:
+            The model response (an iterator of chunks when streaming)
+        """
+        decision = self.choose(task, len(prompt), latency_budget)
+        decision["stage"] = stage or task
+        model = self.model(decision["model"])
+        start_time = time.time()
+        try:
+            if stream:
+                response = self.resilience.call(
+                    lambda timeout: model.generate_content(prompt, stream=True,
+                                                           request_options={"timeout": timeout}, **kwargs)
+                )
+                return self._record_stream(response, task, decision, start_time, prompt)
+            response = self.resilience.call(
+                lambda timeout: model.generate_content(prompt, request_options={"timeout": timeout}, **kwargs),
+                hedge_after=self.hedge_delay(decision["model"])
+            )
+        except Exception as e:
+            self._record(task, decision, start_time, error=e)
+            raise
+        self._record(task, decision, start_time, tokens=self._token_counts(response, prompt))
+        return response
+
+    def _record_stream(self, response: Any, task: str, decision: Dict[str, Any], start_time: float,
+                       prompt: str) -> Iterator[Any]:
+        """Yield streamed chunks, recording latency and tokens once the stream is exhausted."""
+        last_chunk = None
+        text = ""
+        try:
+            for chunk in response:
+                last_chunk = chunk
+                text += getattr(chunk, "text", "") or ""
+                yield chunk
+        except Exception as e:
+            self._record(task, decision, start_time, error=e)
+            raise
+        self._record(task, decision, start_time, tokens=self._token_counts(last_chunk, prompt, text))
+
+    def _token_counts(self, response: Any, prompt: str, text: Optional[str] = None) -> Tuple[int, int]:
+        """Read (prompt, response) token counts from the usage metadata, estimating what is missing."""
+        usage = getattr(response, "usage_metadata", None)
+        prompt_tokens = getattr(usage, "prompt_token_count", 0) or estimate_tokens(prompt)
+        response_tokens = getattr(usage, "candidates_token_count", 0)
+        if not response_tokens:
+            if text is None:
+                try:
+                    text = response.text
+                except Exception:
+                    text = ""
+            response_tokens = estimate_tokens(text)
+        return prompt_tokens, response_tokens
+
+    def _record(self, task: str, decision: Dict[str, Any], start_time: float,
+                error: Optional[Exception] = None, tokens: Tuple[int, int] = (0, 0)) -> None:
+        ended = time.time()
+        latency = ended - start_time
+        name = decision["model"]
+        record_span("llm.generate", start_time, ended, error, stage=decision["stage"], task=task, model=name,
+                    reason=decision["reason"], prompt_tokens=tokens[0], response_tokens=tokens[1])
+        with self._lock:
+            self._counts[name]["calls"] += 1
+            if error is not None:
+                self._counts[name]["errors"] += 1
+            else:
+                self._latencies[name].append(latency)
+            self.decisions.append({
+                "task": task,
+                "model": name,
+                "reason": decision["reason"],
+                "latency": round(latency, 3),
+                "error": error is not None,
+                "timestamp": start_time
+            })
+        self.metrics.record_call(decision["stage"], name, latency, tokens[0], tokens[1], error)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Return per-model call counts and latency percentiles plus the recent decisions."""
+        with self._lock:
+            models = {}
+            for name, counts in self._counts.items():
+                samples = list(self._latencies[name])
+                models[name] = {
+                    "calls": counts["calls"],
+                    "errors": counts["errors"],
+                    "p50_latency": percentile(samples, 50),
+                    "p90_latency": percentile(samples, 90),
+                }
+            recent = list(self.decisions)[-20:]
+        return {"models": models, "resilience": self.resilience.get_stats(), "recent_decisions": recent}
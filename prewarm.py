@@ -0,0 +1,277 @@
+import argparse
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from dotenv import load_dotenv
+
+from entity_index import DEFAULT_SYMBOL_MASTER, read_symbol_master
+from example_queries import all_example_queries
+from financial_agent import FinancialAgent
+from stock_tools import shared_fetches
+
+# Stock queries warmed for every watchlist ticker. Quotes are left out: they
+# only stay fresh for seconds, so warming them ahead of time is pointless.
+WARM_TEMPLATES = (
+    "Show me a chart of {ticker}",
+    "Technical analysis chart of {ticker}",
+    "RSI and MACD of {ticker}",
+    "Historical data and sector of {ticker}",
+)
+
+
+class TokenBucket:
+    """
+    Blocking token bucket limiting how fast upstream services are called.
+
+    Tokens are added at a steady rate up to a maximum burst; each call takes one.
+    """
+
+    def __init__(self, rate: float, capacity: float = 1):
+        """
+        Args:
+            rate: Tokens added per second
+            capacity: Maximum number of tokens that can accumulate
+        """
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens: float = 1) -> float:
+        """
+        Take tokens, waiting until enough are available.
+
+        Returns:
+            Seconds spent waiting
+        """
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return waited
+                wait = (tokens - self._tokens) / self.rate
+            time.sleep(wait)
+            waited += wait
+
+
+def default_watchlist() -> List[str]:
+    """Return the equities of the symbol master (SYMBOL_MASTER_PATH)."""
+    path = os.getenv("SYMBOL_MASTER_PATH") or DEFAULT_SYMBOL_MASTER
+    return [entity.symbol for entity, _ in read_symbol_master(path) if entity.kind == "equity"]
+
+
+class Prewarmer:
+    """
+    Refreshes the answer cache for a watchlist before users ask.
+
+    Every ticker gets the WARM_TEMPLATES stock queries (charts, indicators,
+    history and metadata), which share one download per ticker; the extra
+    queries (by default the app's example queries) get their search and
+    analysis. Answers that are still fresh are skipped, and each ticker or
+    query takes one token of the rate limiter. A ticker query that does not
+    route to a stock answer is skipped and reported as unroutable, rather
+    than warmed as a full web search and analysis every run.
+    """
+
+    def __init__(self, tickers: Optional[List[str]] = None, queries: Optional[List[str]] = None,
+                 rate: float = 0.5, burst: float = 2, agent: Optional[FinancialAgent] = None):
+        """
+        Args:
+            tickers: Watchlist tickers (defaults to the symbol master equities)
+            queries: Extra queries to warm (defaults to the example queries)
+            rate: Upstream batches (a ticker or a query) started per second
+            burst: Batches that may start back to back after an idle period
+            agent: Agent whose tools and answer cache are warmed
+        """
+        self.tickers = default_watchlist() if tickers is None else list(tickers)
+        self.queries = all_example_queries() if queries is None else list(queries)
+        self.bucket = TokenBucket(rate, burst)
+        self.agent = agent or FinancialAgent()
+        self.last_run: Dict[str, Any] = {}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def warm_set(self) -> Dict[str, List[str]]:
+        """Return the warmed queries, grouped by ticker (extra queries are grouped under "")."""
+        groups = {ticker: [template.format(ticker=ticker) for template in WARM_TEMPLATES]
+                  for ticker in self.tickers}
+        groups[""] = list(self.queries)
+        return groups
+
+    def run_once(self) -> Dict[str, Any]:
+        """
+        Refresh every warm-set answer that is stale or missing.
+
+        Returns:
+            Summary with the number of answers refreshed, skipped (still fresh, or
+            never cached), unroutable (ticker queries not answered from stock data)
+            and failed, the seconds spent waiting on the rate limiter and the total time
+        """
+        started = time.time()
+        summary = {"refreshed": 0, "skipped": 0, "unroutable": 0, "failed": 0, "rate_limited_seconds": 0.0}
+        for ticker, queries in self.warm_set().items():
+            if self._stop.is_set():
+                break
+            if ticker:
+                unroutable = self.unroutable_queries(queries)
+                if unroutable:
+                    print(f"Not pre-warming {ticker}: no stock answer for {', '.join(map(repr, unroutable))}")
+                    summary["unroutable"] += len(unroutable)
+                    queries = [query for query in queries if query not in unroutable]
+            due = [query for query in queries if self._is_due(query)]
+            summary["skipped"] += len(queries) - len(due)
+            if ticker:
+                # A ticker's queries share its history and metadata downloads
+                summary["rate_limited_seconds"] += self.bucket.acquire()
+                with shared_fetches():
+                    for query in due:
+                        self._refresh(query, summary)
+            else:
+                for query in due:
+                    if self._stop.is_set():
+                        break
+                    summary["rate_limited_seconds"] += self.bucket.acquire()
+                    self._refresh(query, summary)
+        summary["rate_limited_seconds"] = round(summary["rate_limited_seconds"], 2)
+        summary["duration"] = round(time.time() - started, 2)
+        self.last_run = summary
+        return summary
+
+    def unroutable_queries(self, queries: List[str]) -> List[str]:
+        """Return the queries that are not answered from stock data (see FinancialAgent._answer_slot)."""
+        unroutable = []
+        for query in queries:
+            state = self.agent.cached_answer_state(query)
+            if state is None or state[0] == "report":
+                unroutable.append(query)
+        return unroutable
+
+    def _state(self, query: str):
+        # Quotes go stale within seconds, so they are not part of the warm set
+        state = self.agent.cached_answer_state(query)
+        return None if state is None or state[0] == "quote" else state
+
+    def _is_due(self, query: str) -> bool:
+        state = self._state(query)
+        return state is not None and state[1] != "fresh"
+
+    def _refresh(self, query: str, summary: Dict[str, Any]) -> None:
+        try:
+            answer = self.agent.refresh_answer(query)
+            ok = answer is not None and not answer.get("error")
+        except Exception as e:
+            print(f"Pre-warming failed for {query!r}: {e}")
+            ok = False
+        summary["refreshed" if ok else "failed"] += 1
+
+    def freshness_report(self) -> Dict[str, Any]:
+        """
+        Report how much of the warm set is currently fresh.
+
+        Returns:
+            Counts of fresh, stale and missing answers, overall and by answer class,
+            the fresh fraction, and the summary of the last run
+        """
+        report = {"total": 0, "fresh": 0, "stale": 0, "miss": 0, "by_class": {}}
+        for ticker, queries in self.warm_set().items():
+            unroutable = self.unroutable_queries(queries) if ticker else []
+            for query in queries:
+                if query in unroutable:
+                    continue
+                state = self._state(query)
+                if state is None:
+                    continue
+                name, freshness = state
+                by_class = report["by_class"].setdefault(name, {"total": 0, "fresh": 0, "stale": 0, "miss": 0})
+                for counts in (report, by_class):
+                    counts["total"] += 1
+                    counts[freshness] += 1
+        report["fresh_fraction"] = round(report["fresh"] / report["total"], 3) if report["total"] else 1.0
+        report["last_run"] = self.last_run
+        return report
+
+    def start(self, interval: float) -> None:
+        """Warm the cache now and then every interval seconds, in a background thread."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+
+        def loop():
+            while not self._stop.is_set():
+                try:
+                    self.run_once()
+                except Exception as e:
+                    print(f"Pre-warming run failed: {e}")
+                self._stop.wait(interval)
+
+        self._thread = threading.Thread(target=loop, name="prewarmer", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop the background thread after the answer being refreshed."""
+        self._stop.set()
+
+
+_prewarmer: Optional[Prewarmer] = None
+_prewarmer_lock = threading.Lock()
+
+
+def start_background_prewarmer() -> Optional[Prewarmer]:
+    """
+    Start the process-wide pre-warmer if PREWARM_INTERVAL is set (seconds between runs).
+
+    PREWARM_TICKERS (comma-separated) overrides the watchlist and PREWARM_RATE the
+    rate limit. Calling it again returns the running pre-warmer.
+    """
+    global _prewarmer
+    interval = float(os.getenv("PREWARM_INTERVAL", "0"))
+    if interval <= 0:
+        return None
+    with _prewarmer_lock:
+        if _prewarmer is None:
+            tickers = os.getenv("PREWARM_TICKERS")
+            _prewarmer = Prewarmer(
+                tickers=[ticker.strip().upper() for ticker in tickers.split(",") if ticker.strip()] if tickers else None,
+                rate=float(os.getenv("PREWARM_RATE", "0.5"))
+            )
+            _prewarmer.start(interval)
+    return _prewarmer
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Pre-warm the answer cache for a watchlist.")
+    parser.add_argument("--tickers", nargs="*", help="Watchlist tickers (default: every equity of the symbol master)")
+    parser.add_argument("--queries", nargs="*", help="Extra queries to warm (default: the app's example queries)")
+    parser.add_argument("--rate", type=float, default=float(os.getenv("PREWARM_RATE", "0.5")),
+                        help="Tickers or queries started per second")
+    parser.add_argument("--burst", type=float, default=2, help="Tickers or queries started back to back at most")
+    parser.add_argument("--interval", type=float, default=0,
+                        help="Keep running, warming every INTERVAL seconds (default: warm once and exit)")
+    parser.add_argument("--report", action="store_true", help="Only print the freshness report")
+    args = parser.parse_args()
+
+    prewarmer = Prewarmer(tickers=args.tickers, queries=args.queries, rate=args.rate, burst=args.burst)
+    if args.report:
+        print(json.dumps(prewarmer.freshness_report(), indent=2))
+        return
+
+    while True:
+        summary = prewarmer.run_once()
+        print(json.dumps(prewarmer.freshness_report(), indent=2))
+        if args.interval <= 0:
+            return
+        print(f"Refreshed {summary['refreshed']} answers, next run in {args.interval:g}s")
+        time.sleep(args.interval)
+
+
+if __name__ == "__main__":
+    load_dotenv()
+    main()
@@ -0,0 +1,163 @@
+import contextvars
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import Executor, Future
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional
+
+# Job of the query running in the calling context; stock tasks started with a copy of it report to the same job
+_current_job: ContextVar[Optional["QueryJob"]] = ContextVar("query_job", default=None)
+
+# Job states that are final
+FINISHED_STATES = ("done", "cancelled", "failed")
+
+
+class QueryCancelled(Exception):
+    """Raised inside a query at its next cancellation point once its job has been cancelled."""
+
+
+class QueryJob:
+    """
+    One query running in the background, with the progress it has reported so far.
+
+    Progress is kept as state rather than a log: the stages started and finished,
+    the latest partial analysis, the sources read and the finished stock query
+    parts. Every update bumps version, so a poller can skip unchanged snapshots.
+    """
+
+    def __init__(self, query: str):
+        self.job_id = uuid.uuid4().hex[:12]
+        self.query = query
+        self.status = "queued"
+        self.submitted = time.time()
+        self.started: Optional[float] = None
+        self.finished: Optional[float] = None
+        self.result: Optional[Dict[str, Any]] = None
+        self.error: Optional[str] = None
+        self.future: Optional[Future] = None
+        self.version = 0
+        self._stages: List[Dict[str, Any]] = []
+        self._partial: Dict[str, Any] = {}
+        self._sources: List[Dict[str, Any]] = []
+        self._parts: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._cancel = threading.Event()
+
+    @property
+    def done(self) -> bool:
+        return self.status in FINISHED_STATES
+
+    @property
+    def cancel_requested(self) -> bool:
+        return self._cancel.is_set()
+
+    def cancel(self) -> None:
+        """Ask the query to stop; it stops at its next stage, streamed chunk or page fetch."""
+        self._cancel.set()
+        if self.future is not None and self.future.cancel():
+            # Never started, so no worker will finish it
+            self._finish("cancelled")
+        else:
+            self._bump()
+
+    def update(self, event: str, **data) -> None:
+        """
+        Record a progress event.
+
+        Args:
+            event: "stage_started" (stage), "stage_finished" (stage, duration),
+                "partial" (sections), "source" (title, url) or "part" (name, result)
+            **data: The event's fields
+        """
+        with self._lock:
+            if event == "stage_started":
+                self._stages.append({"stage": data["stage"], "status": "running", "duration": None})
+            elif event == "stage_finished":
+                for stage in reversed(self._stages):
+                    if stage["stage"] == data["stage"] and stage["status"] == "running":
+                        stage.update(status="finished", duration=data["duration"])
+                        break
+            elif event == "partial":
+                self._partial = dict(data["sections"])
+            elif event == "source":
+                self._sources.append({"title": data["title"], "url": data["url"]})
+            elif event == "part":
+                self._parts[data["name"]] = data["result"]
+            self.version += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Return the job's state and progress so far, safe to read while the query runs."""
+        with self._lock:
+            return {
+                "job_id": self.job_id,
+                "query": self.query,
+                "status": self.status,
+                "cancel_requested": self._cancel.is_set(),
+                "version": self.version,
+                "elapsed": (self.finished or time.time()) - (self.started or self.submitted),
+                "stages": [dict(stage) for stage in self._stages],
+                "partial": dict(self._partial),
+                "sources": list(self._sources),
+                "parts": dict(self._parts),
+            }
+
+    def _run(self, agent: Any) -> None:
+        _current_job.set(self)
+        self.started = time.time()
+        self.status = "running"
+        self._bump()
+        try:
+            check_cancelled()
+            result = agent.handle_query(self.query, on_partial=lambda sections: self.update("partial", sections=sections))
+        except QueryCancelled:
+            self._finish("cancelled")
+        except Exception as e:
+            self.error = f"{e}\n\n{traceback.format_exc()}"
+            self._finish("failed")
+        else:
+            self.result = result
+            self._finish("done")
+
+    def _finish(self, status: str) -> None:
+        with self._lock:
+            self.finished = time.time()
+            self.status = status
+            self.version += 1
+
+    def _bump(self) -> None:
+        with self._lock:
+            self.version += 1
+
+
+def submit_query(agent: Any, query: str, executor: Executor) -> QueryJob:
+    """
+    Run agent.handle_query(query) on an executor and return its job right away.
+
+    Args:
+        agent: The FinancialAgent answering the query
+        query: The user query
+        executor: Executor running the query
+
+    Returns:
+        The job; poll job.snapshot() for progress and read job.result once job.done
+    """
+    job = QueryJob(query)
+    # The query runs in its own copy of the context, so the job is only visible to it
+    job.future = executor.submit(contextvars.copy_context().run, job._run, agent)
+    return job
+
+
+def report_progress(event: str, **data) -> None:
+    """Report a progress event to the job running the calling query, if any (see QueryJob.update)."""
+    job = _current_job.get()
+    if job is not None:
+        job.update(event, **data)
+
+
+def check_cancelled() -> None:
+    """Cancellation point: raise QueryCancelled if the job running the calling query was cancelled."""
+    job = _current_job.get()
+    if job is not None and job.cancel_requested:
+        raise QueryCancelled(job.query)
@@ -0,0 +1,175 @@
+import re
+from dataclasses import dataclass, field
+from typing import Dict, FrozenSet, List, Optional, Set, Tuple
+
+# Keyword -> feature flags it signals (matched as substrings of the lower-cased query)
+FEATURE_KEYWORDS: Dict[str, Tuple[str, ...]] = {
+    # Stock price
+    "stock price": ("price",), "price of": ("price",), "current price": ("price",),
+    "trading at": ("price",), "what is the price": ("price",),
+    "price": ("quote",), "quote": ("quote",),
+    # Charts
+    "chart": ("chart", "plot"), "graph": ("chart", "plot"), "plot": ("chart", "plot"),
+    "performance": ("chart", "plot"), "trend": ("chart", "plot"), "historical": ("chart", "historical"),
+    # Company metadata
+    "market cap": ("metadata",), "sector": ("metadata",), "dividend": ("metadata",), "p/e": ("metadata",),
+    "pe ratio": ("metadata",), "52 week": ("metadata",), "52-week": ("metadata",),
+    # Comparison
+    "compare": ("compare",), "vs": ("compare",), "versus": ("compare",), "against": ("compare",),
+    "which is better": ("compare",),
+    # Technical analysis
+    "technical": ("technical",), "indicator": ("technical",),
+    "rsi": ("ma_or_osc", "rsi"), "relative strength index": ("rsi",),
+    "macd": ("ma_or_osc", "macd"), "moving average convergence divergence": ("macd",),
+    "moving average": ("ma_or_osc",),
+    "sma": ("ma_or_osc", "sma", "technical_chart"), "simple moving average": ("sma",),
+    "ema": ("ma_or_osc", "ema", "technical_chart"), "exponential moving average": ("ema",),
+    # Indicator windows
+    "50": ("window_50",), "100": ("window_100",), "200": ("window_200",),
+}
+
+# Keyword -> yfinance period it requests
+PERIOD_KEYWORDS: Dict[str, str] = {
+    "day": "1d", "24 hour": "1d", "today": "1d",
+    "week": "1wk",
+    "month": "1mo",
+    "3 month": "3mo", "quarter": "3mo",
+    "6 month": "6mo",
+    "year": "1y", "12 month": "1y",
+    "2 year": "2y",
+    "5 year": "5y",
+    "10 year": "10y",
+    "max": "max", "all time": "max", "all-time": "max",
+}
+
+# When several periods are mentioned, the most specific one wins
+PERIOD_PRIORITY = ("max", "10y", "5y", "2y", "6mo", "3mo", "1d", "1wk", "1mo", "1y")
+
+# Bar interval fetched for each period; the others use daily bars
+PERIOD_INTERVALS = {"1d": "5m"}
+
+# Independent sub-tasks of a multi-part query, in presentation order
+PART_ORDER = ("quote", "metadata", "rsi", "macd", "sma", "ema", "chart", "historical")
+
+# Indicator windows in order of precedence, and the default
+WINDOW_PRIORITY = ((50, "window_50"), (200, "window_200"), (100, "window_100"))
+DEFAULT_WINDOW = 20
+
+
+@dataclass
+class QueryIntent:
+    """Structured result of routing a stock query."""
+
+    kind: Optional[str]  # "multi", "price", "chart", "comparison", "indicators", "historical" or None
+    tickers: List[str] = field(default_factory=list)
+    period: str = "1y"
+    chart_style: str = "price"  # "price" or "technical"
+    indicators: List[str] = field(default_factory=list)  # subset of rsi, macd, sma, ema
+    windows: Dict[str, int] = field(default_factory=dict)  # moving-average windows by indicator
+    parts: List[str] = field(default_factory=list)  # sub-tasks requested, from PART_ORDER
+    features: FrozenSet[str] = frozenset()  # every feature flag found in the query
+
+
+class IntentRouter:
+    """
+    Single-pass query router for stock questions.
+
+    All keywords are compiled into one alternation regex, longest keyword first,
+    so a single scan of the query finds every feature and period mention. Each
+    keyword also carries the flags of the shorter keywords it contains, which
+    keeps the substring semantics of the original checks.
+    """
+
+    def __init__(self, feature_keywords: Optional[Dict[str, Tuple[str, ...]]] = None,
+                 period_keywords: Optional[Dict[str, str]] = None):
+        feature_keywords = feature_keywords or FEATURE_KEYWORDS
+        period_keywords = period_keywords or PERIOD_KEYWORDS
+
+        keywords = set(feature_keywords) | set(period_keywords)
+        self._flags: Dict[str, FrozenSet[str]] = {}
+        for keyword in keywords:
+            flags: Set[str] = set()
+            for other, other_flags in feature_keywords.items():
+                if other in keyword:
+                    flags.update(other_flags)
+            self._flags[keyword] = frozenset(flags)
+        self._periods = dict(period_keywords)
+
+        ordered = sorted(keywords, key=len, reverse=True)
+        self._pattern = re.compile("|".join(re.escape(keyword) for keyword in ordered))
+
+    def scan(self, query: str) -> Tuple[FrozenSet[str], Optional[str]]:
+        """
+        Scan a query once for feature flags and the requested period.
+
+        Args:
+            query: The user query
+
+        Returns:
+            Tuple of (feature flags, period or None if no period was mentioned)
+        """
+        flags: Set[str] = set()
+        periods: Set[str] = set()
+        for match in self._pattern.finditer(query.lower()):
+            keyword = match.group(0)
+            flags.update(self._flags[keyword])
+            if keyword in self._periods:
+                periods.add(self._periods[keyword])
+
+        period = next((p for p in PERIOD_PRIORITY if p in periods), None)
+        return frozenset(flags), period
+
+    def route(self, query: str, tickers: List[str]) -> QueryIntent:
+        """
+        Turn a query and its tickers into a structured intent.
+
+        A query asking for two or more independent parts (quote, metadata, each
+        indicator, chart, historical statistics) is routed as "multi", unless it
+        is a technical query for indicators only. Otherwise
+        the branch precedence matches FinancialAgent.handle_stock_query: price,
+        chart, comparison, indicators, historical.
+
+        Args:
+            query: The user query
+            tickers: Tickers extracted from the query
+
+        Returns:
+            The routed intent (kind None when it is not a stock query)
+        """
+        flags, period = self.scan(query)
+        intent = QueryIntent(kind=None, tickers=list(tickers), period=period or "1y", features=flags)
+
+        indicators = [name for name in ("rsi", "macd", "sma", "ema") if name in flags]
+        window = next((w for w, flag in WINDOW_PRIORITY if flag in flags), DEFAULT_WINDOW)
+        intent.indicators = indicators
+        intent.windows = {name: window for name in ("sma", "ema") if name in indicators}
+        if "chart" in flags and ("technical" in flags or "technical_chart" in flags):
+            intent.chart_style = "technical"
+
+        requested = set(indicators)
+        requested.update(part for part, flag in (("quote", "quote"), ("metadata", "metadata"), ("chart", "plot"),
+                                                 ("historical", "historical")) if flag in flags)
+        intent.parts = [part for part in PART_ORDER if part in requested]
+
+        if not tickers:
+            return intent
+
+        # Several indicators alone are already served together by the indicators branch
+        indicators_only = "technical" in flags and set(intent.parts) <= set(indicators)
+        if len(intent.parts) >= 2 and not indicators_only:
+            intent.kind = "multi"
+        elif "price" in flags:
+            intent.kind = "price"
+        elif "chart" in flags:
+            intent.kind = "chart"
+        elif "compare" in flags and len(tickers) > 1:
+            intent.kind = "comparison"
+        elif "technical" in flags and "ma_or_osc" in flags:
+            intent.kind = "indicators"
+        elif "historical" in flags:
+            intent.kind = "historical"
+        return intent
+
+
+# Built once at import time and shared by every agent
+STOCK_INTENT_ROUTER = IntentRouter()
@@ -0,0 +1,279 @@
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from singleflight import SingleFlight
+
+
+def normalize_query(query: str) -> str:
+    """
+    Normalize a user query so trivially different phrasings share a cache key.
+
+    Args:
+        query: The raw user query
+
+    Returns:
+        Lower-cased query with collapsed whitespace and no trailing punctuation
+    """
+    normalized = re.sub(r'\s+', ' ', query.lower()).strip()
+    return normalized.strip(' .,?!')
+
+
+def content_hash(text: str) -> str:
+    """Return a stable SHA-256 hex digest of the given text."""
+    return hashlib.sha256(text.encode("utf-8", errors="replace")).hexdigest()
+
+
+def make_key(*parts: str) -> str:
+    """Build a content-addressed cache key from several string parts."""
+    return content_hash("\x1f".join(parts))
+
+
+class ResponseCache:
+    """
+    Two-tier response cache: an in-memory LRU in front of a persistent SQLite store.
+
+    Entries expire after a TTL. Expired entries that are still inside the
+    stale window are served immediately while a background refresh recomputes
+    them (stale-while-revalidate).
+    """
+
+    def __init__(self, namespace: str, max_entries: int = 256, ttl: float = 3600,
+                 stale_ttl: float = 0, persist_path: Optional[str] = None):
+        """
+        Args:
+            namespace: Logical namespace, so several caches can share one database file
+            max_entries: Maximum number of entries kept in memory
+            ttl: Default time-to-live of an entry in seconds (0 disables caching)
+            stale_ttl: Extra seconds an expired entry may be served while it is refreshed
+            persist_path: SQLite file for the persistent tier (None keeps the cache in memory only)
+        """
+        self.namespace = namespace
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self._memory: "OrderedDict[str, Tuple[Any, float, float]]" = OrderedDict()
+        self._lock = threading.RLock()
+        self._refreshing = set()
+        self._flights = SingleFlight()
+        self.stats = {"hits": 0, "stale_hits": 0, "misses": 0, "refreshes": 0, "refresh_errors": 0}
+
+        self._db = None
+        if persist_path:
+            try:
+                directory = os.path.dirname(persist_path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                self._db = sqlite3.connect(persist_path, check_same_thread=False)
+                self._db.execute(
+                    "CREATE TABLE IF NOT EXISTS cache_entries ("
+                    "namespace TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL, "
+                    "stored_at REAL NOT NULL, ttl REAL NOT NULL, PRIMARY KEY (namespace, key))"
+                )
+                self._db.commit()
+            except Exception as e:
+                print(f"Persistent cache disabled, could not open {persist_path}: {e}")
+                self._db = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0
+
+    def _state(self, stored_at: float, ttl: float) -> str:
+        age = time.time() - stored_at
+        if age <= ttl:
+            return "fresh"
+        if age <= ttl + self.stale_ttl:
+            return "stale"
+        return "expired"
+
+    def _remember(self, key: str, value: Any, stored_at: float, ttl: float) -> None:
+        self._memory[key] = (value, stored_at, ttl)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def _load(self, key: str) -> Optional[Tuple[Any, float, float]]:
+        if self._db is None:
+            return None
+        try:
+            row = self._db.execute(
+                "SELECT value, stored_at, ttl FROM cache_entries WHERE namespace = ? AND key = ?",
+                (self.namespace, key)
+            ).fetchone()
+        except Exception as e:
+            print(f"Error reading persistent cache: {e}")
+            return None
+        if row is None:
+            return None
+        return json.loads(row[0]), row[1], row[2]
+
+    def _store(self, key: str, value: Any, stored_at: float, ttl: float) -> None:
+        if self._db is None:
+            return
+        try:
+            self._db.execute(
+                "INSERT OR REPLACE INTO cache_entries (namespace, key, value, stored_at, ttl) VALUES (?, ?, ?, ?, ?)",
+                (self.namespace, key, json.dumps(value), stored_at, ttl)
+            )
+            self._db.commit()
+        except Exception as e:
+            print(f"Error writing persistent cache: {e}")
+
+    def get(self, key: str) -> Tuple[Optional[Any], str]:
+        """
+        Look up a key in memory, then in the persistent tier.
+
+        Args:
+            key: The cache key
+
+        Returns:
+            Tuple of (value, state) where state is "fresh", "stale" or "miss"
+        """
+        if not self.enabled:
+            return None, "miss"
+
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is None:
+                entry = self._load(key)
+                if entry is not None:
+                    self._remember(key, *entry)
+            else:
+                self._memory.move_to_end(key)
+
+            if entry is None:
+                return None, "miss"
+
+            value, stored_at, ttl = entry
+            state = self._state(stored_at, ttl)
+            if state == "expired":
+                self._memory.pop(key, None)
+                return None, "miss"
+            return value, state
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        """
+        Store a JSON-serializable value in both tiers.
+
+        Args:
+            key: The cache key
+            value: The value to store
+            ttl: Time-to-live in seconds (defaults to the cache TTL)
+        """
+        if not self.enabled:
+            return
+        ttl = self.ttl if ttl is None else ttl
+        stored_at = time.time()
+        with self._lock:
+            self._remember(key, value, stored_at, ttl)
+            self._store(key, value, stored_at, ttl)
+
+    def invalidate(self, key: str) -> None:
+        """Remove a key from both tiers."""
+        with self._lock:
+            self._memory.pop(key, None)
+            if self._db is not None:
+                self._db.execute("DELETE FROM cache_entries WHERE namespace = ? AND key = ?", (self.namespace, key))
+                self._db.commit()
+
+    def clear(self) -> None:
+        """Remove every entry of this namespace from both tiers."""
+        with self._lock:
+            self._memory.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM cache_entries WHERE namespace = ?", (self.namespace,))
+                self._db.commit()
+
+    def get_or_compute(self, key: str, compute: Callable[[], Any], ttl: Optional[float] = None,
+                       cache_if: Optional[Callable[[Any], bool]] = None,
+                       on_lookup: Optional[Callable[[str], None]] = None,
+                       refresh: Optional[Callable[[], Any]] = None) -> Any:
+        """
+        Return the cached value for a key, computing and storing it on a miss.
+
+        Stale entries are returned immediately and refreshed in a background thread.
+        Concurrent misses for the same key share a single computation.
+
+        Args:
+            key: The cache key
+            compute: Zero-argument function producing the value
+            ttl: Time-to-live in seconds (defaults to the cache TTL)
+            cache_if: Optional predicate; values for which it returns False are not stored
+            on_lookup: Optional callback receiving the lookup state ("fresh", "stale" or "miss")
+            refresh: Zero-argument function used for background refreshes (defaults to compute)
+
+        Returns:
+            The cached or freshly computed value
+        """
+        value, state = self.get(key)
+        if on_lookup is not None:
+            on_lookup(state)
+        if state == "fresh":
+            self._count("hits")
+            return value
+        if state == "stale":
+            self._count("stale_hits")
+            self.refresh_in_background(key, refresh or compute, ttl, cache_if)
+            return value
+
+        self._count("misses")
+
+        def compute_and_store():
+            value = compute()
+            if cache_if is None or cache_if(value):
+                self.set(key, value, ttl)
+            return value
+
+        return self._flights.do(key, compute_and_store)
+
+    def refresh_in_background(self, key: str, compute: Callable[[], Any], ttl: Optional[float] = None,
+                              cache_if: Optional[Callable[[Any], bool]] = None) -> None:
+        """
+        Recompute and store a key in a background thread, unless a refresh of it is already running.
+
+        Used by get_or_compute for stale hits, and by callers that read stale entries with get().
+
+        Args:
+            key: The cache key
+            compute: Zero-argument function producing the new value
+            ttl: Time-to-live in seconds (defaults to the cache TTL)
+            cache_if: Optional predicate; values for which it returns False are not stored
+        """
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+
+        def refresh():
+            try:
+                value = compute()
+                if cache_if is None or cache_if(value):
+                    self.set(key, value, ttl)
+                self._count("refreshes")
+            except Exception as e:
+                self._count("refresh_errors")
+                print(f"Background cache refresh failed: {e}")
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        threading.Thread(target=refresh, daemon=True).start()
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self.stats[name] += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters and the current in-memory size."""
+        with self._lock:
+            stats = dict(self.stats)
+            stats["memory_entries"] = len(self._memory)
+        stats["coalesced"] = self._flights.get_stats()["coalesced"]
+        return stats
@@ -1,14 +1,32 @@
-from duckduckgo_search import DDGS
 from typing import List, Dict, Any, Optional
 import re
-import requests
+import threading
 from urllib.parse import urlparse
+from lazy_imports import lazy_import
+from query_jobs import check_cancelled, report_progress
+from tracing import span
+
+# Imported on first search or page fetch
+duckduckgo_search = lazy_import("duckduckgo_search")
+requests = lazy_import("requests")
 
 class SearchTool:
-    """Tool for searching the web and retrieving relevant information."""
+    """
+    Tool for searching the web and retrieving relevant information.
+    
+    Safe to share between threads: each thread gets its own DDGS client.
+    """
     
     def __init__(self):
-        self.ddgs = DDGS()
+        self._local = threading.local()
+        
+    @property
+    def ddgs(self) -> Any:
+        """DDGS client of the calling thread (its HTTP session is not thread-safe)."""
+        ddgs = getattr(self._local, "ddgs", None)
+        if ddgs is None:
+            ddgs = self._local.ddgs = duckduckgo_search.DDGS()
+        return ddgs
         
     def search(self, query: str, max_results: int = 5) -> List[Dict[str, str]]:
         """
@@ -21,12 +39,15 @@ class SearchTool:
         Returns:
             List of dictionaries containing search results with title, body, and href
         """
-        try:
-            results = list(self.ddgs.text(query, max_results=max_results))
-            return results
-        except Exception as e:
-            print(f"Error during search: {e}")
-            return []
+        with span("search.ddg", query=query) as search_span:
+            try:
+                results = list(self.ddgs.text(query, max_results=max_results))
+                search_span.set_attribute("results", len(results))
+                return results
+            except Exception as e:
+                search_span.set_attribute("error", str(e))
+                print(f"Error during search: {e}")
+                return []
     
     def get_content(self, url: str) -> Optional[str]:
         """
@@ -38,16 +59,20 @@ class SearchTool:
         Returns:
             The text content of the URL or None if failed
         """
-        try:
-            response = requests.get(url, timeout=10)
-            response.raise_for_status()
-            # Simple extraction - in a real app, use a proper parser
-            text = re.sub(r'<.*?>', ' ', response.text)
-            text = re.sub(r'\s+', ' ', text)
-            return text.strip()
-        except Exception as e:
-            print(f"Error fetching {url}: {e}")
-            return None
+        with span("http.get", url=url) as fetch_span:
+            try:
+                response = requests.get(url, timeout=10)
+                fetch_span.set_attribute("status", response.status_code)
+                response.raise_for_status()
+                fetch_span.set_attribute("bytes", len(response.text))
+                # Simple extraction - in a real app, use a proper parser
+                text = re.sub(r'<.*?>', ' ', response.text)
+                text = re.sub(r'\s+', ' ', text)
+                return text.strip()
+            except Exception as e:
+                fetch_span.set_attribute("error", str(e))
+                print(f"Error fetching {url}: {e}")
+                return None
     
     def extract_domain(self, url: str) -> str:
         """Extract the domain name from a URL."""
@@ -112,6 +137,7 @@ class SearchTool:
         # Get content from top 3 results for better analysis
         for i, result in enumerate(results[:3]):
             domain = self.extract_domain(result['href'])
+            check_cancelled()
             
             # Try to get more detailed content (limited to prevent overwhelming)
             try:
@@ -119,6 +145,7 @@ class SearchTool:
                 additional_content = additional_content[:5000] if additional_content else "Content extraction failed."
             except:
                 additional_content = "Content extraction failed."
+            report_progress("source", title=result['title'], url=result['href'])
             
             # Add structured information
             consolidated_info.append(f"SOURCE {i+1}: {result['title']} ({domain})\n")
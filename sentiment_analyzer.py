@@ -1,28 +1,130 @@
-import google.generativeai as genai
+import json
 import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from dotenv import load_dotenv
-from typing import Dict, Any, Tuple, List
+from typing import Dict, Any, Tuple, List, Optional, Union, Iterator
+from response_cache import ResponseCache, make_key, normalize_query, content_hash
+from lexicon_sentiment import LexiconSentimentScorer
+from model_router import ModelRouter
+from llm_backends import LLMBackend, create_backend
+from llm_metrics import METRICS
+from singleflight import SingleFlight
 
 load_dotenv()
 
+SENTIMENT_LABELS = ("POSITIVE", "NEGATIVE", "NEUTRAL", "MIXED")
+
+SECTION_FORMAT = """
+        1. SENTIMENT: [Clearly state if the sentiment is POSITIVE, NEGATIVE, NEUTRAL, or MIXED. Be definitive.]
+        
+        2. CONFIDENCE: [State Low, Medium, or High]
+        
+        3. MARKET IMPACT: [Analyze potential impact on relevant markets, companies, or industries]
+        
+        4. DETAILED ANALYSIS: [Provide reasoning, analyze both explicit and implicit meanings]
+        
+        5. SUMMARY: [Give a 2-3 sentence summary]
+        
+        6. RECOMMENDATIONS: [Provide 2-3 actionable insights]
+"""
+
+SECTION_MARKERS = [
+    ("1. SENTIMENT:", "sentiment"),
+    ("2. CONFIDENCE:", "confidence"),
+    ("3. MARKET IMPACT:", "market_impact"),
+    ("4. DETAILED ANALYSIS:", "detailed_analysis"),
+    ("5. SUMMARY:", "summary"),
+    ("6. RECOMMENDATIONS:", "recommendations")
+]
+
+STRUCTURED_FORMAT = """
+        - "sentiment": exactly one of POSITIVE, NEGATIVE, NEUTRAL or MIXED. Be definitive.
+        - "confidence": Low, Medium, or High
+        - "market_impact": potential impact on relevant markets, companies, or industries
+        - "detailed_analysis": reasoning, analyzing both explicit and implicit meanings
+        - "summary": a 2-3 sentence summary
+        - "recommendations": a list of 2-3 actionable insights
+"""
+
+# Response schema for structured (JSON) output mode
+ANALYSIS_SCHEMA = {
+    "type": "OBJECT",
+    "properties": {
+        "sentiment": {"type": "STRING"},
+        "confidence": {"type": "STRING"},
+        "market_impact": {"type": "STRING"},
+        "detailed_analysis": {"type": "STRING"},
+        "summary": {"type": "STRING"},
+        "recommendations": {"type": "ARRAY", "items": {"type": "STRING"}}
+    },
+    "required": ["sentiment", "confidence", "market_impact", "detailed_analysis", "summary", "recommendations"]
+}
+
+ITEM_HEADER_PATTERN = re.compile(r'^\s*=+\s*ITEM\s+(\d+)\s*=+\s*$', re.MULTILINE | re.IGNORECASE)
+
 class SentimentAnalyzer:
-    """Sentiment analysis module using Gemini API."""
+    """Sentiment analysis module using Gemini API (or another LLM backend)."""
     
-    def __init__(self):
-        # Initialize the Gemini API
-        api_key = os.getenv("GOOGLE_API_KEY")
-        if not api_key:
-            raise ValueError("GOOGLE_API_KEY not found in environment variables.")
+    def __init__(self, cache: Optional[ResponseCache] = None, output_mode: Optional[str] = None,
+                 sentiment_mode: Optional[str] = None, router: Optional[ModelRouter] = None,
+                 backend: Optional[LLMBackend] = None):
+        """
+        Args:
+            cache: Response cache for analyses (built from the LLM_CACHE_* settings if omitted)
+            output_mode: "json" for schema-constrained structured output, "text" for the
+                numbered-heading format (defaults to the SENTIMENT_OUTPUT_MODE setting)
+            sentiment_mode: "llm" to always use Gemini, "lexicon" to use the offline
+                lexicon scorer only, or "auto" to use Gemini and fall back to the lexicon
+                scorer when the model call fails (defaults to the SENTIMENT_MODE setting)
+            router: Model router choosing between the fast and large models
+            backend: LLM backend serving the models (defaults to the LLM_BACKEND setting,
+                Gemini unless set to "local")
+        """
+        # Initialize the LLM backend (Gemini needs GOOGLE_API_KEY)
+        if router is None:
+            self.backend = backend or create_backend()
+            router = ModelRouter(model_factory=self.backend.model)
+        else:
+            self.backend = backend
         
-        genai.configure(api_key=api_key)
+        # Route calls between a fast and a large model by task, prompt size and latency budget
+        self.router = router
         
-        # Get available models
-        self.model = genai.GenerativeModel('gemini-2.5-pro-exp-03-25')
-    
+        # Cache analyses by normalized query + hash of the source content
+        if cache is None:
+            cache = ResponseCache(
+                namespace="sentiment",
+                max_entries=int(os.getenv("LLM_CACHE_MAX_ENTRIES", "256")),
+                ttl=float(os.getenv("LLM_CACHE_TTL", "3600")),
+                stale_ttl=float(os.getenv("LLM_CACHE_STALE_TTL", "1800")),
+                persist_path=os.getenv("LLM_CACHE_PATH", os.path.join(".cache", "llm_cache.sqlite3")) or None
+            )
+        self.cache = cache
+        
+        self.output_mode = (output_mode or os.getenv("SENTIMENT_OUTPUT_MODE", "json")).lower()
+        self.parse_stats = {"json_parsed": 0, "json_failures": 0, "marker_parsed": 0, "marker_failures": 0}
+        self._stats_lock = threading.Lock()
+        
+        self.sentiment_mode = (sentiment_mode or os.getenv("SENTIMENT_MODE", "auto")).lower()
+        self.lexicon = LexiconSentimentScorer()
+        
+        # Concurrent checks of the same question share one classification call
+        self._relevance_flights = SingleFlight()
+
+    @property
+    def model(self) -> Any:
+        """The large model object, built on first use so construction doesn't load the SDK."""
+        return self.router.model(self.router.models["large"])
+
     def is_finance_related(self, query: str) -> bool:
         """
         Check if the query is related to finance, business, or markets.
         
+        Identical (normalized) queries checked concurrently share one model call.
+        
         Args:
             query: The user query
             
@@ -39,107 +141,468 @@ class SentimentAnalyzer:
         Answer only with YES or NO:
         """
         
-        response = self.model.generate_content(prompt)
-        answer = response.text.strip().upper()
+        def classify():
+            response = self.router.generate("classify", prompt, stage="is_finance_related")
+            return "YES" in response.text.strip().upper()
+        
+        return self._relevance_flights.do(normalize_query(query), classify)
+    
+    def _cache_key(self, search_results: str, user_query: str) -> str:
+        """Build the content-addressed cache key for an analysis."""
+        return make_key("sentiment", normalize_query(user_query), content_hash(search_results))
+    
+    def _build_analysis_prompt(self, search_results: str, user_query: str, structured: bool = False) -> str:
+        """Build the sentiment analysis prompt for one query, as numbered headings or JSON."""
+        if structured:
+            return f"""
+        You are a financial expert specializing in sentiment analysis. Analyze the following information related to this query: "{user_query}"
+        
+        INFORMATION:
+        {search_results}
+        
+        Respond with a single JSON object with these fields:
+        {STRUCTURED_FORMAT}
+        Use only the information provided. If there is truly insufficient information for any field, use "Insufficient information available".
+        """
+        
+        return f"""
+        You are a financial expert specializing in sentiment analysis. Analyze the following information related to this query: "{user_query}"
+        
+        INFORMATION:
+        {search_results}
+        
+        Please provide a structured analysis with these exact headings and format:
+        {SECTION_FORMAT}
+        Use only the information provided. If there is truly insufficient information for any section, indicate "Insufficient information available" in that section.
+        """
+    
+    def _run_analysis(self, search_results: str, user_query: str, latency_budget: Optional[float] = None,
+                      stage: str = "analyze_sentiment") -> Dict[str, Any]:
+        """
+        Call the model and parse its answer, raising on API errors.
+        
+        Args:
+            search_results: The consolidated search results
+            user_query: The original user query
+            latency_budget: Seconds the caller can wait, if constrained
+            stage: Pipeline stage reported in the metrics
+            
+        Returns:
+            Dictionary containing detailed analysis and sentiment
+        """
+        if self.output_mode == "json":
+            prompt = self._build_analysis_prompt(search_results, user_query, structured=True)
+            response = self.router.generate(
+                "analyze",
+                prompt,
+                latency_budget=latency_budget,
+                stage=stage,
+                generation_config={
+                    "response_mime_type": "application/json",
+                    "response_schema": ANALYSIS_SCHEMA
+                }
+            )
+            return self._parse_structured(response.text)
         
-        return "YES" in answer
+        prompt = self._build_analysis_prompt(search_results, user_query)
+        response = self.router.generate("analyze", prompt, latency_budget=latency_budget, stage=stage)
+        return self._count_parse("marker", self._parse_sections(response.text))
     
-    def analyze_sentiment(self, search_results: str, user_query: str) -> Dict[str, Any]:
+    def analyze_sentiment(self, search_results: str, user_query: str,
+                          latency_budget: Optional[float] = None) -> Dict[str, Any]:
         """
         Analyze the sentiment of financial information.
         
+        Repeat analyses of the same query over unchanged sources are served from
+        the response cache.
+        
         Args:
             search_results: The consolidated search results
             user_query: The original user query
+            latency_budget: Seconds the caller can wait; a tight budget routes the
+                call to the fast model
             
         Returns:
             Dictionary containing detailed analysis and sentiment
         """
-        prompt = f"""
-        You are a financial expert specializing in sentiment analysis. Analyze the following information related to this query: "{user_query}"
+        if self.sentiment_mode == "lexicon":
+            return self.lexicon.analyze(search_results, user_query)
         
-        INFORMATION:
-        {search_results}
+        key = self._cache_key(search_results, user_query)
+        try:
+            sections = self.cache.get_or_compute(
+                key,
+                lambda: self._run_analysis(search_results, user_query, latency_budget),
+                cache_if=lambda sections: sections.get("sentiment") in SENTIMENT_LABELS,
+                on_lookup=lambda state: METRICS.record_cache("analyze_sentiment", state)
+            )
+            # A copy, so the caller can't modify the cached entry
+            return dict(sections)
+        except Exception as e:
+            print(f"Error analyzing sentiment: {e}")
+            # Return fallback sections if analysis fails
+            return self._fallback_sections(search_results, user_query, e)
+    
+    def analyze_sentiment_stream(self, search_results: str, user_query: str,
+                                 latency_budget: Optional[float] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Analyze sentiment while the model is still generating, yielding partial results.
         
-        Please provide a structured analysis with these exact headings and format:
+        Each yielded dictionary holds the sections whose text is complete so far
+        (a section is complete once the next numbered heading has arrived). The last
+        yielded dictionary is the full section dictionary, as returned by
+        analyze_sentiment, and is stored in the response cache.
         
-        1. SENTIMENT: [Clearly state if the sentiment is POSITIVE, NEGATIVE, NEUTRAL, or MIXED. Be definitive.]
+        Args:
+            search_results: The consolidated search results
+            user_query: The original user query
+            latency_budget: Seconds the caller can wait, if constrained
+            
+        Yields:
+            Partial section dictionaries, ending with the complete one
+        """
+        if self.sentiment_mode == "lexicon":
+            yield self.lexicon.analyze(search_results, user_query)
+            return
         
-        2. CONFIDENCE: [State Low, Medium, or High]
+        key = self._cache_key(search_results, user_query)
+        cached, state = self.cache.get(key)
+        METRICS.record_cache("analyze_sentiment_stream", state)
+        if state == "stale":
+            # Serve the stale analysis now and revalidate it in the background, as analyze_sentiment does
+            self.cache.refresh_in_background(
+                key,
+                lambda: self._run_analysis(search_results, user_query, latency_budget,
+                                           stage="analyze_sentiment_stream"),
+                cache_if=lambda sections: sections.get("sentiment") in SENTIMENT_LABELS
+            )
+        if state != "miss":
+            # A copy, so the caller can't modify the cached entry
+            yield dict(cached)
+            return
         
-        3. MARKET IMPACT: [Analyze potential impact on relevant markets, companies, or industries]
+        try:
+            prompt = self._build_analysis_prompt(search_results, user_query)
+            response = self.router.generate("analyze", prompt, latency_budget=latency_budget, stream=True,
+                                            stage="analyze_sentiment_stream")
+            
+            text = ""
+            completed = 0
+            for chunk in response:
+                text += chunk.text
+                partial = self._locate_sections(text)
+                finished = {k: v for k, v, done in partial if done}
+                if len(finished) > completed:
+                    completed = len(finished)
+                    if "sentiment" in finished:
+                        finished["sentiment"] = self._normalize_label(finished["sentiment"])
+                    yield finished
+            
+            sections = self._parse_sections(text)
+        except Exception as e:
+            print(f"Error streaming sentiment analysis: {e}")
+            yield self._fallback_sections(search_results, user_query, e)
+            return
         
-        4. DETAILED ANALYSIS: [Provide reasoning, analyze both explicit and implicit meanings]
+        if sections.get("sentiment") in SENTIMENT_LABELS:
+            self.cache.set(key, sections)
+        yield sections
+    
+    def analyze_sentiment_batch(self, items: List[Union[Dict[str, str], Tuple[str, str]]],
+                                max_workers: int = 4, pack_char_budget: int = 6000,
+                                max_pack_size: int = 8) -> Dict[str, Any]:
+        """
+        Analyze the sentiment of many (search results, query) items at once.
         
-        5. SUMMARY: [Give a 2-3 sentence summary]
+        Cached items are answered immediately. Items with small contexts are packed
+        together into one structured prompt, large ones get their own call, and the
+        resulting calls run concurrently on a bounded thread pool. Items missing from
+        a packed answer are retried individually.
         
-        6. RECOMMENDATIONS: [Provide 2-3 actionable insights]
+        Args:
+            items: Dicts with "search_results" and "query" keys, or (search_results, query) tuples
+            max_workers: Maximum number of concurrent model calls
+            pack_char_budget: Maximum combined context characters in one packed prompt
+            max_pack_size: Maximum number of items in one packed prompt
+            
+        Returns:
+            Dictionary with "results" (section dicts in input order), "errors"
+            (item index to error message) and "stats" (throughput figures)
+        """
+        start_time = time.time()
+        normalized = []
+        for item in items:
+            if isinstance(item, dict):
+                normalized.append((item.get("search_results", ""), item.get("query", "")))
+            else:
+                normalized.append((item[0], item[1]))
         
-        Use only the information provided. If there is truly insufficient information for any section, indicate "Insufficient information available" in that section.
+        results: List[Optional[Dict[str, Any]]] = [None] * len(normalized)
+        errors: Dict[int, str] = {}
+        stats = {"items": len(normalized), "cache_hits": 0, "packed_calls": 0, "single_calls": 0}
+        stats_lock = threading.Lock()
+        
+        if self.sentiment_mode == "lexicon":
+            results = [self.lexicon.analyze(search_results, query) for search_results, query in normalized]
+            pending = []
+        else:
+            pending = None
+        
+        # Serve what we can from the cache
+        if pending is None:
+            pending = []
+            for index, (search_results, query) in enumerate(normalized):
+                cached, state = self.cache.get(self._cache_key(search_results, query))
+                METRICS.record_cache("analyze_sentiment_batch", state)
+                if state == "fresh":
+                    results[index] = cached
+                    stats["cache_hits"] += 1
+                else:
+                    pending.append(index)
+        
+        # Group small items into packs, large items run alone
+        packs: List[List[int]] = []
+        current: List[int] = []
+        current_chars = 0
+        for index in pending:
+            size = len(normalized[index][0])
+            if size > pack_char_budget // 2:
+                packs.append([index])
+                continue
+            if current and (current_chars + size > pack_char_budget or len(current) >= max_pack_size):
+                packs.append(current)
+                current, current_chars = [], 0
+            current.append(index)
+            current_chars += size
+        if current:
+            packs.append(current)
+        
+        def run_pack(pack: List[int]) -> Dict[int, Any]:
+            outcome: Dict[int, Any] = {}
+            if len(pack) > 1:
+                with stats_lock:
+                    stats["packed_calls"] += 1
+                try:
+                    outcome.update(self._run_packed_analysis([normalized[i] for i in pack], pack))
+                except Exception as e:
+                    print(f"Packed sentiment analysis failed, retrying items individually: {e}")
+            for index in pack:
+                if index in outcome:
+                    continue
+                search_results, query = normalized[index]
+                with stats_lock:
+                    stats["single_calls"] += 1
+                try:
+                    outcome[index] = self._run_analysis(search_results, query, stage="analyze_sentiment_batch")
+                except Exception as e:
+                    outcome[index] = e
+            return outcome
+        
+        with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+            futures = [executor.submit(run_pack, pack) for pack in packs]
+            for future in as_completed(futures):
+                for index, sections in future.result().items():
+                    if isinstance(sections, Exception):
+                        print(f"Error analyzing sentiment for batch item {index}: {sections}")
+                        errors[index] = str(sections)
+                        search_results, query = normalized[index]
+                        results[index] = self._fallback_sections(search_results, query, sections)
+                        continue
+                    results[index] = sections
+                    if sections.get("sentiment") in SENTIMENT_LABELS:
+                        search_results, query = normalized[index]
+                        self.cache.set(self._cache_key(search_results, query), sections)
+        
+        elapsed = time.time() - start_time
+        stats["failed"] = len(errors)
+        stats["elapsed_seconds"] = round(elapsed, 3)
+        stats["items_per_second"] = round(len(normalized) / elapsed, 2) if elapsed > 0 else None
+        
+        return {"results": results, "errors": errors, "stats": stats}
+    
+    def _run_packed_analysis(self, entries: List[Tuple[str, str]], indices: List[int]) -> Dict[int, Dict[str, Any]]:
         """
+        Analyze several items with a single structured prompt.
         
-        try:
-            response = self.model.generate_content(prompt)
-            result = response.text
+        Args:
+            entries: (search_results, query) pairs to analyze
+            indices: The batch index of each entry
             
-            # Initialize sections with default values
-            sections = {
-                "sentiment": "Unable to determine sentiment",
-                "confidence": "Low",
-                "market_impact": "Insufficient information to assess market impact",
-                "detailed_analysis": "No detailed analysis available",
-                "summary": "Insufficient information to provide a summary",
-                "recommendations": "Unable to provide recommendations with available information"
-            }
+        Returns:
+            Parsed sections keyed by batch index, for every item the model answered
+        """
+        blocks = []
+        for position, (search_results, query) in enumerate(entries, start=1):
+            blocks.append(f"=== ITEM {position} ===\nQUERY: \"{query}\"\nINFORMATION:\n{search_results}\n")
+        
+        prompt = f"""
+        You are a financial expert specializing in sentiment analysis. Analyze each of the following {len(entries)} items independently.
+        
+        {"".join(blocks)}
+        
+        For every item, start a new block with its header line exactly as given (for example "=== ITEM 1 ===") and then provide these exact headings and format:
+        {SECTION_FORMAT}
+        Use only the information provided for that item. If there is truly insufficient information for any section, indicate "Insufficient information available" in that section.
+        """
+        
+        response = self.router.generate("batch_analyze", prompt, stage="analyze_sentiment_batch")
+        text = response.text
+        
+        parsed: Dict[int, Dict[str, Any]] = {}
+        headers = list(ITEM_HEADER_PATTERN.finditer(text))
+        for i, header in enumerate(headers):
+            position = int(header.group(1))
+            if not 1 <= position <= len(entries):
+                continue
+            end = headers[i + 1].start() if i + 1 < len(headers) else len(text)
+            sections = self._parse_sections(text[header.end():end])
+            if sections.get("sentiment") in SENTIMENT_LABELS:
+                parsed[indices[position - 1]] = sections
+        return parsed
+    
+    def _fallback_sections(self, search_results: str, user_query: str, error: Exception) -> Dict[str, Any]:
+        """
+        Return the result reported when the model call fails.
+        
+        In "auto" mode this is the offline lexicon estimate, otherwise the failure sections.
+        """
+        if self.sentiment_mode == "auto":
+            sections = self.lexicon.analyze(search_results, user_query)
+            sections["detailed_analysis"] = (
+                f"The AI analysis was unavailable ({str(error)}), so this is an offline lexicon estimate.\n"
+                + sections["detailed_analysis"]
+            )
+            sections["fallback"] = True
+            return sections
+        return self._failed_sections(error)
+    
+    def _failed_sections(self, error: Exception) -> Dict[str, Any]:
+        """Return the section dictionary reported when an analysis fails."""
+        return {
+            "sentiment": "UNDETERMINED",
+            "confidence": "Unable to assess confidence",
+            "market_impact": f"Error during analysis: {str(error)}",
+            "detailed_analysis": "Analysis failed",
+            "summary": "Unable to generate summary",
+            "recommendations": "No recommendations available"
+        }
+    
+    def _parse_sections(self, result: str) -> Dict[str, Any]:
+        """
+        Parse the numbered sections of a model answer into the section dictionary.
+        
+        Args:
+            result: The raw model output
             
-            # Define section markers
-            markers = [
-                ("1. SENTIMENT:", "sentiment"),
-                ("2. CONFIDENCE:", "confidence"),
-                ("3. MARKET IMPACT:", "market_impact"),
-                ("4. DETAILED ANALYSIS:", "detailed_analysis"),
-                ("5. SUMMARY:", "summary"),
-                ("6. RECOMMENDATIONS:", "recommendations")
-            ]
+        Returns:
+            Dictionary of sections with defaults for anything missing
+        """
+        sections = self._default_sections()
+        
+        # Store the text of every numbered section that was found
+        for key, section_text, _ in self._locate_sections(result):
+            if section_text:
+                sections[key] = section_text
+        
+        # Determine sentiment label based on content
+        sections["sentiment"] = self._normalize_label(sections["sentiment"])
+        
+        return sections
+    
+    def _parse_structured(self, result: str) -> Dict[str, Any]:
+        """
+        Validate a JSON answer into the section dictionary in a single pass.
+        
+        Falls back to the numbered-heading parser when the answer is not valid JSON
+        of the expected shape (e.g. the model ignored the response MIME type).
+        
+        Args:
+            result: The raw model output
             
-            # Split the text by the numbered sections
-            for i, (marker, key) in enumerate(markers):
-                if marker in result:
-                    parts = result.split(marker, 1)
-                    if len(parts) > 1:
-                        # Find the end of this section (start of next section or end of text)
-                        section_text = parts[1]
-                        for next_marker, _ in markers[i+1:]:
-                            if next_marker in section_text:
-                                section_text = section_text.split(next_marker, 1)[0]
-                                break
-                        
-                        # Clean up and store the section text
-                        cleaned_text = section_text.strip()
-                        if cleaned_text:
-                            sections[key] = cleaned_text
+        Returns:
+            Dictionary of sections with defaults for anything missing
+        """
+        try:
+            data = json.loads(result)
+            if not isinstance(data, dict):
+                raise ValueError(f"expected a JSON object, got {type(data).__name__}")
             
-            # Determine sentiment label based on content
-            sentiment = sections["sentiment"].lower()
-            if "positive" in sentiment:
-                sections["sentiment"] = "POSITIVE"
-            elif "negative" in sentiment:
-                sections["sentiment"] = "NEGATIVE"
-            elif "neutral" in sentiment:
-                sections["sentiment"] = "NEUTRAL"
-            elif "mixed" in sentiment:
-                sections["sentiment"] = "MIXED"
+            sections = self._default_sections()
+            for _, key in SECTION_MARKERS:
+                value = data.get(key)
+                if isinstance(value, list):
+                    value = "\n".join(f"- {str(item).strip()}" for item in value if str(item).strip())
+                if isinstance(value, str) and value.strip():
+                    sections[key] = value.strip()
+            sections["sentiment"] = self._normalize_label(sections["sentiment"])
             
-            return sections
+            if sections["sentiment"] not in SENTIMENT_LABELS:
+                raise ValueError(f"invalid sentiment label: {sections['sentiment']!r}")
+            return self._count_parse("json", sections)
+        except ValueError as e:
+            print(f"Structured analysis output could not be parsed, using marker parser: {e}")
+            with self._stats_lock:
+                self.parse_stats["json_failures"] += 1
+            return self._count_parse("marker", self._parse_sections(result))
+    
+    def _count_parse(self, parser: str, sections: Dict[str, Any]) -> Dict[str, Any]:
+        """Record whether a parser produced a usable sentiment label."""
+        ok = sections.get("sentiment") in SENTIMENT_LABELS
+        with self._stats_lock:
+            if parser == "json":
+                self.parse_stats["json_parsed"] += 1
+            else:
+                self.parse_stats["marker_parsed" if ok else "marker_failures"] += 1
+        return sections
+    
+    def _default_sections(self) -> Dict[str, Any]:
+        """Return the section dictionary used for anything the model did not provide."""
+        return {
+            "sentiment": "Unable to determine sentiment",
+            "confidence": "Low",
+            "market_impact": "Insufficient information to assess market impact",
+            "detailed_analysis": "No detailed analysis available",
+            "summary": "Insufficient information to provide a summary",
+            "recommendations": "Unable to provide recommendations with available information"
+        }
+    
+    def _locate_sections(self, result: str) -> List[Tuple[str, str, bool]]:
+        """
+        Find the numbered sections present in a (possibly partial) model answer.
+        
+        Args:
+            result: The raw model output received so far
             
-        except Exception as e:
-            print(f"Error analyzing sentiment: {e}")
-            # Return default sections if analysis fails
-            return {
-                "sentiment": "UNDETERMINED",
-                "confidence": "Unable to assess confidence",
-                "market_impact": f"Error during analysis: {str(e)}",
-                "detailed_analysis": "Analysis failed",
-                "summary": "Unable to generate summary",
-                "recommendations": "No recommendations available"
-            } 
\ No newline at end of file
+        Returns:
+            List of (key, cleaned text, complete) tuples in section order; a section
+            is complete when a later section heading follows it
+        """
+        # Locate each marker once, keeping only markers that appear in order
+        positions = []
+        search_from = 0
+        for marker, key in SECTION_MARKERS:
+            index = result.find(marker, search_from)
+            if index == -1:
+                continue
+            positions.append((index, index + len(marker), key))
+            search_from = index + len(marker)
+        
+        located = []
+        for i, (_, text_start, key) in enumerate(positions):
+            is_last = i + 1 == len(positions)
+            text_end = len(result) if is_last else positions[i + 1][0]
+            located.append((key, result[text_start:text_end].strip(), not is_last))
+        return located
+    
+    def _normalize_label(self, sentiment: str) -> str:
+        """Map free-form sentiment text onto one of the sentiment labels."""
+        sentiment_lower = sentiment.lower()
+        if "positive" in sentiment_lower:
+            return "POSITIVE"
+        elif "negative" in sentiment_lower:
+            return "NEGATIVE"
+        elif "neutral" in sentiment_lower:
+            return "NEUTRAL"
+        elif "mixed" in sentiment_lower:
+            return "MIXED"
+        return sentiment
@@ -0,0 +1,67 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict
+
+from answer_cache import AnswerCache
+from search_tools import SearchTool
+from sentiment_analyzer import SentimentAnalyzer
+from stock_tools import StockTools
+
+# Process-wide tool instances, shared by every session and request
+_instances: Dict[str, Any] = {}
+_lock = threading.Lock()
+
+
+def _shared(name: str, factory: Callable[[], Any]) -> Any:
+    instance = _instances.get(name)
+    if instance is None:
+        with _lock:
+            instance = _instances.get(name)
+            if instance is None:
+                instance = _instances[name] = factory()
+    return instance
+
+
+def get_search_tool() -> SearchTool:
+    """Return the shared web search tool (thread-safe, one DDGS client per thread)."""
+    return _shared("search_tool", SearchTool)
+
+
+def get_sentiment_analyzer() -> SentimentAnalyzer:
+    """Return the shared sentiment analyzer, with its model router, cache and lexicon."""
+    return _shared("sentiment_analyzer", SentimentAnalyzer)
+
+
+def get_stock_tools() -> StockTools:
+    """Return the shared stock data tools."""
+    return _shared("stock_tools", StockTools)
+
+
+def get_answer_cache() -> AnswerCache:
+    """Return the shared cache of complete answers (ANSWER_CACHE, ANSWER_CACHE_PATH)."""
+    return _shared("answer_cache", AnswerCache.from_env)
+
+
+def get_stock_executor() -> ThreadPoolExecutor:
+    """Return the bounded thread pool that runs the parts of stock queries (STOCK_TASK_WORKERS)."""
+    return _shared("stock_executor", lambda: ThreadPoolExecutor(
+        max_workers=int(os.getenv("STOCK_TASK_WORKERS", "6")), thread_name_prefix="stock-task"
+    ))
+
+
+def get_query_executor() -> ThreadPoolExecutor:
+    """Return the thread pool that runs the app's queries in the background (QUERY_WORKERS)."""
+    return _shared("query_executor", lambda: ThreadPoolExecutor(
+        max_workers=int(os.getenv("QUERY_WORKERS", "4")), thread_name_prefix="query"
+    ))
+
+
+def warm_up() -> None:
+    """Create every shared tool now, so the first query doesn't pay for it."""
+    get_search_tool()
+    get_sentiment_analyzer()
+    get_stock_tools()
+    get_answer_cache()
+    get_stock_executor()
+    get_query_executor()
@@ -0,0 +1,84 @@
+import functools
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Hashable
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent identical work.
+
+    While a call for a key is in flight, further calls for the same key wait
+    for it and share its result (or exception) instead of running again. Once
+    the call finishes the key is forgotten, so nothing is cached.
+    """
+
+    def __init__(self):
+        self._calls: Dict[Hashable, Future] = {}
+        self._lock = threading.Lock()
+        self.stats = {"executions": 0, "coalesced": 0}
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        """
+        Run fn for a key, or wait for the run already in flight for that key.
+
+        Args:
+            key: Canonical description of the unit of work
+            fn: Zero-argument function doing the work
+
+        Returns:
+            The result of the single execution
+        """
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._calls[key] = Future()
+                self.stats["executions"] += 1
+            else:
+                self.stats["coalesced"] += 1
+
+        if leader:
+            try:
+                future.set_result(fn())
+            except BaseException as e:
+                future.set_exception(e)
+            finally:
+                with self._lock:
+                    del self._calls[key]
+        return future.result()
+
+    def in_flight(self) -> int:
+        """Return the number of keys currently being executed."""
+        with self._lock:
+            return len(self._calls)
+
+    def get_stats(self) -> Dict[str, int]:
+        """Return how many calls were executed and how many shared another call's result."""
+        with self._lock:
+            return dict(self.stats, in_flight=len(self._calls))
+
+
+def _freeze(value: Any) -> Hashable:
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(item) for item in value)
+    if isinstance(value, dict):
+        return tuple(sorted((key, _freeze(item)) for key, item in value.items()))
+    return value
+
+
+def coalesced(flight: SingleFlight, name: str) -> Callable:
+    """
+    Decorator coalescing concurrent calls of a function made with equal arguments.
+
+    Args:
+        flight: The SingleFlight group to use
+        name: Prefix of the work key, so several functions can share a group
+    """
+    def decorator(fn: Callable) -> Callable:
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            key = (name, _freeze(args), _freeze(kwargs))
+            return flight.do(key, lambda: fn(*args, **kwargs))
+        return wrapper
+    return decorator
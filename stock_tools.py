@@ -1,10 +1,95 @@
-import yfinance as yf
-import matplotlib.pyplot as plt
-import pandas as pd
-import numpy as np
 import os
 import base64
+import threading
+from concurrent.futures import Future
+from contextlib import contextmanager
+from contextvars import ContextVar
 from io import BytesIO
+from typing import Any, Dict, Optional
+
+from lazy_imports import lazy_import
+from query_router import PERIOD_INTERVALS
+from singleflight import SingleFlight, coalesced
+from tracing import span
+
+# Imported on first use, so building the tools (and the app's first render) doesn't wait for them
+yf = lazy_import("yfinance")
+pd = lazy_import("pandas")
+plt = lazy_import("matplotlib.pyplot")
+
+# Request-scoped memo of in-flight and finished downloads, see shared_fetches()
+_fetch_memo: ContextVar[Optional[Dict[Any, Future]]] = ContextVar("stock_fetch_memo", default=None)
+_fetch_lock = threading.Lock()
+
+# Identical downloads and charts requested by concurrent users are produced once
+STOCK_FLIGHTS = SingleFlight()
+
+# pyplot keeps global figure state, so charts are drawn one at a time
+_plot_lock = threading.Lock()
+
+
+@contextmanager
+def shared_fetches():
+    """
+    Deduplicate Yahoo Finance downloads for the duration of a request.
+
+    Inside the block (and in tasks started from it with a copy of the current
+    context), identical history and info requests are fetched once and shared,
+    including requests that are still in flight in another thread. Nested
+    blocks keep the outer memo, so a batch of queries shares its downloads.
+    """
+    if _fetch_memo.get() is not None:
+        yield
+        return
+    token = _fetch_memo.set({})
+    try:
+        yield
+    finally:
+        _fetch_memo.reset(token)
+
+
+def _memoized(key, fetch):
+    memo = _fetch_memo.get()
+    if memo is None:
+        return fetch()
+
+    with _fetch_lock:
+        future = memo.get(key)
+        owner = future is None
+        if owner:
+            future = memo[key] = Future()
+    if owner:
+        try:
+            future.set_result(fetch())
+        except Exception as e:
+            future.set_exception(e)
+    return future.result()
+
+
+def _history(ticker, period):
+    """Price history of a ticker, shared within a shared_fetches() block."""
+    key = ("history", ticker, period)
+    with span("yfinance.history", ticker=ticker, period=period, cache_hit=True) as fetch_span:
+        def download():
+            fetch_span.set_attribute("cache_hit", False)
+            return yf.Ticker(ticker).history(period=period, interval=PERIOD_INTERVALS.get(period, "1d"))
+
+        data = _memoized(key, lambda: STOCK_FLIGHTS.do(key, download))
+        fetch_span.set_attribute("rows", len(data))
+    # Callers add columns to the frame, so each gets its own copy
+    return data.copy()
+
+
+def _info(ticker):
+    """Metadata of a ticker, shared within a shared_fetches() block."""
+    key = ("info", ticker)
+    with span("yfinance.info", ticker=ticker, cache_hit=True) as fetch_span:
+        def download():
+            fetch_span.set_attribute("cache_hit", False)
+            return yf.Ticker(ticker).info
+
+        return _memoized(key, lambda: STOCK_FLIGHTS.do(key, download))
+
 
 class StockTools:
     """
@@ -23,11 +108,10 @@ class StockTools:
             Latest stock price
         """
         try:
-            data = yf.Ticker(ticker)
-            price = data.history(period='1d').iloc[-1].Close
+            price = _history(ticker, '1d').iloc[-1].Close
             return {
                 "price": round(float(price), 2),
-                "currency": data.info.get("currency", "USD"),
+                "currency": _info(ticker).get("currency", "USD"),
                 "timestamp": pd.Timestamp.now().strftime("%Y-%m-%d %H:%M:%S")
             }
         except Exception as e:
@@ -45,8 +129,7 @@ class StockTools:
             Dictionary containing stock information
         """
         try:
-            data = yf.Ticker(ticker)
-            info = data.info
+            info = _info(ticker)
             
             result = {
                 "name": info.get("shortName", "Unknown"),
@@ -87,7 +170,7 @@ class StockTools:
             The SMA value
         """
         try:
-            data = yf.Ticker(ticker).history(period='1y').Close
+            data = _history(ticker, '1y').Close
             sma = data.rolling(window=window).mean().iloc[-1]
             return {
                 "sma": round(float(sma), 2),
@@ -110,7 +193,7 @@ class StockTools:
             The EMA value
         """
         try:
-            data = yf.Ticker(ticker).history(period='1y').Close
+            data = _history(ticker, '1y').Close
             ema = data.ewm(span=window, adjust=False).mean().iloc[-1]
             return {
                 "ema": round(float(ema), 2),
@@ -133,7 +216,7 @@ class StockTools:
             The RSI value
         """
         try:
-            data = yf.Ticker(ticker).history(period='1y').Close
+            data = _history(ticker, '1y').Close
             delta = data.diff()
             up = delta.clip(lower=0)
             down = -1 * delta.clip(upper=0)
@@ -162,7 +245,7 @@ class StockTools:
             MACD values
         """
         try:
-            data = yf.Ticker(ticker).history(period='1y').Close
+            data = _history(ticker, '1y').Close
             short_ema = data.ewm(span=12, adjust=False).mean()
             long_ema = data.ewm(span=26, adjust=False).mean()
             
@@ -180,6 +263,7 @@ class StockTools:
             return {"error": f"Error calculating MACD: {str(e)}"}
     
     @staticmethod
+    @coalesced(STOCK_FLIGHTS, "plot_stock_price")
     def plot_stock_price(ticker, period="1y"):
         """
         Create a stock price chart.
@@ -193,34 +277,35 @@ class StockTools:
         """
         try:
             # Get data
-            stock = yf.Ticker(ticker)
-            data = stock.history(period=period)
+            data = _history(ticker, period)
             
             if data.empty:
                 return {"error": f"No data found for ticker: {ticker}"}
+            info = _info(ticker)
             
             # Create figure
-            plt.figure(figsize=(10, 6))
-            plt.plot(data.index, data.Close, 'b-', linewidth=2)
-            plt.title(f"{stock.info.get('shortName', ticker)} Stock Price - {period}", fontsize=16)
-            plt.xlabel("Date", fontsize=12)
-            plt.ylabel(f"Price ({stock.info.get('currency', 'USD')})", fontsize=12)
-            plt.grid(True, alpha=0.3)
-            
-            # Add recent price annotation
-            latest_price = data.Close.iloc[-1]
-            latest_date = data.index[-1]
-            plt.annotate(f"${latest_price:.2f}", 
-                        xy=(latest_date, latest_price),
-                        xytext=(latest_date, latest_price*1.05),
-                        fontsize=12, 
-                        arrowprops=dict(arrowstyle="->", color="black"))
-            
-            # Save to BytesIO
-            buffer = BytesIO()
-            plt.savefig(buffer, format='png', dpi=100, bbox_inches='tight')
-            buffer.seek(0)
-            plt.close()
+            with _plot_lock:
+                plt.figure(figsize=(10, 6))
+                plt.plot(data.index, data.Close, 'b-', linewidth=2)
+                plt.title(f"{info.get('shortName', ticker)} Stock Price - {period}", fontsize=16)
+                plt.xlabel("Date", fontsize=12)
+                plt.ylabel(f"Price ({info.get('currency', 'USD')})", fontsize=12)
+                plt.grid(True, alpha=0.3)
+            
+                # Add recent price annotation
+                latest_price = data.Close.iloc[-1]
+                latest_date = data.index[-1]
+                plt.annotate(f"${latest_price:.2f}", 
+                            xy=(latest_date, latest_price),
+                            xytext=(latest_date, latest_price*1.05),
+                            fontsize=12, 
+                            arrowprops=dict(arrowstyle="->", color="black"))
+            
+                # Save to BytesIO
+                buffer = BytesIO()
+                plt.savefig(buffer, format='png', dpi=100, bbox_inches='tight')
+                buffer.seek(0)
+                plt.close()
             
             # Encode to base64
             img_str = base64.b64encode(buffer.read()).decode()
@@ -235,6 +320,7 @@ class StockTools:
             return {"error": f"Error plotting stock price: {str(e)}"}
     
     @staticmethod
+    @coalesced(STOCK_FLIGHTS, "plot_technical_indicators")
     def plot_technical_indicators(ticker, period="1y"):
         """
         Create a technical analysis chart with price, SMA, EMA, and volume.
@@ -248,11 +334,11 @@ class StockTools:
         """
         try:
             # Get data
-            stock = yf.Ticker(ticker)
-            data = stock.history(period=period)
+            data = _history(ticker, period)
             
             if data.empty:
                 return {"error": f"No data found for ticker: {ticker}"}
+            info = _info(ticker)
             
             # Calculate indicators
             data['SMA20'] = data['Close'].rolling(window=20).mean()
@@ -260,32 +346,33 @@ class StockTools:
             data['EMA20'] = data['Close'].ewm(span=20, adjust=False).mean()
             
             # Create figure with subplots
-            fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(12, 8), gridspec_kw={'height_ratios': [3, 1]})
-            
-            # Price and indicators on top subplot
-            ax1.plot(data.index, data.Close, 'b-', linewidth=2, label='Price')
-            ax1.plot(data.index, data.SMA20, 'r--', linewidth=1.5, label='SMA (20)')
-            ax1.plot(data.index, data.SMA50, 'g--', linewidth=1.5, label='SMA (50)')
-            ax1.plot(data.index, data.EMA20, 'm-.', linewidth=1.5, label='EMA (20)')
-            
-            ax1.set_title(f"{stock.info.get('shortName', ticker)} Technical Analysis - {period}", fontsize=16)
-            ax1.set_ylabel(f"Price ({stock.info.get('currency', 'USD')})", fontsize=12)
-            ax1.grid(True, alpha=0.3)
-            ax1.legend(loc='upper left')
-            
-            # Volume on bottom subplot
-            ax2.bar(data.index, data.Volume, color='blue', alpha=0.5)
-            ax2.set_ylabel('Volume', fontsize=12)
-            ax2.set_xlabel('Date', fontsize=12)
-            ax2.grid(True, alpha=0.3)
-            
-            plt.tight_layout()
-            
-            # Save to BytesIO
-            buffer = BytesIO()
-            plt.savefig(buffer, format='png', dpi=100, bbox_inches='tight')
-            buffer.seek(0)
-            plt.close()
+            with _plot_lock:
+                fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(12, 8), gridspec_kw={'height_ratios': [3, 1]})
+            
+                # Price and indicators on top subplot
+                ax1.plot(data.index, data.Close, 'b-', linewidth=2, label='Price')
+                ax1.plot(data.index, data.SMA20, 'r--', linewidth=1.5, label='SMA (20)')
+                ax1.plot(data.index, data.SMA50, 'g--', linewidth=1.5, label='SMA (50)')
+                ax1.plot(data.index, data.EMA20, 'm-.', linewidth=1.5, label='EMA (20)')
+            
+                ax1.set_title(f"{info.get('shortName', ticker)} Technical Analysis - {period}", fontsize=16)
+                ax1.set_ylabel(f"Price ({info.get('currency', 'USD')})", fontsize=12)
+                ax1.grid(True, alpha=0.3)
+                ax1.legend(loc='upper left')
+            
+                # Volume on bottom subplot
+                ax2.bar(data.index, data.Volume, color='blue', alpha=0.5)
+                ax2.set_ylabel('Volume', fontsize=12)
+                ax2.set_xlabel('Date', fontsize=12)
+                ax2.grid(True, alpha=0.3)
+            
+                plt.tight_layout()
+            
+                # Save to BytesIO
+                buffer = BytesIO()
+                plt.savefig(buffer, format='png', dpi=100, bbox_inches='tight')
+                buffer.seek(0)
+                plt.close()
             
             # Encode to base64
             img_str = base64.b64encode(buffer.read()).decode()
@@ -314,7 +401,7 @@ class StockTools:
             Dictionary with historical data
         """
         try:
-            data = yf.Ticker(ticker).history(period=period)
+            data = _history(ticker, period)
             
             # Calculate daily returns
             data['Daily_Return'] = data['Close'].pct_change() * 100
@@ -341,6 +428,7 @@ class StockTools:
             return {"error": f"Error getting historical data: {str(e)}"}
     
     @staticmethod
+    @coalesced(STOCK_FLIGHTS, "compare_stocks")
     def compare_stocks(tickers, period="1y"):
         """
         Compare multiple stocks performance.
@@ -364,7 +452,7 @@ class StockTools:
             
             # Get data for each ticker and normalize
             for ticker in tickers:
-                stock_data = yf.Ticker(ticker).history(period=period)
+                stock_data = _history(ticker, period)
                 if not stock_data.empty:
                     # Normalize to 100 at the beginning
                     compare_data[ticker] = stock_data.Close / stock_data.Close.iloc[0] * 100
@@ -373,33 +461,34 @@ class StockTools:
                 return {"error": "No data found for the provided tickers"}
             
             # Create the comparison chart
-            plt.figure(figsize=(12, 7))
+            with _plot_lock:
+                plt.figure(figsize=(12, 7))
             
-            for ticker in compare_data.columns:
-                plt.plot(compare_data.index, compare_data[ticker], linewidth=2, label=ticker)
+                for ticker in compare_data.columns:
+                    plt.plot(compare_data.index, compare_data[ticker], linewidth=2, label=ticker)
                 
-            plt.title("Stock Price Performance Comparison (Normalized to 100)", fontsize=16)
-            plt.xlabel("Date", fontsize=12)
-            plt.ylabel("Normalized Price", fontsize=12)
-            plt.legend(loc="best")
-            plt.grid(True, alpha=0.3)
-            
-            # Add annotations for final values
-            for ticker in compare_data.columns:
-                final_value = compare_data[ticker].iloc[-1]
-                change = final_value - 100
-                sign = "+" if change >= 0 else ""
-                plt.annotate(f"{ticker}: {sign}{change:.2f}%", 
-                            xy=(compare_data.index[-1], final_value),
-                            xytext=(10, 0),
-                            textcoords="offset points",
-                            fontsize=10)
-            
-            # Save to BytesIO
-            buffer = BytesIO()
-            plt.savefig(buffer, format='png', dpi=100, bbox_inches='tight')
-            buffer.seek(0)
-            plt.close()
+                plt.title("Stock Price Performance Comparison (Normalized to 100)", fontsize=16)
+                plt.xlabel("Date", fontsize=12)
+                plt.ylabel("Normalized Price", fontsize=12)
+                plt.legend(loc="best")
+                plt.grid(True, alpha=0.3)
+            
+                # Add annotations for final values
+                for ticker in compare_data.columns:
+                    final_value = compare_data[ticker].iloc[-1]
+                    change = final_value - 100
+                    sign = "+" if change >= 0 else ""
+                    plt.annotate(f"{ticker}: {sign}{change:.2f}%", 
+                                xy=(compare_data.index[-1], final_value),
+                                xytext=(10, 0),
+                                textcoords="offset points",
+                                fontsize=10)
+            
+                # Save to BytesIO
+                buffer = BytesIO()
+                plt.savefig(buffer, format='png', dpi=100, bbox_inches='tight')
+                buffer.seek(0)
+                plt.close()
             
             # Encode to base64
             img_str = base64.b64encode(buffer.read()).decode()
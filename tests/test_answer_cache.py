@@ -0,0 +1,55 @@
+import datetime
+
+from answer_cache import AnswerCache, answer_class, listing_exchange, seconds_until_bar_close, stock_answer_key
+from query_router import QueryIntent
+
+UTC = datetime.timezone.utc
+
+
+def at(*args):
+    return datetime.datetime(*args, tzinfo=UTC)
+
+
+def test_one_day_period_expires_with_its_five_minute_bar():
+    intent = QueryIntent(kind="chart", tickers=["AAPL"], period="1d", parts=["chart"])
+    assert answer_class(intent) == "indicators"
+    assert seconds_until_bar_close(intent, at(2024, 3, 5, 15, 2, 0)) == 180
+    assert seconds_until_bar_close(intent, at(2024, 3, 5, 15, 5, 0)) == 300
+
+
+def test_daily_bars_expire_at_the_listing_exchange_session_close():
+    us = QueryIntent(kind="chart", tickers=["AAPL"], period="1y")
+    nse = QueryIntent(kind="chart", tickers=["RELIANCE.NS"], period="1y")
+    # Tuesday 08:00 UTC: NSE closes at 10:00 UTC, New York at 16:00 EST (21:00 UTC)
+    now = at(2024, 3, 5, 8, 0)
+    assert seconds_until_bar_close(nse, now) == 2 * 3600
+    assert seconds_until_bar_close(us, now) == 13 * 3600
+    # Daylight saving time moves the New York close to 20:00 UTC
+    assert seconds_until_bar_close(us, at(2024, 7, 2, 8, 0)) == 12 * 3600
+    # Several tickers: the earliest close counts
+    both = QueryIntent(kind="comparison", tickers=["AAPL", "RELIANCE.NS"], period="1y")
+    assert seconds_until_bar_close(both, now) == 2 * 3600
+
+
+def test_daily_bars_after_the_close_wait_for_the_next_session():
+    nse = QueryIntent(kind="chart", tickers=["TCS.NS"], period="6mo")
+    # Tuesday 11:00 UTC, after the NSE close: fresh until Wednesday's close
+    assert seconds_until_bar_close(nse, at(2024, 3, 5, 11, 0)) == 23 * 3600
+    # Friday after the close: fresh until Monday's close
+    assert seconds_until_bar_close(nse, at(2024, 3, 8, 11, 0)) == 71 * 3600
+
+
+def test_listing_exchange():
+    assert listing_exchange("HDFCBANK.NS") == "NSE"
+    assert listing_exchange("500325.BO") == "BSE"
+    assert listing_exchange("AAPL") == "US"
+    assert listing_exchange("BRK.B") == "US"
+
+
+def test_store_uses_the_intent_bar():
+    cache = AnswerCache(persist_path=None)
+    intent = QueryIntent(kind="chart", tickers=["AAPL"], period="1d", parts=["chart"])
+    key = stock_answer_key(intent)
+    cache.store("indicators", key, {"chart_data": {}}, lambda answer: True, intent)
+    entry = cache.caches["indicators"]._memory[key]
+    assert entry[2] <= 300
@@ -0,0 +1,49 @@
+import json
+
+import pytest
+
+pytest.importorskip("flask")
+api_server = pytest.importorskip("api_server")
+
+
+class FakeAgent:
+    def handle_query(self, query):
+        return {"is_finance_related": True, "response": f"Answer to {query}"}
+
+    def handle_queries(self, queries, max_concurrency=8):
+        for index, query in enumerate(queries):
+            yield dict(self.handle_query(query), query=query, index=index)
+
+    def format_response(self, result):
+        return f"<div>{result['response']}</div>"
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(api_server, "FinancialAgent", FakeAgent)
+    return api_server.app.test_client()
+
+
+def test_query_is_not_formatted_by_default(client):
+    response = client.post("/api/query", json={"query": "How is AAPL doing?"})
+    assert response.status_code == 200
+    assert "formatted" not in response.get_json()
+
+
+def test_query_formatted_on_request(client):
+    response = client.post("/api/query", json={"query": "How is AAPL doing?", "formatted": True})
+    assert response.get_json()["formatted"] == "<div>Answer to How is AAPL doing?</div>"
+
+
+@pytest.mark.parametrize("max_concurrency", ["abc", None, [4], {"n": 4}])
+def test_queries_rejects_a_non_integer_max_concurrency(client, max_concurrency):
+    response = client.post("/api/queries", json={"queries": ["a", "b"], "max_concurrency": max_concurrency})
+    assert response.status_code == 400
+    assert "max_concurrency" in response.get_json()["error"]
+
+
+def test_queries_streams_results(client):
+    response = client.post("/api/queries", json={"queries": ["a", "b"], "max_concurrency": "2", "formatted": True})
+    assert response.status_code == 200
+    results = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert [result["formatted"] for result in results] == ["<div>Answer to a</div>", "<div>Answer to b</div>"]
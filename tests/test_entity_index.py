@@ -0,0 +1,106 @@
+import pytest
+
+from entity_index import DEFAULT_SYMBOL_MASTER, EntityIndex, TrigramIndex, load_english_words, read_symbol_master
+
+ROWS = read_symbol_master(DEFAULT_SYMBOL_MASTER)
+SYMBOLS = [entity.symbol for entity, _ in ROWS if entity.symbol]
+
+
+@pytest.fixture(scope="module")
+def index():
+    return EntityIndex.build(ROWS)
+
+
+@pytest.fixture(scope="module")
+def fuzzy():
+    pytest.importorskip("english_words")
+    return TrigramIndex(ROWS, dictionary=load_english_words())
+
+
+@pytest.mark.parametrize("symbol", SYMBOLS)
+def test_every_symbol_resolves_to_itself(index, symbol):
+    assert [entity.symbol for entity in index.find_entities(f"Show me a chart of {symbol}")] == [symbol]
+    root = symbol.split(".")[0]
+    assert [entity.symbol for entity in index.find_entities(f"What is the price of {root}?")] == [symbol]
+
+
+@pytest.mark.parametrize("query, symbols", [
+    ("Show me a chart of Tesla stock", ["TSLA"]),
+    ("Compare hdfc bank and icici bank", ["HDFCBANK.NS", "ICICIBANK.NS"]),
+    ("What is the SBI share price?", ["SBIN.NS"]),
+    ("Show the LT chart", ["LT.NS"]),
+    ("Latest news on HUL", ["HINDUNILVR.NS"]),
+    ("lt stock price", ["LT.NS"]),
+    ("What is $axis trading at?", ["AXISBANK.NS"]),
+    ("What about Meta?", ["META"]),
+    ("How did m&m.ns do today?", ["M&M.NS"]),
+])
+def test_aliases(index, query, symbols):
+    assert [entity.symbol for entity in index.find_entities(query, kind="equity")] == symbols
+
+
+@pytest.mark.parametrize("query", [
+    "axis of evil",
+    "Axis of evil",
+    "sbi card",
+    "tell me about lt",
+    "what about meta",
+])
+def test_short_aliases_need_capitals_or_ticker_context(index, query):
+    assert index.find_entities(query, kind="equity") == []
+
+
+def test_saved_index_matches_built_index(index, tmp_path):
+    path = str(tmp_path / "entity_index.bin")
+    index.save(path, b"\0" * 32)
+    loaded = EntityIndex.load(path, b"\0" * 32)
+    for query in ("Show me a chart of HDFCBANK.NS", "sbi card", "SBI share price", "Elon Musk on Tesla"):
+        assert loaded.find(query) == index.find(query)
+
+
+@pytest.mark.parametrize("query, stock_context, symbols", [
+    ("appel stock price", False, ["AAPL"]),
+    ("Show me a chart of microsft", False, ["MSFT"]),
+    ("nvidiaa price", False, ["NVDA"]),
+    ("amazom stock", False, ["AMZN"]),
+    ("chart of gooogle", False, ["GOOGL"]),
+    ("What is the price of relaince industries?", False, ["RELIANCE.NS"]),
+    ("infosis share price", False, ["INFY.NS"]),
+    ("relaince", False, ["RELIANCE.NS"]),
+    ("Show me the performance of hdfc bnk", True, ["HDFCBANK.NS"]),
+    ("RSI and MACD for nvdia", True, ["NVDA"]),
+    ("compare microsft and appel stock", True, ["MSFT", "AAPL"]),
+])
+def test_fuzzy_typos(fuzzy, query, stock_context, symbols):
+    assert [entity.symbol for entity in fuzzy.resolve(query, stock_context=stock_context)] == symbols
+
+
+@pytest.mark.parametrize("query", [
+    "What is the relevance of the Fed decision to the price of gold?",
+    "Is the bond market reliable? Show me the price trend",
+    "Show me the performance of the Morgan Stanley stock",
+    "Morgan stock price",
+    "refinance stock price",
+    "reliant chart",
+    "alliance shares",
+    "defiance stock",
+    "radiance price",
+    "nettle price",
+    "pestle chart",
+    "goggle chart",
+    "googly shares",
+    "microsome stock",
+    "casebook shares",
+    "total bank share price",
+    # Inflections of dictionary words
+    "nestled price",
+    "goggles chart",
+])
+def test_fuzzy_rejects_dictionary_words(fuzzy, query):
+    assert fuzzy.resolve(query, stock_context=True) == []
+
+
+def test_fuzzy_needs_stock_context(fuzzy):
+    assert fuzzy.resolve("What do analysts think of appel?") == []
+    assert [entity.symbol for entity in fuzzy.resolve("What do analysts think of appel?", stock_context=True)] == \
+        ["AAPL"]
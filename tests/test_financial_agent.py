@@ -0,0 +1,60 @@
+import asyncio
+
+import pytest
+
+financial_agent = pytest.importorskip("financial_agent")
+
+import tracing
+from answer_cache import AnswerCache, report_answer_key
+
+QUERY = "What are analysts saying about the tech sector?"
+
+
+class FakeSearchTool:
+    def search_and_consolidate(self, query):
+        return "SOURCE 1: Tech outlook\nAnalysts expect strong earnings from the tech sector."
+
+
+class FakeSentimentAnalyzer:
+    def is_finance_related(self, query):
+        return True
+
+    def analyze_sentiment(self, search_results, query):
+        return {"sentiment": "POSITIVE", "summary": "Analysts are upbeat."}
+
+
+def make_agent(answer_cache):
+    agent = financial_agent.FinancialAgent(FakeSearchTool(), FakeSentimentAnalyzer(), stock_tools=object())
+    agent.answer_cache = answer_cache
+    return agent
+
+
+@pytest.mark.parametrize("run", [
+    lambda agent: agent.handle_query(QUERY),
+    lambda agent: asyncio.run(agent.ahandle_query(QUERY)),
+])
+def test_cached_report_gets_its_own_timings_and_trace(run):
+    answer_cache = AnswerCache(persist_path=None)
+    first = run(make_agent(answer_cache))
+    second = run(make_agent(answer_cache))
+
+    assert first["analysis"]["sentiment"] == second["analysis"]["sentiment"] == "POSITIVE"
+    assert second["trace_id"] != first["trace_id"]
+    assert [t["stage"] for t in second["stage_timings"]] != [t["stage"] for t in first["stage_timings"]]
+    assert "search" not in [t["stage"] for t in second["stage_timings"]]
+
+    # The cached answer holds no request-specific fields
+    cached, state = answer_cache.caches["report"].get(report_answer_key(QUERY))
+    assert state == "fresh"
+    assert "stage_timings" not in cached and "trace_id" not in cached
+
+
+@pytest.mark.parametrize("run", [
+    lambda agent: agent.handle_query(QUERY),
+    lambda agent: asyncio.run(agent.ahandle_query(QUERY)),
+])
+def test_cached_report_without_tracing_has_no_trace_id(run, monkeypatch):
+    answer_cache = AnswerCache(persist_path=None)
+    run(make_agent(answer_cache))
+    monkeypatch.setattr(tracing, "ENABLED", False)
+    assert "trace_id" not in run(make_agent(answer_cache))
@@ -0,0 +1,44 @@
+import pytest
+
+prewarm = pytest.importorskip("prewarm")
+
+from answer_cache import answer_class
+from financial_agent import FinancialAgent
+from query_router import STOCK_INTENT_ROUTER
+
+
+@pytest.mark.parametrize("ticker", prewarm.default_watchlist())
+def test_warm_templates_route_to_stock_answers(ticker):
+    agent = FinancialAgent.__new__(FinancialAgent)
+    for template in prewarm.WARM_TEMPLATES:
+        query = template.format(ticker=ticker)
+        intent = STOCK_INTENT_ROUTER.route(query, agent._extract_tickers(query))
+        assert intent.kind is not None, query
+        assert intent.tickers == [ticker], query
+        assert answer_class(intent) in ("indicators", "historical"), query
+
+
+class FakeAgent:
+    """Answers stock queries for AAPL only; everything else would be a report."""
+
+    def __init__(self):
+        self.refreshed = []
+
+    def cached_answer_state(self, query):
+        return ("indicators" if "AAPL" in query else "report"), "miss"
+
+    def refresh_answer(self, query):
+        self.refreshed.append(query)
+        return {"response": "ok"}
+
+
+def test_unroutable_ticker_queries_are_skipped():
+    agent = FakeAgent()
+    prewarmer = prewarm.Prewarmer(tickers=["AAPL", "UNKNOWN.NS"], queries=["Market news"], rate=1000,
+                                  burst=1000, agent=agent)
+    summary = prewarmer.run_once()
+    assert summary["unroutable"] == len(prewarm.WARM_TEMPLATES)
+    assert summary["refreshed"] == len(prewarm.WARM_TEMPLATES) + 1
+    assert not any("UNKNOWN.NS" in query for query in agent.refreshed)
+    assert "Market news" in agent.refreshed
+    assert prewarmer.freshness_report()["by_class"]["report"]["total"] == 1
@@ -0,0 +1,80 @@
+import pytest
+
+from query_router import STOCK_INTENT_ROUTER
+
+# (query, tickers) -> (kind, period, chart_style, indicators, parts)
+ROUTING_TABLE = [
+    # Branch precedence: price, chart, comparison, indicators, historical
+    ("What is the current price of AAPL?", ["AAPL"], ("price", "1y", "price", [], ["quote"])),
+    ("Show me a chart of Tesla stock", ["TSLA"], ("chart", "1y", "price", [], ["chart"])),
+    ("Compare AAPL, MSFT, and GOOGL performance", ["AAPL", "MSFT", "GOOGL"],
+     ("chart", "1y", "price", [], ["chart"])),
+    ("Compare AAPL and MSFT", ["AAPL", "MSFT"], ("comparison", "1y", "price", [], [])),
+    ("AAPL vs MSFT over 5 years", ["AAPL", "MSFT"], ("comparison", "5y", "price", [], [])),
+    ("Technical indicators RSI and MACD for NVDA", ["NVDA"],
+     ("indicators", "1y", "price", ["rsi", "macd"], ["rsi", "macd"])),
+    ("Historical data of AAPL", ["AAPL"], ("chart", "1y", "price", [], ["historical"])),
+    ("Technical analysis chart of AAPL", ["AAPL"], ("chart", "1y", "technical", [], ["chart"])),
+    # Not a stock answer: falls through to the report
+    ("What are the technical indicators for NVDA?", ["NVDA"], (None, "1y", "price", [], [])),
+    ("What is the market sentiment around Tesla stock?", ["TSLA"], (None, "1y", "price", [], [])),
+    ("Show me a chart", [], (None, "1y", "price", [], ["chart"])),
+    # Periods
+    ("Show TSLA chart for today", ["TSLA"], ("chart", "1d", "price", [], ["chart"])),
+    ("Show TSLA chart for the past week", ["TSLA"], ("chart", "1wk", "price", [], ["chart"])),
+    ("Show TSLA chart for this quarter", ["TSLA"], ("chart", "3mo", "price", [], ["chart"])),
+    ("Plot MSFT over 5 years", ["MSFT"], ("chart", "5y", "price", [], ["chart"])),
+    ("Show the all-time chart of TSLA", ["TSLA"], ("chart", "max", "price", [], ["chart"])),
+    # Intended changes: the most specific period wins instead of "month"/"year"
+    ("Show me a 3 months chart of AAPL", ["AAPL"], ("chart", "3mo", "price", [], ["chart"])),
+    ("Show me a 6 months chart of AAPL", ["AAPL"], ("chart", "6mo", "price", [], ["chart"])),
+    ("Plot MSFT over 2 years", ["MSFT"], ("chart", "2y", "price", [], ["chart"])),
+    ("Plot MSFT over 10 years", ["MSFT"], ("chart", "10y", "price", [], ["chart"])),
+    # Intended changes: several independent parts are answered together
+    ("RSI and MACD for NVDA", ["NVDA"], ("multi", "1y", "price", ["rsi", "macd"], ["rsi", "macd"])),
+    ("Show AAPL 52 week chart", ["AAPL"], ("multi", "1y", "price", [], ["metadata", "chart"])),
+    ("Historical data and sector of AAPL", ["AAPL"],
+     ("multi", "1y", "price", [], ["metadata", "historical"])),
+    ("Price, market cap and RSI of AAPL", ["AAPL"],
+     ("multi", "1y", "price", ["rsi"], ["quote", "metadata", "rsi"])),
+    ("Chart AAPL with the 50 day SMA", ["AAPL"], ("multi", "1d", "technical", ["sma"], ["sma", "chart"])),
+]
+
+
+@pytest.mark.parametrize("query, tickers, expected", ROUTING_TABLE)
+def test_routing_table(query, tickers, expected):
+    intent = STOCK_INTENT_ROUTER.route(query, tickers)
+    assert (intent.kind, intent.period, intent.chart_style, intent.indicators, intent.parts) == expected
+    assert intent.tickers == tickers
+
+
+def test_sma_and_ema_windows():
+    assert STOCK_INTENT_ROUTER.route("Chart AAPL with the 50 day SMA", ["AAPL"]).windows == {"sma": 50}
+    assert STOCK_INTENT_ROUTER.route("Technical indicators EMA 200 for AAPL", ["AAPL"]).windows == {"ema": 200}
+    assert STOCK_INTENT_ROUTER.route("Technical indicators SMA and EMA for AAPL", ["AAPL"]).windows == \
+        {"sma": 20, "ema": 20}
+
+
+@pytest.mark.parametrize("query, tickers", [
+    ("RSI and MACD for NVDA", ["NVDA"]),
+    ("Technical indicators SMA and EMA for AAPL", ["AAPL"]),
+    ("What is the EMA and RSI of TSLA?", ["TSLA"]),
+])
+def test_indicator_names_are_not_tickers(query, tickers):
+    financial_agent = pytest.importorskip("financial_agent")
+    agent = financial_agent.FinancialAgent.__new__(financial_agent.FinancialAgent)
+    assert agent._extract_tickers(query) == tickers
+
+
+@pytest.mark.parametrize("query, tickers", [
+    ("RSI and MACD for nvdia", ["NVDA"]),
+    ("Show me the performance of hdfc bnk", ["HDFCBANK.NS"]),
+    ("compare microsft and appel stock", ["MSFT", "AAPL"]),
+    ("compare apple and microsft", ["AAPL", "MSFT"]),
+    ("What is the relevance of the Fed decision to the price of gold?", []),
+])
+def test_misspelled_names_in_stock_queries(query, tickers):
+    financial_agent = pytest.importorskip("financial_agent")
+    pytest.importorskip("english_words")
+    agent = financial_agent.FinancialAgent.__new__(financial_agent.FinancialAgent)
+    assert agent._extract_tickers(query) == tickers
@@ -0,0 +1,38 @@
+import pytest
+
+sentiment_analyzer = pytest.importorskip("sentiment_analyzer")
+
+from llm_backends import LocalLLMBackend
+from response_cache import ResponseCache
+
+SEARCH_RESULTS = ("SOURCE 1: Tech rally\nShares surged after strong earnings and record growth; "
+                  "analysts upgraded the stock.")
+QUERY = "How is the tech sector doing?"
+
+
+@pytest.fixture
+def analyzer():
+    return sentiment_analyzer.SentimentAnalyzer(
+        cache=ResponseCache("test:sentiment"), sentiment_mode="llm",
+        backend=LocalLLMBackend(latency_scale=0)
+    )
+
+
+def test_analyze_sentiment_returns_a_copy_of_the_cached_analysis(analyzer):
+    first = analyzer.analyze_sentiment(SEARCH_RESULTS, QUERY)
+    assert first["sentiment"] in sentiment_analyzer.SENTIMENT_LABELS
+    expected = dict(first)
+
+    first["sentiment"] = "CORRUPTED"
+    first["request_field"] = "mine"
+
+    second = analyzer.analyze_sentiment(SEARCH_RESULTS, QUERY)
+    assert second == expected
+    assert second is not first
+
+
+def test_analyze_sentiment_stream_returns_a_copy_of_the_cached_analysis(analyzer):
+    expected = analyzer.analyze_sentiment(SEARCH_RESULTS, QUERY)
+    *_, streamed = analyzer.analyze_sentiment_stream(SEARCH_RESULTS, QUERY)
+    streamed["sentiment"] = "CORRUPTED"
+    assert analyzer.analyze_sentiment(SEARCH_RESULTS, QUERY) == expected
@@ -0,0 +1,373 @@
+import argparse
+import html
+import json
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Iterator, List, Optional
+
+SERVICE_NAME = "financial-insights-ai"
+
+# Span of the calling context; tasks started with a copy of the context nest under it
+_current_span: ContextVar[Optional["Span"]] = ContextVar("trace_span", default=None)
+
+
+class Span:
+    """One timed operation of a trace, with attributes such as cache hits, bytes or tokens."""
+
+    __slots__ = ("trace", "span_id", "parent_id", "name", "start", "end", "attributes", "error")
+
+    def __init__(self, trace: "Trace", name: str, parent_id: Optional[str], attributes: Dict[str, Any],
+                 start: Optional[float] = None):
+        self.trace = trace
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent_id
+        self.name = name
+        self.start = time.time() if start is None else start
+        self.end: Optional[float] = None
+        self.attributes = dict(attributes)
+        self.error: Optional[str] = None
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def finish(self, end: Optional[float] = None) -> None:
+        self.end = time.time() if end is None else end
+        self.trace.add(self)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start": round(self.start, 6),
+            "end": round(self.end if self.end is not None else time.time(), 6),
+            "attributes": self.attributes,
+            "error": self.error,
+        }
+
+
+class _NoopSpan:
+    """Span handed out when no trace is active; attributes are discarded."""
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+class Trace:
+    """The finished spans of one request, collected from every thread taking part in it."""
+
+    def __init__(self, name: str):
+        self.trace_id = uuid.uuid4().hex
+        self.name = name
+        self.spans: List[Span] = []
+        self._lock = threading.Lock()
+
+    def add(self, span: Span) -> None:
+        with self._lock:
+            self.spans.append(span)
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            spans = sorted((span.to_dict() for span in self.spans), key=lambda span: span["start"])
+        start = min((span["start"] for span in spans), default=0)
+        end = max((span["end"] for span in spans), default=0)
+        return {
+            "trace_id": self.trace_id,
+            "name": self.name,
+            "start": start,
+            "duration": round(end - start, 6),
+            "spans": spans,
+        }
+
+
+class MemoryExporter:
+    """Keeps the most recent traces in memory, for the debug panel."""
+
+    def __init__(self, max_traces: int = 200):
+        self.max_traces = max_traces
+        self._traces: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def export(self, trace: Dict[str, Any]) -> None:
+        with self._lock:
+            self._traces[trace["trace_id"]] = trace
+            while len(self._traces) > self.max_traces:
+                self._traces.popitem(last=False)
+
+    def get(self, trace_id: Optional[str]) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            return self._traces.get(trace_id)
+
+
+class JSONLExporter:
+    """Appends every trace as one JSON line to a local file."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def export(self, trace: Dict[str, Any]) -> None:
+        line = json.dumps(trace, default=str) + "\n"
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line)
+
+
+class CollectorExporter:
+    """Sends every trace to an OpenTelemetry collector (OTLP/HTTP with JSON encoding), in the background."""
+
+    def __init__(self, url: str, timeout: float = 5):
+        self.url = url
+        self.timeout = timeout
+
+    def export(self, trace: Dict[str, Any]) -> None:
+        payload = to_otlp(trace)
+        threading.Thread(target=self._send, args=(payload,), daemon=True).start()
+
+    def _send(self, payload: Dict[str, Any]) -> None:
+        import requests
+        try:
+            requests.post(self.url, json=payload, timeout=self.timeout).raise_for_status()
+        except Exception as e:
+            print(f"Error exporting trace to {self.url}: {e}")
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def to_otlp(trace: Dict[str, Any]) -> Dict[str, Any]:
+    """Convert a trace to the OTLP/JSON ExportTraceServiceRequest layout."""
+    spans = []
+    for span in trace["spans"]:
+        otlp_span = {
+            "traceId": trace["trace_id"],
+            "spanId": span["span_id"],
+            "name": span["name"],
+            "kind": 1,
+            "startTimeUnixNano": str(int(span["start"] * 1e9)),
+            "endTimeUnixNano": str(int(span["end"] * 1e9)),
+            "attributes": [{"key": key, "value": _otlp_value(value)} for key, value in span["attributes"].items()],
+            "status": {"code": 2, "message": span["error"]} if span["error"] else {"code": 1},
+        }
+        if span["parent_id"]:
+            otlp_span["parentSpanId"] = span["parent_id"]
+        spans.append(otlp_span)
+    return {"resourceSpans": [{
+        "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": SERVICE_NAME}}]},
+        "scopeSpans": [{"scope": {"name": "tracing"}, "spans": spans}],
+    }]}
+
+
+def _exporters_from_env() -> List[Any]:
+    exporters = []
+    if os.getenv("TRACE_JSONL_PATH"):
+        exporters.append(JSONLExporter(os.environ["TRACE_JSONL_PATH"]))
+    if os.getenv("TRACE_COLLECTOR_URL"):
+        exporters.append(CollectorExporter(os.environ["TRACE_COLLECTOR_URL"]))
+    return exporters
+
+
+ENABLED = os.getenv("TRACING", "1") != "0"
+RECENT_TRACES = MemoryExporter()
+EXPORTERS: List[Any] = [RECENT_TRACES] + _exporters_from_env()
+
+
+def _export(trace: Trace) -> None:
+    data = trace.to_dict()
+    for exporter in EXPORTERS:
+        try:
+            exporter.export(data)
+        except Exception as e:
+            print(f"Error exporting trace: {e}")
+
+
+@contextmanager
+def trace(name: str, **attributes) -> Iterator[Any]:
+    """
+    Trace a request: open its root span and export the trace when the block ends.
+
+    Inside an active trace this is an ordinary child span, so a batch of queries
+    is one trace.
+
+    Args:
+        name: Name of the root span
+        **attributes: Attributes of the root span
+
+    Yields:
+        The root span (its trace ID is span.trace.trace_id)
+    """
+    if not ENABLED:
+        yield NOOP_SPAN
+        return
+    if _current_span.get() is not None:
+        with span(name, **attributes) as child:
+            yield child
+        return
+
+    root = Span(Trace(name), name, None, attributes)
+    token = _current_span.set(root)
+    try:
+        yield root
+    except BaseException as e:
+        root.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        _current_span.reset(token)
+        root.finish()
+        _export(root.trace)
+
+
+@contextmanager
+def span(name: str, **attributes) -> Iterator[Any]:
+    """
+    Time a nested operation of the active trace (a no-op outside a trace).
+
+    Args:
+        name: Span name, e.g. "stage.search" or "yfinance.history"
+        **attributes: Initial attributes; more can be set on the yielded span
+
+    Yields:
+        The span
+    """
+    parent = _current_span.get()
+    if parent is None:
+        yield NOOP_SPAN
+        return
+
+    child = Span(parent.trace, name, parent.span_id, attributes)
+    token = _current_span.set(child)
+    try:
+        yield child
+    except BaseException as e:
+        child.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        _current_span.reset(token)
+        child.finish()
+
+
+def record_span(name: str, start: float, end: float, error: Optional[Exception] = None, **attributes) -> None:
+    """Add an already finished operation (e.g. a model call timed elsewhere) to the active trace."""
+    parent = _current_span.get()
+    if parent is None:
+        return
+    child = Span(parent.trace, name, parent.span_id, attributes, start=start)
+    if error is not None:
+        child.error = f"{type(error).__name__}: {error}"
+    child.finish(end)
+
+
+def annotate(**attributes) -> None:
+    """Set attributes on the current span, if a trace is active."""
+    current = _current_span.get()
+    if current is not None:
+        for key, value in attributes.items():
+            current.set_attribute(key, value)
+
+
+def current_trace_id() -> Optional[str]:
+    """Return the ID of the active trace, if any."""
+    current = _current_span.get()
+    return current.trace.trace_id if current is not None else None
+
+
+def render_waterfall_html(trace: Dict[str, Any]) -> str:
+    """
+    Render a trace as an HTML span waterfall: one row per span, indented by depth,
+    with a bar placed on the trace's timeline.
+
+    Args:
+        trace: A trace as exported (see Trace.to_dict)
+
+    Returns:
+        HTML fragment
+    """
+    spans = trace["spans"]
+    depths = {}
+    for item in spans:
+        depths[item["span_id"]] = depths.get(item["parent_id"], -1) + 1
+    total = trace["duration"] or 1e-9
+
+    rows = []
+    for item in spans:
+        offset = (item["start"] - trace["start"]) / total * 100
+        width = max((item["end"] - item["start"]) / total * 100, 0.3)
+        duration_ms = (item["end"] - item["start"]) * 1000
+        attributes = ", ".join(f"{key}={value}" for key, value in item["attributes"].items())
+        color = "#d9534f" if item["error"] else "#4a90d9"
+        tooltip = html.escape(attributes + (f" error={item['error']}" if item["error"] else ""), quote=True)
+        rows.append(
+            f'<div style="display:flex;align-items:center;font-size:12px;margin:1px 0" title="{tooltip}">'
+            f'<div style="width:38%;padding-left:{depths[item["span_id"]] * 12}px;white-space:nowrap;'
+            f'overflow:hidden;text-overflow:ellipsis">{html.escape(item["name"])}</div>'
+            f'<div style="width:12%;text-align:right;padding-right:8px">{duration_ms:.1f} ms</div>'
+            f'<div style="width:50%;position:relative;height:12px;background:#f2f2f2">'
+            f'<div style="position:absolute;left:{offset:.2f}%;width:{width:.2f}%;height:12px;'
+            f'background:{color}"></div></div></div>'
+        )
+    header = (f'<div style="font-size:12px;color:#666;margin-bottom:4px">Trace {trace["trace_id"]} - '
+              f'{len(spans)} spans, {trace["duration"] * 1000:.0f} ms</div>')
+    return header + "".join(rows)
+
+
+class _CollectorHandler(BaseHTTPRequestHandler):
+    output_path = "traces.jsonl"
+    lock = threading.Lock()
+
+    def do_POST(self):
+        if self.path != "/v1/traces":
+            self.send_error(404)
+            return
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        try:
+            payload = json.loads(body)
+        except ValueError:
+            self.send_error(400, "Expected OTLP JSON")
+            return
+        with self.lock:
+            with open(self.output_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(payload) + "\n")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.end_headers()
+        self.wfile.write(b"{}")
+
+    def log_message(self, format, *args):
+        pass
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Stand-in OpenTelemetry collector: accepts OTLP/JSON traces and appends them to a file."
+    )
+    parser.add_argument("--port", type=int, default=4318)
+    parser.add_argument("--output", default="traces_collected.jsonl")
+    args = parser.parse_args()
+
+    _CollectorHandler.output_path = args.output
+    server = ThreadingHTTPServer(("127.0.0.1", args.port), _CollectorHandler)
+    print(f"Collecting traces on http://127.0.0.1:{args.port}/v1/traces into {args.output}")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()